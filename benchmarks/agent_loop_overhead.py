@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+
+"""
+Measures the per-turn overhead of AICore, the MCP transport and the tools without calling a model.
+
+A recorded session (see core/replay.py) is replayed through AICore against the real swe_tools server.
+Per model turn, wall time is split into simulated model time, tool time not hidden behind the stream
+(MCP round trip plus the tool itself) and the remaining framework overhead.
+
+    python -m benchmarks.agent_loop_overhead --iterations 20
+    python -m benchmarks.agent_loop_overhead --transport inprocess --tokens-per-second 200
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from core.ai_core import AICore
+from core.budget import TaskBudget
+from core.replay import ReplayProvider
+from core.tool_transport import open_tool_session
+
+DEFAULT_FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "read_and_answer.jsonl")
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+async def run(args):
+    os.chdir(ROOT)
+    provider = ReplayProvider(args.fixture, tokens_per_second=args.tokens_per_second, first_token_latency=args.first_token_latency)
+    rows = []
+    async with open_tool_session(args.transport, ROOT, errlog=open(os.devnull, "w")) as (session, _):
+        ai_core = AICore(provider, session, concurrent_tools=not args.sequential)
+        if not args.tool_cache:
+            ai_core.tool_cache = ai_core.dispatcher.cache = None
+        for iteration in range(args.iterations + args.warmup):
+            provider.reset()
+            history = []
+            summaries = []
+            async for event in ai_core.process_message(history, "Explain how AICore runs tools.", budget=TaskBudget(0, 0, 0)):
+                if event["type"] == "turn_summary":
+                    summaries.append(event["metrics"])
+            if iteration < args.warmup:
+                continue
+            for metrics, model_time in zip(summaries, provider.simulated_seconds):
+                tools = metrics["tool_wait_after_stream"] or 0.0
+                rows.append({
+                    "turn": metrics["turn"],
+                    "wall": metrics["turn_duration"],
+                    "model": model_time,
+                    "tools": tools,
+                    "overhead": max(0.0, metrics["turn_duration"] - model_time - tools),
+                })
+
+    print(f"fixture={os.path.relpath(args.fixture, ROOT)} transport={args.transport} iterations={args.iterations} "
+          f"tokens/s={args.tokens_per_second or 'unpaced'} dispatch={'sequential' if args.sequential else 'concurrent'}")
+    print(f"{'turn':>4} {'wall ms':>9} {'model ms':>9} {'tools ms':>9} {'overhead ms p50':>16} {'p95':>8}")
+    for turn in sorted({r["turn"] for r in rows}):
+        turn_rows = [r for r in rows if r["turn"] == turn]
+        overheads = [r["overhead"] * 1000 for r in turn_rows]
+        print(f"{turn:>4} {statistics.mean(r['wall'] for r in turn_rows) * 1000:>9.2f} "
+              f"{statistics.mean(r['model'] for r in turn_rows) * 1000:>9.2f} "
+              f"{statistics.mean(r['tools'] for r in turn_rows) * 1000:>9.2f} "
+              f"{percentile(overheads, 50):>16.3f} {percentile(overheads, 95):>8.3f}")
+    overheads = [r["overhead"] * 1000 for r in rows]
+    print(f"all turns: framework overhead p50 {percentile(overheads, 50):.3f} ms, p95 {percentile(overheads, 95):.3f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline AICore agent-loop benchmark")
+    parser.add_argument("--fixture", default=DEFAULT_FIXTURE, help="Recorded session (JSONL) to replay")
+    parser.add_argument("--transport", choices=["stdio", "daemon", "inprocess"], default="stdio")
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--tokens-per-second", type=float, default=None, help="Pace the replay like a model (default: unpaced)")
+    parser.add_argument("--first-token-latency", type=float, default=0.0, help="Simulated time to first token in seconds")
+    parser.add_argument("--sequential", action="store_true", help="Disable concurrent tool dispatch")
+    parser.add_argument("--tool-cache", action="store_true", help="Keep the read-only tool result cache enabled")
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
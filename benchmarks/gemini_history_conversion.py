@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+
+"""
+Per-call cost of turning the neutral history into Gemini contents as a session grows.
+
+`full` rebuilds every Content on each call (to_gemini_contents), `incremental` keeps a
+GeminiConversation and only converts the messages appended since the previous call.
+
+    python -m benchmarks.gemini_history_conversion --turns 400
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.conversation import user_message, assistant_message, tool_call, tool_message
+from core.providers import GeminiConversation, to_gemini_contents
+
+def make_turn(i: int):
+    """One agent turn: a question, two tool calls with their results and an answer."""
+    calls = [tool_call("read_file_content", {"path": f"src/module_{i}_{j}.py"}) for j in range(2)]
+    return [
+        user_message(f"Question {i}: what does module {i} do?"),
+        assistant_message("Let me read the files.", calls),
+        *[tool_message(call, f"def handler_{i}():\n    return {i}\n" * 20) for call in calls],
+        assistant_message(f"Module {i} defines handler_{i}."),
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description="Gemini history conversion benchmark")
+    parser.add_argument("--turns", type=int, default=400, help="Number of agent turns in the simulated session")
+    parser.add_argument("--report-every", type=int, default=50)
+    args = parser.parse_args()
+
+    history = []
+    conversation = GeminiConversation()
+    full_total = incremental_total = 0.0
+    print(f"{'turns':>6} {'messages':>9} {'full us/call':>13} {'incremental us/call':>20}")
+    for i in range(1, args.turns + 1):
+        history.extend(make_turn(i))
+
+        started = time.perf_counter()
+        to_gemini_contents(history)
+        full = time.perf_counter() - started
+
+        started = time.perf_counter()
+        conversation.sync(history)
+        incremental = time.perf_counter() - started
+
+        full_total += full
+        incremental_total += incremental
+        if i % args.report_every == 0 or i == args.turns:
+            print(f"{i:>6} {len(history):>9} {full * 1e6:>13.1f} {incremental * 1e6:>20.1f}")
+    print(f"session total: full {full_total * 1000:.1f} ms, incremental {incremental_total * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+
+"""
+Compares swe_tools/path_matcher.py with the per-pattern fnmatch loop the walkers used before.
+
+Generates a tree of `--files` files (a share of them in ignored directories or with ignored
+extensions) and measures, for each implementation, matching every relative path once and a full
+pruning walk like the one `view_directory_structure` does.
+
+    python -m benchmarks.path_matching
+    python -m benchmarks.path_matching --files 200000 --repeat 1
+"""
+
+import argparse
+import fnmatch
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from swe_tools.path_matcher import DEFAULT_IGNORE_PATTERNS, PathMatcher
+
+EXTENSIONS = [".py", ".ts", ".md", ".json", ".pyc", ".log", ".txt", ".go"]
+IGNORED_DIRS = ["node_modules", "__pycache__", "dist", "generated"]
+
+def legacy_is_ignored(relative_path, ignore_patterns):
+    """The previous swe_tools.utils.is_ignored."""
+    normalized_path = relative_path.replace("\\", "/")
+    for pattern in ignore_patterns:
+        if fnmatch.fnmatch(normalized_path, pattern) or fnmatch.fnmatch(os.path.basename(normalized_path), pattern):
+            return True
+    return False
+
+def legacy_walk(path, extra):
+    all_ignore_patterns = list(set(DEFAULT_IGNORE_PATTERNS + list(extra)))
+    files = []
+    for dirpath, dirnames, filenames in os.walk(path, topdown=True):
+        dirs_to_remove = {d for d in dirnames if legacy_is_ignored(os.path.relpath(os.path.join(dirpath, d), path), all_ignore_patterns)}
+        dirnames[:] = [d for d in dirnames if d not in dirs_to_remove]
+        for filename in sorted(filenames):
+            relative_filepath = os.path.relpath(os.path.join(dirpath, filename), path).replace("\\", "/")
+            if not legacy_is_ignored(relative_filepath, all_ignore_patterns):
+                files.append(relative_filepath)
+    return files
+
+def matcher_walk(path, extra, use_gitignore):
+    return [f"{rel}/{name}" if rel else name
+            for _, rel, _, names in PathMatcher(path, extra, use_gitignore=use_gitignore).walk() for name in names]
+
+def build_tree(root, files, fanout=20):
+    """`files` empty files spread over nested package directories, some of them in ignored directories."""
+    paths = []
+    for i in range(files):
+        parts = [f"pkg{i % fanout}", f"mod{(i // fanout) % fanout}"]
+        if i % 10 == 0:
+            parts.append(IGNORED_DIRS[(i // 10) % len(IGNORED_DIRS)])
+        paths.append("/".join(parts + [f"file{i}{EXTENSIONS[i % len(EXTENSIONS)]}"]))
+    for rel in paths:
+        full = os.path.join(root, rel)
+        os.makedirs(os.path.dirname(full), exist_ok=True)
+        open(full, "w").close()
+    with open(os.path.join(root, ".gitignore"), "w") as f:
+        f.write("generated/\n*.txt\n!keep.txt\n")
+    return paths
+
+def best_of(repeat, fn):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+def main():
+    parser = argparse.ArgumentParser(description="Ignore-pattern matching benchmark")
+    parser.add_argument("--files", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement (best is reported)")
+    parser.add_argument("--ignore", default="*.min.js,docs/*", help="Extra patterns, as the tools' `ignore` argument")
+    args = parser.parse_args()
+    extra = [p.strip() for p in args.ignore.split(",") if p.strip()]
+
+    root = tempfile.mkdtemp(prefix="clia-path-bench-")
+    try:
+        paths = build_tree(root, args.files)
+        patterns = list(set(DEFAULT_IGNORE_PATTERNS + extra))
+        matcher = PathMatcher(root, extra, use_gitignore=False)
+
+        legacy_match, legacy_hits = best_of(args.repeat, lambda: sum(legacy_is_ignored(p, patterns) for p in paths))
+        new_match, new_hits = best_of(args.repeat, lambda: sum(matcher.is_ignored(p, False) for p in paths))
+        assert legacy_hits == new_hits, (legacy_hits, new_hits)
+
+        legacy_time, legacy_files = best_of(args.repeat, lambda: legacy_walk(root, extra))
+        new_time, new_files = best_of(args.repeat, lambda: matcher_walk(root, extra, use_gitignore=False))
+        git_time, git_files = best_of(args.repeat, lambda: matcher_walk(root, extra, use_gitignore=True))
+        assert sorted(legacy_files) == sorted(new_files)
+
+        print(f"{args.files} files, {len(patterns)} patterns")
+        print(f"{'':28} {'legacy fnmatch':>15} {'path_matcher':>13} {'speedup':>8}")
+        print(f"{'match every path (ms)':28} {legacy_match * 1000:>15.1f} {new_match * 1000:>13.1f} {legacy_match / new_match:>7.1f}x")
+        print(f"{'pruning walk (ms)':28} {legacy_time * 1000:>15.1f} {new_time * 1000:>13.1f} {legacy_time / new_time:>7.1f}x")
+        print(f"{'walk + .gitignore (ms)':28} {'-':>15} {git_time * 1000:>13.1f}   ({len(legacy_files) - len(git_files)} more files ignored)")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
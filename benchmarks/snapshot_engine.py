@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+
+"""
+Times read_codebase_snapshot's engine (swe_tools/snapshot_engine.py) against the previous serial
+implementation on a directory, without byte limits so both produce the full snapshot.
+
+    python -m benchmarks.snapshot_engine /usr/lib/python3
+    python -m benchmarks.snapshot_engine . --workers 1,4,16
+"""
+
+import argparse
+import mimetypes
+import os
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from swe_tools.path_matcher import PathMatcher
+from swe_tools.snapshot_engine import build_snapshot
+
+def legacy_snapshot(abs_root, rel_paths):
+    """The previous loop: mimetypes for binaries, one read and one string per line, serially."""
+    snapshot_parts = []
+    for relative_filepath in rel_paths:
+        filepath = os.path.join(abs_root, relative_filepath)
+        snapshot_parts.append(f"${relative_filepath}\n```\n")
+        mime_type, _ = mimetypes.guess_type(filepath)
+        if mime_type and not mime_type.startswith('text/'):
+            snapshot_parts.append(f"Binary file: {mime_type} (content skipped)\n")
+        else:
+            try:
+                with open(filepath, "r", encoding='utf-8', errors='ignore') as f:
+                    for i, line in enumerate(f):
+                        snapshot_parts.append(f"{i + 1}:{line.rstrip()}\n")
+            except Exception as e:
+                snapshot_parts.append(f"Error reading file: {e}\n")
+        snapshot_parts.append("```\n\n")
+    return "".join(snapshot_parts)
+
+def best_of(repeat, fn):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+def main():
+    parser = argparse.ArgumentParser(description="Snapshot engine benchmark")
+    parser.add_argument("path", nargs="?", default=ROOT)
+    parser.add_argument("--workers", default="1,8", help="Comma-separated thread pool sizes to try")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    root = os.path.abspath(args.path)
+    rel_paths = [f"{rel}/{name}" if rel else name for _, rel, _, names in PathMatcher(root).walk() for name in names]
+    legacy_time, legacy_text = best_of(args.repeat, lambda: legacy_snapshot(root, rel_paths))
+    print(f"{len(rel_paths)} files under {root}")
+    print(f"{'legacy serial':>16}: {legacy_time * 1000:8.1f} ms  {len(legacy_text) / 1e6:6.2f} MB")
+    for workers in (int(w) for w in args.workers.split(",")):
+        elapsed, (text, report) = best_of(args.repeat, lambda: build_snapshot(root, rel_paths, 0, 0, workers))
+        print(f"{f'engine, {workers} threads':>16}: {elapsed * 1000:8.1f} ms  {len(text) / 1e6:6.2f} MB  "
+              f"{legacy_time / elapsed:4.1f}x  ({report.skipped_count} binary/unreadable skipped)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+
+"""
+Compares tool transports (see core/tool_transport.py) on large tool results.
+
+Builds a throwaway workspace of generated source files and calls `read_codebase_snapshot` on it
+through each transport. The tool does the same work everywhere, so differences in latency are the
+cost of framing, serializing, piping and parsing the result.
+
+    python -m benchmarks.tool_transport_payload
+    python -m benchmarks.tool_transport_payload --sizes-mb 32 --transports daemon,inprocess --iterations 10
+"""
+
+import argparse
+import asyncio
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from core.tool_transport import open_tool_session, stop_daemon, TRANSPORTS
+from core.tool_utils import tool_result_to_text
+
+LINE = "    value = compute(value, index)  # generated line for the transport benchmark\n"
+
+def build_workspace(path: str, size_mb: float, file_kb: int = 64):
+    """Writes roughly `size_mb` of Python files into `path`, spread over a few directories."""
+    lines_per_file = max(1, file_kb * 1024 // len(LINE))
+    files = max(1, int(size_mb * 1024 // file_kb))
+    for i in range(files):
+        directory = os.path.join(path, f"pkg{i % 8}")
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, f"module_{i}.py"), "w") as f:
+            f.write(LINE * lines_per_file)
+
+async def measure(transport: str, workspace: str, iterations: int, warmup: int):
+    async with open_tool_session(transport, workspace, errlog=open(os.devnull, "w")) as (session, used):
+        timings = []
+        chars = 0
+        for i in range(iterations + warmup):
+            started = time.perf_counter()
+            result = await session.call_tool("read_codebase_snapshot", {"path": ".", "max_file_bytes": 0, "max_total_bytes": 0})
+            elapsed = time.perf_counter() - started
+            chars = len(tool_result_to_text(result))
+            if i >= warmup:
+                timings.append(elapsed)
+    return used, timings, chars
+
+async def run(args):
+    transports = args.transports.split(",")
+    fell_back = False
+    print(f"{'size':>8} {'transport':>10} {'result MB':>10} {'p50 ms':>9} {'mean ms':>9} {'vs inprocess':>13}")
+    for size_mb in (float(s) for s in args.sizes_mb.split(",")):
+        workspace = tempfile.mkdtemp(prefix="clia-transport-bench-")
+        cwd = os.getcwd()
+        try:
+            build_workspace(workspace, size_mb)
+            os.chdir(workspace)  # the inprocess transport runs the tools in the current directory
+            results = {}
+            for transport in transports:
+                used, timings, chars = await measure(transport, workspace, args.iterations, args.warmup)
+                results[transport] = (used, statistics.median(timings), statistics.mean(timings), chars)
+            if "daemon" in transports:
+                await stop_daemon(workspace)
+        finally:
+            os.chdir(cwd)
+            shutil.rmtree(workspace, ignore_errors=True)
+
+        baseline = results.get("inprocess", (None, None))[1]
+        for transport, (used, p50, mean, chars) in results.items():
+            ratio = f"{p50 / baseline:.2f}x" if baseline else "-"
+            label = transport if used.startswith(transport) else f"{transport}*"
+            fell_back = fell_back or label.endswith("*")
+            print(f"{size_mb:>6.1f}MB {label:>10} {chars / 1e6:>10.2f} {p50 * 1000:>9.1f} {mean * 1000:>9.1f} {ratio:>13}")
+    if fell_back:
+        print("* fell back to another transport")
+
+def main():
+    parser = argparse.ArgumentParser(description="Tool transport benchmark with large results")
+    parser.add_argument("--sizes-mb", default="1,8", help="Comma-separated workspace sizes in MB")
+    parser.add_argument("--transports", default=",".join(TRANSPORTS), help=f"Comma-separated subset of {', '.join(TRANSPORTS)}")
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
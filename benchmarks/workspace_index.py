@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+
+"""
+Compares answering directory listings from swe_tools/workspace_index.py with walking the filesystem
+on every call (PathMatcher.walk, what the tree and snapshot tools did before).
+
+Generates a tree of `--files` files and measures, per watcher mode, the first full listing (which
+lists every directory into the index), an idle refresh, a refresh after `--changes` files were
+created, a full listing from the index and a single-directory lookup like the `@` completion does.
+
+    python -m benchmarks.workspace_index
+    python -m benchmarks.workspace_index --files 200000 --repeat 1
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from swe_tools.path_matcher import PathMatcher
+from swe_tools.workspace_index import WorkspaceIndex
+
+def build_tree(root, files, fanout=20):
+    for i in range(files):
+        directory = os.path.join(root, f"pkg{i % fanout}", f"mod{(i // fanout) % fanout}")
+        os.makedirs(directory, exist_ok=True)
+        open(os.path.join(directory, f"file{i}.py"), "w").close()
+
+def best_of(repeat, fn):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+def listing(walk):
+    return [f"{rel}/{name}" if rel else name for _, rel, _, names in walk for name in names]
+
+def main():
+    parser = argparse.ArgumentParser(description="Workspace index benchmark")
+    parser.add_argument("--files", type=int, default=20000)
+    parser.add_argument("--changes", type=int, default=10, help="Files created before the second refresh")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement (best is reported)")
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="clia-index-bench-")
+    try:
+        build_tree(root, args.files)
+        time.sleep(2.1)  # past the polling mode's racy window, as in a workspace that was not just written
+        walk_time, _ = best_of(args.repeat, lambda: listing(PathMatcher(root).walk()))
+        print(f"{args.files} files; walking the filesystem per call: {walk_time * 1000:.1f} ms")
+        for mode in ("inotify", "poll"):
+            started = time.perf_counter()
+            index = WorkspaceIndex(root, watch=mode, max_dirs=10 ** 9)
+            first = listing(index.walk())
+            first_time = time.perf_counter() - started
+            assert first == listing(PathMatcher(root).walk())
+            idle_time, _ = best_of(args.repeat, index.refresh)
+            for i in range(args.changes):
+                open(os.path.join(root, f"pkg{i % 20}", f"{mode}_new{i}.py"), "w").close()
+            started = time.perf_counter()
+            index.refresh()
+            change_time = time.perf_counter() - started
+            query_time, files = best_of(args.repeat, lambda: listing(index.walk()))
+            lookup_time, _ = best_of(args.repeat, lambda: index.children("pkg3/mod7"))
+            assert files == listing(PathMatcher(root).walk())
+            print(f"  {index.watcher:8} first listing {first_time * 1000:7.1f} ms | idle refresh {idle_time * 1000:7.2f} ms | "
+                  f"refresh after {args.changes} new files {change_time * 1000:6.2f} ms ({index.last_refresh_dirs} dirs) | "
+                  f"full listing {query_time * 1000:6.1f} ms | one directory {lookup_time * 1e6:5.1f} us")
+            index.close()
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -1,41 +1,184 @@
 # -*- coding: utf-8 -*-
 
-import asyncio
-import json
-from typing import List, Any, Dict, AsyncGenerator
+import os
+import time
+from typing import List, Any, Dict, AsyncGenerator, Awaitable, Callable, Optional, TYPE_CHECKING
 
-from google.genai import types
-from google.genai.client import Client
-
-from core.config import MODEL_NAME, SYSTEM_PROMPT, MAX_TOOL_TURNS
-from mcp import ClientSession
+from core.config import CONCURRENT_TOOL_CALLS, MAX_TOOL_CONCURRENCY, TOOL_CACHE_MAX_BYTES
 
 from core.providers import BaseProvider
+from core.tool_dispatch import ToolDispatcher, ToolBatch, is_read_only
+from core.streaming import ToolCallAccumulator
+from core.context_compactor import ContextCompactor
+from core.token_estimator import TokenEstimator, RequestSizeGuard
+from core.budget import TaskBudget, BudgetScheduler, DEADLINE, TOKENS, TOOL_CALLS
+from core.metrics import TurnMetrics, usage_from_event
+from core.tool_cache import ToolResultCache
+from core.tool_utils import tool_result_to_text
+from core.conversation import user_message, assistant_message, tool_call, tool_message
+
+BUDGET_STOP_MESSAGES = {
+    DEADLINE: "the wall-clock deadline was reached",
+    TOKENS: "the token budget was used up",
+    TOOL_CALLS: "the tool-call budget was used up",
+}
+
+if TYPE_CHECKING:
+    from mcp import ClientSession
+
+# Async approval hook: (tool_name, tool_args) -> True to run the tool, False to deny it
+PermissionCallback = Callable[[str, Dict[str, Any]], Awaitable[bool]]
 
 class AICore:
-    def __init__(self, provider: BaseProvider, mcp_session: ClientSession):
+    def __init__(self, provider: BaseProvider, mcp_session: "ClientSession",
+                 permission_callback: Optional[PermissionCallback] = None,
+                 compactor: Optional[ContextCompactor] = None,
+                 budget: Optional[TaskBudget] = None,
+                 concurrent_tools: bool = CONCURRENT_TOOL_CALLS, max_tool_concurrency: int = MAX_TOOL_CONCURRENCY,
+                 size_guard: Optional[RequestSizeGuard] = None, workspace: Optional[str] = None):
         self.provider = provider
         self.mcp_session = mcp_session
+        self.permission_callback = permission_callback
+        self.estimator = size_guard.estimator if size_guard else TokenEstimator.for_provider(provider)
+        self.compactor = compactor or ContextCompactor(estimator=self.estimator)
+        self.size_guard = size_guard or RequestSizeGuard(self.estimator)
+        self.budget = budget or TaskBudget()
+        self.concurrent_tools = concurrent_tools
+        # The tool server's working directory; the model's relative paths are resolved against it
+        self.workspace = os.path.abspath(workspace) if workspace else None
+        self.tool_cache = ToolResultCache(TOOL_CACHE_MAX_BYTES, root=self.workspace) if TOOL_CACHE_MAX_BYTES > 0 else None
+        self.dispatcher = ToolDispatcher(mcp_session, max_concurrency=max_tool_concurrency, cache=self.tool_cache,
+                                         root=self.workspace)
+
+    async def _is_allowed(self, call: Dict[str, Any]) -> bool:
+        if self.permission_callback is None:
+            return True
+        return bool(await self.permission_callback(call["name"], call["args"]))
+
+    @staticmethod
+    def _denied_result(call: Dict[str, Any]) -> Dict[str, Any]:
+        return {"status": "denied", "message": f"Tool call for `{call['name']}` was denied by the user."}
+
+    @staticmethod
+    def _budget_result(call: Dict[str, Any]) -> Dict[str, Any]:
+        return {"status": "skipped", "message": f"Tool call for `{call['name']}` was skipped because the task budget is exhausted."}
+
+    @staticmethod
+    def _invalid_arguments_result(call: Dict[str, Any]) -> Dict[str, Any]:
+        raw = call["invalid_arguments"]
+        shown = raw if len(raw) <= 200 else raw[:200] + "..."
+        return {"status": "error", "message": f"Tool call for `{call['name']}` was not run: its arguments were not valid JSON: {shown}"}
+
+    async def _refusal(self, call: Dict[str, Any], scheduler: BudgetScheduler) -> Optional[Dict[str, Any]]:
+        """Returns the result to report instead of running the call, or None if it may run."""
+        if call.get("invalid_arguments") is not None:
+            return self._invalid_arguments_result(call)
+        if not scheduler.try_tool_call():
+            return self._budget_result(call)
+        if not await self._is_allowed(call):
+            return self._denied_result(call)
+        return None
+
+    async def _admit(self, call: Dict[str, Any], batch: ToolBatch, dispatched: List[Any], metrics: TurnMetrics,
+                     scheduler: BudgetScheduler) -> AsyncGenerator[Dict[str, Any], None]:
+        """Checks budget and approval, then submits the call to the batch. Records (call, batch index or None, refusal)."""
+        refusal = await self._refusal(call, scheduler)
+        if refusal is None:
+            yield {"type": "tool_call", "tool_name": call["name"], "tool_args": call["args"]}
+            metrics.tools_begin()
+            dispatched.append((call, batch.submit(call["name"], call["args"]), None))
+        else:
+            dispatched.append((call, None, refusal))
+
+    def _turn_summary(self, metrics: TurnMetrics) -> Dict[str, Any]:
+        summary = metrics.as_dict()
+        if self.tool_cache is not None:
+            summary["tool_cache"] = self.tool_cache.stats()
+        prompt_cache = getattr(self.provider, "cache_stats", None)
+        if prompt_cache is not None:
+            summary["prompt_cache"] = prompt_cache.as_dict()
+        summary["token_estimate"] = self.estimator.as_dict()
+        route = getattr(self.provider, "last_decision", None)
+        if route is not None:
+            summary["route"] = route
+        return summary
+
+    def _budget_stop(self, scheduler: BudgetScheduler, reason: str, partial_text: str) -> List[Dict[str, Any]]:
+        return [
+            {"type": "budget_exhausted", "reason": reason, "budget": scheduler.budget.as_dict(),
+             "usage": scheduler.usage(), "partial": partial_text},
+            {"type": "error", "content": f"Task stopped before completion: {BUDGET_STOP_MESSAGES[reason]}."},
+        ]
+
+    async def process_message(self, history: List[Dict[str, Any]], user_input: str,
+                              budget: Optional[TaskBudget] = None) -> AsyncGenerator[Dict[str, Any], None]:
+        """
+        Runs one user request to completion or until its budget (wall-clock deadline, tokens,
+        tool calls) runs out; `budget` overrides the AICore default for this request.
+        `history` is the provider-neutral message list (see core.conversation); the user message, the
+        assistant's tool calls, the tool results and the final answer are appended to it in place.
+        """
+        scheduler = BudgetScheduler(budget or self.budget)
+        request_start = len(history)
+        history.append(user_message(user_input))
 
-    async def process_message(self, history: List[Any], user_input: str) -> AsyncGenerator[Dict[str, Any], None]:
-        # Provider handles history formatting internally or we pass it as is
-        # For Gemini, we append types.Content to history in the provider/caller
-        # For simplicity, we'll assume history is managed by the caller in the provider's expected format
-        
         turn_count = 0
-        while turn_count < MAX_TOOL_TURNS:
+        partial_text = ""
+        while True:
+            reason = scheduler.exhausted_reason()
+            if reason:
+                for stop_event in self._budget_stop(scheduler, reason, partial_text):
+                    yield stop_event
+                return
             turn_count += 1
 
             bot_response_text = ""
             function_calls = []
-            
-            async for event in self.provider.generate_content_stream(history, user_input):
+            accumulator = ToolCallAccumulator()
+            batch = self.dispatcher.batch()
+            dispatched = []  # (call, batch index or None, result if the call did not run), in call order
+            deferred = []    # calls that wait for the end of the stream
+            interrupted = False
+
+            compaction = self.compactor.compact(history, reserved_tokens=self.estimator.prefix_tokens)
+            if compaction.tokens_saved > 0:
+                yield {"type": "context_compacted", **compaction.as_dict()}
+
+            # Catch oversized requests (e.g. a huge snapshot in the latest turn) before the round trip
+            size_event = self.size_guard.enforce(history)
+            if size_event:
+                yield size_event
+                if size_event["type"] == "request_too_large":
+                    # Leave nothing behind that would get the next request refused as well: a new user
+                    # message that is too big is dropped, oversized tool outputs are trimmed
+                    dropped = len(history) == request_start + 1
+                    if dropped:
+                        history.pop()
+                    self.size_guard.recover(history)
+                    note = " The message was not added to the conversation." if dropped else ""
+                    yield {"type": "error", "content": f"Request not sent: about {size_event['estimated_tokens']} tokens, "
+                                                       f"over the limit of {size_event['limit']}.{note}"}
+                    return
+
+            metrics = TurnMetrics(turn_count)
+            stream = self.provider.generate_content_stream(history)
+            async for event in stream:
+                if scheduler.deadline_passed():
+                    # Stop consuming the model's output; what has streamed so far is the partial result
+                    interrupted = True
+                    await stream.aclose()
+                    break
+                if metrics.first_token():
+                    yield {"type": "timing", "phase": "first_token", "turn": turn_count, "seconds": metrics.ttft}
+                metrics.record_usage(usage_from_event(event))
+                completed = []
                 if event["type"] == "gemini_chunk":
                     chunk = event["data"]
                     if chunk.candidates and chunk.candidates[0].content:
                         for part in chunk.candidates[0].content.parts:
                             if part.function_call:
-                                function_calls.append(part.function_call)
+                                fc = part.function_call
+                                completed.append(tool_call(fc.name, fc.args, fc.id, thought_signature=part.thought_signature))
                             if part.text:
                                 if part.thought:
                                     yield {"type": "thoughts", "content": part.text}
@@ -48,42 +191,96 @@ class AICore:
                     if chunk.choices and chunk.choices[0].delta:
                         delta = chunk.choices[0].delta
                         if delta.tool_calls:
-                            # Aggregate tool calls
-                            for tc in delta.tool_calls:
-                                # Groq streams tool calls in chunks
-                                function_calls.append(tc.function)
+                            # Groq streams tool calls as fragments joined by index
+                            completed.extend(accumulator.add(delta.tool_calls))
                         if delta.content:
                             bot_response_text += delta.content
                             yield {"type": "stream_text", "content": delta.content}
                         if hasattr(delta, 'reasoning') and delta.reasoning:
                             yield {"type": "thoughts", "content": delta.reasoning}
 
+                for call in completed:
+                    function_calls.append(call)
+                    # Read-only calls start while the model is still streaming, until the first
+                    # mutating call; everything from there on waits for the end of the turn.
+                    if self.concurrent_tools and not deferred and is_read_only(call["name"]):
+                        async for tool_event in self._admit(call, batch, dispatched, metrics, scheduler):
+                            yield tool_event
+                    else:
+                        deferred.append(call)
+
+            metrics.stream_done()
+            yield {"type": "timing", "phase": "stream_done", "turn": turn_count, "seconds": metrics.stream_duration}
+
+            if not interrupted:
+                # Calls cut off by an interrupted stream have incomplete arguments and are dropped
+                for call in accumulator.finish():
+                    function_calls.append(call)
+                    deferred.append(call)
+
+            if not interrupted:
+                self.estimator.calibrate(metrics.tokens_in)
+            tokens = metrics.tokens_in + metrics.tokens_out
+            if not tokens:
+                tokens = self.estimator.last_estimate + self.estimator.text_tokens(bot_response_text)
+            scheduler.record_tokens(tokens)
+            partial_text = bot_response_text
+
             # Handle tool execution (common logic)
             if function_calls:
-                # Group and call tools
-                for fc in function_calls:
-                    # FC format depends on provider
-                    # Gemini: fc.name, fc.args
-                    # Groq: fc.name, fc.arguments (string)
-                    tool_name = getattr(fc, 'name', None)
-                    tool_args = getattr(fc, 'args', None) or json.loads(getattr(fc, 'arguments', '{}'))
-
-                    yield {"type": "tool_call", "tool_name": tool_name, "tool_args": tool_args}
-                    
-                    tool_result = await self.mcp_session.call_tool(tool_name, tool_args)
-                    
-                    # Update history - this needs to be provider-specific
-                    # For now, we'll yield the need for a response update
-                    yield {"type": "tool_result", "tool_name": tool_name, "result": tool_result}
-                
+                # AICore is the only place tools execute. Denied calls get a denial result instead.
+                # Every result is fed back to the model as a structured tool response. The assistant
+                # message joins the history together with all its results, so an approval prompt that
+                # raises (EOFError, KeyboardInterrupt) leaves no tool call without a result behind.
+                tool_messages = []
+                if self.concurrent_tools:
+                    # Fan out read-only calls, keep mutating calls ordered by path
+                    for call in deferred:
+                        if interrupted:
+                            dispatched.append((call, None, self._budget_result(call)))
+                            continue
+                        async for tool_event in self._admit(call, batch, dispatched, metrics, scheduler):
+                            yield tool_event
+                    results = await batch.results()
+                    for call, index, refusal in dispatched:
+                        allowed = index is not None
+                        tool_result = results[index] if allowed else refusal
+                        latency = batch.latencies[index] if allowed else None
+                        metrics.record_tool(call["name"], latency, allowed)
+                        tool_messages.append(tool_message(call, tool_result_to_text(tool_result)))
+                        yield {"type": "tool_result", "tool_name": call["name"], "result": tool_result, "allowed": allowed, "latency": latency}
+                else:
+                    for call in function_calls:
+                        refusal = await self._refusal(call, scheduler) if not interrupted else self._budget_result(call)
+                        allowed = refusal is None
+                        latency = None
+                        if allowed:
+                            yield {"type": "tool_call", "tool_name": call["name"], "tool_args": call["args"]}
+                            metrics.tools_begin()
+                            started = time.perf_counter()
+                            tool_result = await self.dispatcher.call_tool(call["name"], call["args"])
+                            latency = time.perf_counter() - started
+                        else:
+                            tool_result = refusal
+                        metrics.record_tool(call["name"], latency, allowed)
+                        tool_messages.append(tool_message(call, tool_result_to_text(tool_result)))
+                        yield {"type": "tool_result", "tool_name": call["name"], "result": tool_result, "allowed": allowed, "latency": latency}
+                history.append(assistant_message(bot_response_text, function_calls))
+                history.extend(tool_messages)
+
+                yield {"type": "turn_summary", "metrics": self._turn_summary(metrics)}
+                if scheduler.refused_tool_calls:
+                    # The model asked for more tools than the budget allows
+                    for stop_event in self._budget_stop(scheduler, TOOL_CALLS, partial_text):
+                        yield stop_event
+                    return
                 continue
             else:
+                yield {"type": "turn_summary", "metrics": self._turn_summary(metrics)}
                 if bot_response_text:
-                    yield {"type": "bot_response", "content": bot_response_text}
+                    history.append(assistant_message(bot_response_text))
+                    if not interrupted:
+                        yield {"type": "bot_response", "content": bot_response_text}
+                if interrupted:
+                    continue  # the budget check at the top of the loop reports the stop
                 break
-        
-        if turn_count >= MAX_TOOL_TURNS:
-            yield {"type": "error", "content": "Task may be incomplete due to reaching the maximum number of tool turns."}
-        
-        if turn_count >= MAX_TOOL_TURNS:
-            yield {"type": "error", "content": "Task may be incomplete due to reaching the maximum number of tool turns."}
@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+
+"""
+Headless batch runs: many independent tasks through AICore, a bounded number at a time.
+
+Tasks are JSONL, one object per line:
+    {"id": "bump-deps", "prompt": "Update the pinned versions in requirements.txt", "workdir": "repos/api",
+     "budget": {"deadline_seconds": 300, "max_tool_calls": 30}}
+Only `prompt` is required. Each task gets its own MCP tool server running in its working directory
+(relative paths are resolved against the tasks file), a fresh conversation and its own budget.
+"""
+
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from typing import List, Any, Dict, Optional, Callable
+
+from core.ai_core import AICore
+from core.budget import TaskBudget
+from core.tool_dispatch import is_read_only
+
+PACKAGE_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Permission policies for unattended runs
+ALLOW_ALL = "all"
+READ_ONLY = "read-only"
+
+def permission_policy(policy: str) -> Callable:
+    """
+    Returns a non-interactive permission callback.
+    `all` approves every tool, `read-only` only tools that never modify the workspace, and any other
+    value is a comma-separated list of approved tool names. Denied calls are reported to the model.
+    """
+    if policy == ALLOW_ALL:
+        allowed = None
+    elif policy == READ_ONLY:
+        allowed = set()
+    else:
+        allowed = {name.strip() for name in policy.split(',') if name.strip()}
+
+    async def decide(tool_name: str, tool_args: Dict[str, Any]) -> bool:
+        if allowed is None:
+            return True
+        return is_read_only(tool_name) or tool_name in allowed
+    return decide
+
+class BatchTask:
+    def __init__(self, task_id: str, prompt: str, workdir: str, budget: Optional[Dict[str, Any]] = None):
+        self.id = task_id
+        self.prompt = prompt
+        self.workdir = workdir
+        self.budget = budget or {}
+
+def load_tasks(path: str) -> List[BatchTask]:
+    """
+    Reads a tasks file. Raises ValueError on lines without a prompt, with a missing working directory
+    or with an invalid budget.
+    """
+    base = os.path.dirname(os.path.abspath(path))
+    tasks = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if not record.get("prompt"):
+                raise ValueError(f"{path}:{line_no}: task has no prompt")
+            workdir = os.path.normpath(os.path.join(base, record.get("workdir", ".")))
+            if not os.path.isdir(workdir):
+                raise ValueError(f"{path}:{line_no}: working directory {workdir} does not exist")
+            budget = record.get("budget") or {}
+            try:
+                if not isinstance(budget, dict):
+                    raise ValueError("budget must be an object of limits")
+                TaskBudget().with_overrides(**budget)
+            except ValueError as e:
+                raise ValueError(f"{path}:{line_no}: {e}") from None
+            tasks.append(BatchTask(str(record.get("id", line_no)), record["prompt"], workdir, budget))
+    return tasks
+
+class BatchRunner:
+    """
+    Runs tasks with at most `concurrency` in flight. `provider_factory` returns a fresh provider per
+    task (e.g. ProviderRegistry.session, so HTTP clients are shared). Results are appended to
+    `output_path` as each task finishes.
+    """
+    def __init__(self, provider_factory: Callable[[], Any], output_path: str, concurrency: int = 4,
+                 policy: str = READ_ONLY, budget: Optional[TaskBudget] = None,
+                 on_result: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.provider_factory = provider_factory
+        self.output_path = output_path
+        self.concurrency = max(1, concurrency)
+        self.permission_callback = permission_policy(policy)
+        self.budget = budget or TaskBudget()
+        self.on_result = on_result
+        parent = os.path.dirname(os.path.abspath(output_path))
+        os.makedirs(parent, exist_ok=True)
+
+    async def run(self, tasks: List[BatchTask]) -> Dict[str, Any]:
+        """Runs every task and returns the aggregate report."""
+        queue: asyncio.Queue = asyncio.Queue()
+        for task in tasks:
+            queue.put_nowait(task)
+        results = []
+        started = time.perf_counter()
+
+        async def worker():
+            while not queue.empty():
+                task = queue.get_nowait()
+                result = await self.run_task(task)
+                results.append(result)
+                with open(self.output_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(result) + "\n")
+                if self.on_result:
+                    self.on_result(result)
+
+        await asyncio.gather(*(worker() for _ in range(min(self.concurrency, len(tasks)) or 1)))
+        return self.report(results, time.perf_counter() - started)
+
+    async def run_task(self, task: BatchTask) -> Dict[str, Any]:
+        from mcp import ClientSession
+        from mcp.client.stdio import stdio_client, StdioServerParameters
+
+        result = {"id": task.id, "workdir": task.workdir, "status": "ok", "response": "", "error": None,
+                  "tool_calls": 0, "denied_tool_calls": 0, "turns": 0, "tokens_in": 0, "tokens_out": 0}
+        started = time.perf_counter()
+        server_params = StdioServerParameters(
+            command=sys.executable, args=["-m", "swe_tools.run_server"], cwd=task.workdir,
+            env={**os.environ, 'PYTHONPATH': PACKAGE_ROOT},
+        )
+        try:
+            with open(os.devnull, "w") as errlog:
+                async with stdio_client(server_params, errlog=errlog) as (read, write):
+                    async with ClientSession(read, write) as session:
+                        await session.initialize()
+                        result["startup_seconds"] = round(time.perf_counter() - started, 3)
+                        ai_core = AICore(self.provider_factory(), session, permission_callback=self.permission_callback,
+                                         budget=self.budget, workspace=task.workdir)
+                        history = []
+                        async for event in ai_core.process_message(history, task.prompt,
+                                                                   budget=self.budget.with_overrides(**task.budget)):
+                            self._record_event(result, event)
+        except Exception as e:
+            result["status"] = "error"
+            result["error"] = f"{type(e).__name__}: {e}"
+        result["duration_seconds"] = round(time.perf_counter() - started, 3)
+        return result
+
+    @staticmethod
+    def _record_event(result: Dict[str, Any], event: Dict[str, Any]):
+        if event["type"] == "tool_result":
+            result["tool_calls"] += 1
+            if not event.get("allowed", True):
+                result["denied_tool_calls"] += 1
+        elif event["type"] == "turn_summary":
+            metrics = event["metrics"]
+            result["turns"] += 1
+            result["tokens_in"] += metrics["tokens_in"]
+            result["tokens_out"] += metrics["tokens_out"]
+        elif event["type"] == "bot_response":
+            result["response"] = event["content"]
+        elif event["type"] == "budget_exhausted":
+            result["status"] = "budget_exhausted"
+            result["budget_reason"] = event["reason"]
+            result["response"] = event["partial"]
+        elif event["type"] == "request_too_large":
+            result["status"] = "request_too_large"
+        elif event["type"] == "error" and result["status"] == "ok":
+            result["status"] = "error"
+            result["error"] = event["content"]
+
+    @staticmethod
+    def report(results: List[Dict[str, Any]], wall_seconds: float) -> Dict[str, Any]:
+        durations = sorted(r["duration_seconds"] for r in results)
+        statuses: Dict[str, int] = {}
+        for r in results:
+            statuses[r["status"]] = statuses.get(r["status"], 0) + 1
+        tokens = sum(r["tokens_in"] + r["tokens_out"] for r in results)
+        return {
+            "tasks": len(results),
+            "statuses": statuses,
+            "wall_seconds": round(wall_seconds, 3),
+            "tasks_per_minute": round(len(results) / wall_seconds * 60, 2) if wall_seconds else 0.0,
+            "tokens": tokens,
+            "tokens_per_second": round(tokens / wall_seconds, 1) if wall_seconds else 0.0,
+            "task_seconds_mean": round(statistics.mean(durations), 3) if durations else None,
+            "task_seconds_p50": durations[len(durations) // 2] if durations else None,
+            "task_seconds_p95": durations[min(len(durations) - 1, int(len(durations) * 0.95))] if durations else None,
+        }
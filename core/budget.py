@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+
+import math
+import time
+from typing import Any, Dict, Optional
+
+from core.config import TASK_DEADLINE_SECONDS, TASK_MAX_TOKENS, TASK_MAX_TOOL_CALLS
+
+# Machine-readable reasons for stopping a task early
+DEADLINE = "deadline"
+TOKENS = "tokens"
+TOOL_CALLS = "tool_calls"
+
+# The limits a request may override, with the type each is coerced to
+LIMIT_TYPES = {"deadline_seconds": float, "max_tokens": int, "max_tool_calls": int}
+
+def _limit(name: str, value: Any) -> Any:
+    """Coerces one limit (a number or a numeric string) to its type. Raises ValueError if it is not a valid limit."""
+    kind = LIMIT_TYPES[name]
+    try:
+        number = float(value) if not isinstance(value, bool) else None
+    except (TypeError, ValueError):
+        number = None
+    if number is None or not math.isfinite(number) or number < 0 or (kind is int and not number.is_integer()):
+        expected = "a non-negative number" if kind is float else "a non-negative integer"
+        raise ValueError(f"Budget limit {name} must be {expected}, got {value!r}.")
+    return kind(number)
+
+class TaskBudget:
+    """Limits for one user request. A limit of 0 (or None) means unlimited."""
+    def __init__(self, deadline_seconds: Optional[float] = TASK_DEADLINE_SECONDS,
+                 max_tokens: Optional[int] = TASK_MAX_TOKENS, max_tool_calls: Optional[int] = TASK_MAX_TOOL_CALLS):
+        self.deadline_seconds = deadline_seconds
+        self.max_tokens = max_tokens
+        self.max_tool_calls = max_tool_calls
+
+    def with_overrides(self, **overrides: Any) -> "TaskBudget":
+        """
+        Returns a copy with the given limits replaced; None values keep the current limit. Overrides may
+        come from a client (web UI, tasks file), so unknown limits and values that are not non-negative
+        numbers raise ValueError.
+        """
+        unknown = sorted(set(overrides) - set(LIMIT_TYPES))
+        if unknown:
+            raise ValueError(f"Unknown budget limit(s): {', '.join(unknown)}. Valid limits: {', '.join(LIMIT_TYPES)}.")
+        values = self.as_dict()
+        values.update({k: _limit(k, v) for k, v in overrides.items() if v is not None})
+        return TaskBudget(**values)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"deadline_seconds": self.deadline_seconds, "max_tokens": self.max_tokens, "max_tool_calls": self.max_tool_calls}
+
+class BudgetScheduler:
+    """Tracks wall-clock time, tokens and tool calls spent on a request against its TaskBudget."""
+    def __init__(self, budget: TaskBudget):
+        self.budget = budget
+        self.started = time.monotonic()
+        self.tokens_used = 0
+        self.tool_calls = 0
+        self.refused_tool_calls = 0
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def record_tokens(self, tokens: int):
+        self.tokens_used += tokens
+
+    def deadline_passed(self) -> bool:
+        return bool(self.budget.deadline_seconds) and self.elapsed >= self.budget.deadline_seconds
+
+    def try_tool_call(self) -> bool:
+        """Reserves one tool call. Returns False (and counts the refusal) once the tool-call budget is used up."""
+        if self.budget.max_tool_calls and self.tool_calls >= self.budget.max_tool_calls:
+            self.refused_tool_calls += 1
+            return False
+        self.tool_calls += 1
+        return True
+
+    def exhausted_reason(self) -> Optional[str]:
+        """
+        Returns why no further model turn may start, or None while there is budget left. A spent
+        tool-call budget is not a reason: the model still gets the results of the calls it made, and
+        the task only stops (TOOL_CALLS) once it asks for a call over the limit.
+        """
+        if self.deadline_passed():
+            return DEADLINE
+        if self.budget.max_tokens and self.tokens_used >= self.budget.max_tokens:
+            return TOKENS
+        return None
+
+    def usage(self) -> Dict[str, Any]:
+        return {"elapsed_seconds": round(self.elapsed, 3), "tokens": self.tokens_used, "tool_calls": self.tool_calls,
+                "refused_tool_calls": self.refused_tool_calls}
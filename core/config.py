@@ -1,13 +1,68 @@
 import os
-from dotenv import load_dotenv
-from core.system_prompt import AI_SYSTEM_PROMPT
 
-load_dotenv()
+def _find_dotenv():
+    """The nearest .env in this directory or above, as dotenv.find_dotenv() would pick from here."""
+    path = os.path.dirname(os.path.abspath(__file__))
+    while True:
+        candidate = os.path.join(path, ".env")
+        if os.path.isfile(candidate):
+            return candidate
+        parent = os.path.dirname(path)
+        if parent == path:
+            return None
+        path = parent
+
+# python-dotenv is only imported when there is a .env file to load
+_dotenv_path = _find_dotenv()
+if _dotenv_path:
+    from dotenv import load_dotenv
+    load_dotenv(_dotenv_path)
+
+def __getattr__(name):
+    # The system prompt is large and only needed once a provider is built; load it on first access
+    if name == "SYSTEM_PROMPT":
+        from core.system_prompt import AI_SYSTEM_PROMPT
+        globals()["SYSTEM_PROMPT"] = AI_SYSTEM_PROMPT
+        return AI_SYSTEM_PROMPT
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # --- Configuration ---
 MODEL_NAME = os.environ.get("GOOGLE_MODEL_NAME", "gemini-flash-latest")
 GROQ_MODEL_NAME = os.environ.get("GROQ_MODEL_NAME", "moonshotai/kimi-k2-instruct-0905")
-SYSTEM_PROMPT = AI_SYSTEM_PROMPT
-MAX_TOOL_TURNS = 9
+# Per-task budget (0 means unlimited); see core/budget.py
+TASK_DEADLINE_SECONDS = float(os.environ.get("TASK_DEADLINE_SECONDS", "600"))
+TASK_MAX_TOKENS = int(os.environ.get("TASK_MAX_TOKENS", "1000000"))
+TASK_MAX_TOOL_CALLS = int(os.environ.get("TASK_MAX_TOOL_CALLS", "50"))
+CONCURRENT_TOOL_CALLS = os.environ.get("CONCURRENT_TOOL_CALLS", "true").lower() not in ("0", "false", "no")
+MAX_TOOL_CONCURRENCY = int(os.environ.get("MAX_TOOL_CONCURRENCY", "4"))
+CONTEXT_TOKEN_BUDGET = int(os.environ.get("CONTEXT_TOKEN_BUDGET", "100000"))  # 0 disables compaction
+GEMINI_CONTEXT_CACHE = os.environ.get("GEMINI_CONTEXT_CACHE", "false").lower() in ("1", "true", "yes")
+GEMINI_CONTEXT_CACHE_TTL = int(os.environ.get("GEMINI_CONTEXT_CACHE_TTL", "3600"))
+TOOL_CACHE_MAX_BYTES = int(os.environ.get("TOOL_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))  # 0 disables the read-only tool cache
+METRICS_LOG_FILE = os.environ.get("METRICS_LOG_FILE")  # JSONL file for per-turn timing summaries
+CONTEXT_KEEP_RECENT_TURNS = int(os.environ.get("CONTEXT_KEEP_RECENT_TURNS", "2"))
+# Hard limit on the estimated size of one request (0 disables) and what to do above it: trim, refuse or off
+REQUEST_TOKEN_LIMIT = int(os.environ.get("REQUEST_TOKEN_LIMIT", "200000"))
+REQUEST_SIZE_POLICY = os.environ.get("REQUEST_SIZE_POLICY", "trim").lower()
 DEFAULT_PROVIDER = os.environ.get("DEFAULT_PROVIDER", "groq")
+# Optional second, faster model for simple turns (see core/router.py); empty disables routing
+ROUTER_FAST_MODEL = os.environ.get("ROUTER_FAST_MODEL", "")
+ROUTER_FAST_MAX_PROMPT_TOKENS = int(os.environ.get("ROUTER_FAST_MAX_PROMPT_TOKENS", "16000"))
+ROUTER_SIMPLE_MESSAGE_CHARS = int(os.environ.get("ROUTER_SIMPLE_MESSAGE_CHARS", "300"))
+# How the client reaches the tool server: stdio (a new server per session) or daemon (see core/tool_transport.py)
+TOOL_TRANSPORT = os.environ.get("TOOL_TRANSPORT", "stdio").lower()
+TOOL_DAEMON_IDLE_SECONDS = float(os.environ.get("TOOL_DAEMON_IDLE_SECONDS", "1800"))  # 0 keeps the daemon running
+# read_codebase_snapshot limits (0 = unlimited) and the threads that read files for it
+SNAPSHOT_MAX_FILE_BYTES = int(os.environ.get("SNAPSHOT_MAX_FILE_BYTES", str(256 * 1024)))
+SNAPSHOT_MAX_TOTAL_BYTES = int(os.environ.get("SNAPSHOT_MAX_TOTAL_BYTES", str(1024 * 1024)))
+SNAPSHOT_READ_WORKERS = int(os.environ.get("SNAPSHOT_READ_WORKERS", "8"))
+RESTORE_WRITE_WORKERS = int(os.environ.get("RESTORE_WRITE_WORKERS", "8"))  # threads writing files for write_files_from_snapshot
+# Seconds a paged listing (see swe_tools/paging.py) waits for its next page before it is dropped
+PAGE_CURSOR_TTL_SECONDS = float(os.environ.get("PAGE_CURSOR_TTL_SECONDS", "600"))
+# Directory listings for the tools and the CLI (see swe_tools/workspace_index.py): inotify, poll or off
+WORKSPACE_INDEX = os.environ.get("WORKSPACE_INDEX", "inotify").lower()
+WORKSPACE_INDEX_MAX_DIRS = int(os.environ.get("WORKSPACE_INDEX_MAX_DIRS", "20000"))  # directories kept (and watched) per index
+# Converted tool declarations per provider (see core/tool_schema_cache.py); empty disables the cache
+TOOL_SCHEMA_CACHE_DIR = os.environ.get("TOOL_SCHEMA_CACHE_DIR", os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"), "clia", "tool_schemas"))
 GROQ_BASE_URL = os.environ.get("GROQ_BASE_URL")
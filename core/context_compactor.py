@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+
+import json
+from typing import List, Any, Dict, Optional
+
+from core.config import CONTEXT_TOKEN_BUDGET, CONTEXT_KEEP_RECENT_TURNS
+from core.token_estimator import TokenEstimator
+
+SUMMARY_HEADER = "[Summary of earlier conversation]"
+
+def _clip(text: str, limit: int) -> str:
+    text = " ".join((text or "").split())
+    return text if len(text) <= limit else text[:limit] + "..."
+
+class CompactionReport:
+    def __init__(self, tokens_before: int, tokens_after: int, stubbed_tool_outputs: int = 0, folded_messages: int = 0):
+        self.tokens_before = tokens_before
+        self.tokens_after = tokens_after
+        self.stubbed_tool_outputs = stubbed_tool_outputs
+        self.folded_messages = folded_messages
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_before - self.tokens_after
+
+    def as_dict(self) -> Dict[str, int]:
+        return {
+            "tokens_before": self.tokens_before,
+            "tokens_after": self.tokens_after,
+            "tokens_saved": self.tokens_saved,
+            "stubbed_tool_outputs": self.stubbed_tool_outputs,
+            "folded_messages": self.folded_messages,
+        }
+
+class ContextCompactor:
+    """
+    Keeps a conversation under a token budget.
+    The most recent turns are never touched. Older tool outputs are first cut down to short stubs;
+    if that is not enough, the oldest turns are folded into a single summary message.
+    A turn starts at a user message and includes the assistant's tool calls and their results,
+    so tool calls and tool results are always removed together.
+    Token counts come from `estimator` (see core.token_estimator), calibrated per provider.
+    """
+    def __init__(self, token_budget: int = CONTEXT_TOKEN_BUDGET, keep_recent_turns: int = CONTEXT_KEEP_RECENT_TURNS,
+                 tool_stub_chars: int = 200, summary_chars: int = 300, estimator: Optional[TokenEstimator] = None):
+        self.estimator = estimator or TokenEstimator()
+        self.token_budget = token_budget
+        self.keep_recent_turns = max(1, keep_recent_turns)
+        self.tool_stub_chars = tool_stub_chars
+        self.summary_chars = summary_chars
+
+    def compact(self, history: List[Dict[str, Any]], reserved_tokens: int = 0) -> CompactionReport:
+        """
+        Compacts `history` in place. `reserved_tokens` accounts for what is sent alongside the history
+        (system prompt, tool declarations).
+        """
+        before = self.estimator.history_tokens(history) + reserved_tokens
+        report = CompactionReport(before, before)
+        if self.token_budget <= 0 or before <= self.token_budget:
+            return report
+
+        starts = self._turn_starts(history)
+        protected_from = starts[-self.keep_recent_turns] if len(starts) >= self.keep_recent_turns else 0
+        total = before
+
+        # 1. Stub old tool outputs, oldest first
+        for i in range(protected_from):
+            if total <= self.token_budget:
+                break
+            message = history[i]
+            if message["role"] != "tool" or message.get("compacted"):
+                continue
+            old_tokens = self.estimator.message_tokens(message)
+            history[i] = self._stub(message)
+            total += self.estimator.message_tokens(history[i]) - old_tokens
+            report.stubbed_tool_outputs += 1
+
+        # 2. Fold the oldest turns into a summary
+        if total > self.token_budget:
+            summary = self._existing_summary(history)
+            first = 1 if summary is not None else 0
+            folded_until = first
+            for start, end in zip(starts, starts[1:]):
+                if start < first:
+                    continue
+                if total <= self.token_budget or end > protected_from:
+                    break
+                lines = self._summarize_turn(history[start:end])
+                total -= self.estimator.history_tokens(history[start:end])
+                summary_lines = (summary or {}).get("content", SUMMARY_HEADER).split("\n")
+                new_summary = {"role": "user", "content": "\n".join(summary_lines + lines), "summary": True}
+                total += self.estimator.message_tokens(new_summary) - (self.estimator.message_tokens(summary) if summary else 0)
+                summary = new_summary
+                folded_until = end
+            if folded_until > first:
+                report.folded_messages = folded_until - first
+                history[:folded_until] = [summary]
+
+        report.tokens_after = self.estimator.history_tokens(history) + reserved_tokens
+        return report
+
+    @staticmethod
+    def _turn_starts(history: List[Dict[str, Any]]) -> List[int]:
+        return [i for i, m in enumerate(history) if m["role"] == "user" and not m.get("summary")]
+
+    @staticmethod
+    def _existing_summary(history: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        return history[0] if history and history[0].get("summary") else None
+
+    def _stub(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        content = message.get("content") or ""
+        if len(content) <= self.tool_stub_chars:
+            return dict(message, compacted=True)
+        stub = (f"[Output of `{message['name']}` truncated by context compaction, {len(content) - self.tool_stub_chars} "
+                f"characters omitted. Call the tool again if you need it.]\n{content[:self.tool_stub_chars]}")
+        return dict(message, content=stub, compacted=True)
+
+    def _summarize_turn(self, messages: List[Dict[str, Any]]) -> List[str]:
+        lines = []
+        for m in messages:
+            if m["role"] == "user":
+                lines.append(f"- User asked: {_clip(m['content'], self.summary_chars)}")
+            elif m["role"] == "assistant":
+                for call in m.get("tool_calls", []):
+                    lines.append(f"- Assistant called `{call['name']}` with {_clip(json.dumps(call['args']), 80)}")
+                if m.get("content"):
+                    lines.append(f"- Assistant replied: {_clip(m['content'], self.summary_chars)}")
+        return lines
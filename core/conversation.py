@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+
+"""
+Provider-neutral conversation model.
+
+History is a plain list of message dicts that every provider converts to its own format:
+    {"role": "user", "content": str}
+    {"role": "assistant", "content": str, "tool_calls": [{"id": str, "name": str, "args": dict}]}
+    {"role": "tool", "tool_call_id": str, "name": str, "content": str}
+"""
+
+import uuid
+from typing import List, Any, Dict, Optional
+
+def user_message(text: str) -> Dict[str, Any]:
+    return {"role": "user", "content": text}
+
+def assistant_message(text: str, tool_calls: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+    message = {"role": "assistant", "content": text}
+    if tool_calls:
+        message["tool_calls"] = tool_calls
+    return message
+
+def tool_call(name: str, args: Dict[str, Any], call_id: Optional[str] = None, **extra: Any) -> Dict[str, Any]:
+    """Describes one tool call made by the assistant. Extra keys carry provider data (e.g. Gemini thought signatures)."""
+    call = {"id": call_id or f"call_{uuid.uuid4().hex[:12]}", "name": name, "args": args or {}}
+    call.update({k: v for k, v in extra.items() if v is not None})
+    return call
+
+def tool_message(call: Dict[str, Any], content: str) -> Dict[str, Any]:
+    return {"role": "tool", "tool_call_id": call["id"], "name": call["name"], "content": content}
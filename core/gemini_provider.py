@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+
+"""
+Gemini provider. Kept apart from core.providers so google-genai is only imported when Gemini is used.
+"""
+
+import asyncio
+import time
+from typing import List, Any, Dict, AsyncGenerator, Optional
+
+from google.genai import types as gemini_types
+from google.genai.client import Client as GeminiClient
+
+from core import config
+from core.config import GEMINI_CONTEXT_CACHE, GEMINI_CONTEXT_CACHE_TTL
+from core.providers import PromptCacheStats
+
+def _append_gemini_content(contents: List[gemini_types.Content], m: Dict[str, Any]):
+    """Appends one neutral message to Gemini contents. Consecutive tool results share one turn of `function_response` parts."""
+    if m['role'] == 'tool':
+        part = gemini_types.Part(function_response=gemini_types.FunctionResponse(name=m['name'], response={"result": m['content']}))
+        if contents and contents[-1].role == 'user' and contents[-1].parts and contents[-1].parts[-1].function_response:
+            contents[-1].parts.append(part)
+        else:
+            contents.append(gemini_types.Content(role='user', parts=[part]))
+    elif m['role'] == 'assistant':
+        parts = [gemini_types.Part.from_text(text=m['content'])] if m.get('content') else []
+        for tc in m.get('tool_calls', []):
+            parts.append(gemini_types.Part(
+                function_call=gemini_types.FunctionCall(name=tc['name'], args=tc['args']),
+                thought_signature=tc.get('thought_signature'),
+            ))
+        contents.append(gemini_types.Content(role='model', parts=parts))
+    else:
+        contents.append(gemini_types.Content(role=m['role'], parts=[gemini_types.Part.from_text(text=m['content'])]))
+
+def to_gemini_contents(history: List[Dict[str, Any]]) -> List[gemini_types.Content]:
+    """Converts neutral history into Gemini contents. Consecutive tool results become one turn of `function_response` parts."""
+    contents = []
+    for m in history:
+        _append_gemini_content(contents, m)
+    return contents
+
+class GeminiConversation:
+    """
+    Gemini contents for one conversation, converted incrementally.
+
+    Messages are converted once and the Content objects are kept across calls. `sync` compares the
+    history with the messages converted so far, so appended turns are converted on their own, while
+    messages replaced in place (context compaction) roll the conversion back to the first changed one.
+    """
+    def __init__(self):
+        self.messages: List[Dict[str, Any]] = []
+        self.contents: List[gemini_types.Content] = []
+        self._ends: List[tuple] = []  # (number of contents, parts in the last content) after each message
+
+    def sync(self, history: List[Dict[str, Any]]) -> List[gemini_types.Content]:
+        common = min(len(history), len(self.messages))
+        # List equality checks identity first, so an unchanged prefix costs one C-level pass
+        if history[:common] != self.messages[:common]:
+            common = next(i for i in range(common) if history[i] != self.messages[i])
+        if common < len(self.messages):
+            self._truncate(common)
+        for m in history[common:]:
+            _append_gemini_content(self.contents, m)
+            self.messages.append(m)
+            self._ends.append((len(self.contents), len(self.contents[-1].parts)))
+        return self.contents
+
+    def _truncate(self, count: int):
+        del self.messages[count:]
+        del self._ends[count:]
+        if not count:
+            self.contents.clear()
+            return
+        n_contents, n_parts = self._ends[-1]
+        del self.contents[n_contents:]
+        # A tool result may have been grouped into the same content as later ones
+        del self.contents[-1].parts[n_parts:]
+
+def stable_gemini_tools(gemini_tools: List[Any]) -> List[gemini_types.Tool]:
+    """
+    Returns the tools as a single Tool with function declarations sorted by name, so the request prefix
+    is byte-identical across calls and sessions. Accepts FunctionDeclarations or Tools.
+    """
+    declarations = []
+    for tool in gemini_tools:
+        if isinstance(tool, gemini_types.Tool):
+            declarations.extend(tool.function_declarations or [])
+        else:
+            declarations.append(tool)
+    declarations.sort(key=lambda d: d.name)
+    return [gemini_types.Tool(function_declarations=declarations)]
+
+class GeminiContextCache:
+    """
+    The system prompt and tools uploaded once as Gemini cached content. Requests reference it by name;
+    it is recreated shortly before its TTL runs out. One instance can be shared by many providers.
+    """
+    def __init__(self, client: GeminiClient, model_name: str, gemini_tools: List[gemini_types.Tool],
+                 ttl_seconds: int = GEMINI_CONTEXT_CACHE_TTL):
+        self.client = client
+        self.model_name = model_name
+        self.gemini_tools = gemini_tools
+        self.ttl_seconds = ttl_seconds
+        self.enabled = True
+        self.error: Optional[str] = None  # why caching was turned off
+        self._name = None
+        self._expires_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def name(self):
+        """Returns the cached content name, creating it if needed, or None if caching is unavailable."""
+        if not self.enabled:
+            return None
+        async with self._lock:
+            if self._name is None or time.monotonic() >= self._expires_at:
+                try:
+                    cached = await self.client.aio.caches.create(
+                        model=self.model_name,
+                        config=gemini_types.CreateCachedContentConfig(
+                            display_name="clia-system-prompt-and-tools",
+                            system_instruction=config.SYSTEM_PROMPT,
+                            tools=self.gemini_tools,
+                            ttl=f"{self.ttl_seconds}s",
+                        )
+                    )
+                except Exception as e:
+                    # Model without caching support or a prefix below the minimum cache size: stay uncached
+                    self.error = f"{type(e).__name__}: {e}"
+                    self.enabled = False
+                    return None
+                self._name = cached.name
+                # Refresh a little before the server-side expiry
+                self._expires_at = time.monotonic() + max(self.ttl_seconds - 60, self.ttl_seconds / 2)
+            return self._name
+
+    async def aclose(self):
+        """Deletes the uploaded cached content, if any."""
+        if self._name:
+            try:
+                await self.client.aio.caches.delete(name=self._name)
+            except Exception:
+                pass
+            self._name = None
+
+class GeminiProvider:
+    """
+    Streams Gemini replies. The system prompt and tools are built into one config at construction
+    (tools sorted by name) so every request shares the same prefix. With `use_context_cache`, the
+    prefix is uploaded once as cached content and later requests reference it by name; pass
+    `context_cache` to share one upload between providers.
+    """
+    name = "gemini"
+
+    def __init__(self, client: GeminiClient, model_name: str, gemini_tools: List[gemini_types.Tool],
+                 use_context_cache: bool = GEMINI_CONTEXT_CACHE, cache_ttl_seconds: int = GEMINI_CONTEXT_CACHE_TTL,
+                 context_cache: Optional[GeminiContextCache] = None):
+        self.client = client
+        self.model_name = model_name
+        self.gemini_tools = stable_gemini_tools(gemini_tools)
+        self.cache_stats = PromptCacheStats()
+        self.conversation = GeminiConversation()
+        self._owns_context_cache = context_cache is None and use_context_cache
+        if self._owns_context_cache:
+            context_cache = GeminiContextCache(client, model_name, self.gemini_tools, cache_ttl_seconds)
+        self.context_cache = context_cache
+        self._config = gemini_types.GenerateContentConfig(
+            tools=self.gemini_tools,
+            system_instruction=config.SYSTEM_PROMPT,
+            thinking_config=gemini_types.ThinkingConfig(include_thoughts=True)
+        )
+
+    async def _request_config(self) -> gemini_types.GenerateContentConfig:
+        cached_content = await self.context_cache.name() if self.context_cache else None
+        if self.context_cache and self.context_cache.error:
+            self.cache_stats.context_cache_error = self.context_cache.error
+        if cached_content is None:
+            return self._config
+        return gemini_types.GenerateContentConfig(
+            cached_content=cached_content,
+            thinking_config=gemini_types.ThinkingConfig(include_thoughts=True)
+        )
+
+    async def aclose(self):
+        """Deletes the context cache if this provider created it; shared caches belong to their owner."""
+        if self._owns_context_cache:
+            await self.context_cache.aclose()
+
+    async def generate_content_stream(self, history: List[Dict[str, Any]]) -> AsyncGenerator[Dict[str, Any], None]:
+        gemini_history = self.conversation.sync(history)
+        
+        stream = await self.client.aio.models.generate_content_stream(
+            model=self.model_name,
+            contents=gemini_history,
+            config=await self._request_config()
+        )
+
+        usage = None
+        async for chunk in stream:
+            if chunk.usage_metadata is not None:
+                usage = chunk.usage_metadata
+            yield {"type": "gemini_chunk", "data": chunk}
+        if usage is not None:
+            self.cache_stats.record(usage.prompt_token_count, usage.cached_content_token_count)
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import time
+from datetime import datetime
+from typing import List, Any, Dict, Optional, Tuple
+
+def usage_from_event(event: Dict[str, Any]) -> Optional[Tuple[int, int]]:
+    """Returns (tokens_in, tokens_out) from a provider chunk's usage metadata, if it carries any."""
+    chunk = event.get("data")
+    if event["type"] == "gemini_chunk":
+        usage = getattr(chunk, 'usage_metadata', None)
+        if usage and usage.prompt_token_count is not None:
+            return usage.prompt_token_count, (usage.candidates_token_count or 0) + (usage.thoughts_token_count or 0)
+    elif event["type"] == "groq_chunk":
+        # Groq reports usage on the last chunk under x_groq, OpenAI-compatible servers under usage
+        x_groq = getattr(chunk, 'x_groq', None)
+        usage = getattr(x_groq, 'usage', None) or getattr(chunk, 'usage', None)
+        if usage and usage.prompt_tokens is not None:
+            return usage.prompt_tokens, usage.completion_tokens or 0
+    return None
+
+class TurnMetrics:
+    """Timing and token counts for one model turn: one provider call and the tools it requested."""
+    def __init__(self, turn: int):
+        self.turn = turn
+        self.started = time.perf_counter()
+        self.first_token_at: Optional[float] = None
+        self.stream_done_at: Optional[float] = None
+        self.tokens_in = 0
+        self.tokens_out = 0
+        self.tools: List[Dict[str, Any]] = []
+        self.tools_started: Optional[float] = None
+        self.tools_done_at: Optional[float] = None
+
+    def first_token(self) -> bool:
+        """Marks the arrival of a chunk. Returns True for the first one."""
+        if self.first_token_at is not None:
+            return False
+        self.first_token_at = time.perf_counter()
+        return True
+
+    def stream_done(self):
+        self.stream_done_at = time.perf_counter()
+
+    def record_usage(self, usage: Optional[Tuple[int, int]]):
+        if usage:
+            self.tokens_in, self.tokens_out = usage
+
+    def tools_begin(self):
+        """Marks the first tool submission of the turn (possibly while the model is still streaming)."""
+        if self.tools_started is None:
+            self.tools_started = time.perf_counter()
+
+    def record_tool(self, name: str, latency: Optional[float], allowed: bool = True):
+        self.tools_begin()
+        self.tools.append({"name": name, "latency": round(latency, 6) if latency is not None else None, "allowed": allowed})
+        self.tools_done_at = time.perf_counter()
+
+    @property
+    def ttft(self) -> Optional[float]:
+        return self.first_token_at - self.started if self.first_token_at is not None else None
+
+    @property
+    def stream_duration(self) -> Optional[float]:
+        if self.first_token_at is None or self.stream_done_at is None:
+            return None
+        return self.stream_done_at - self.first_token_at
+
+    def as_dict(self) -> Dict[str, Any]:
+        def r(value):
+            return round(value, 6) if value is not None else None
+        return {
+            "turn": self.turn,
+            "ttft": r(self.ttft),
+            "stream_duration": r(self.stream_duration),
+            "tokens_in": self.tokens_in,
+            "tokens_out": self.tokens_out,
+            "tools": self.tools,
+            "tool_wall_time": r(self.tools_done_at - self.tools_started) if self.tools else None,
+            # Tool time not hidden behind the model's stream (early-dispatched calls overlap it)
+            "tool_wait_after_stream": r(max(0.0, self.tools_done_at - self.stream_done_at)) if self.tools and self.stream_done_at else None,
+            "turn_duration": r(time.perf_counter() - self.started),
+        }
+
+def format_turn_summary(metrics: Dict[str, Any]) -> str:
+    """One-line human readable version of a turn summary."""
+    def s(value):
+        return f"{value:.2f}s" if value is not None else "n/a"
+    line = (f"Turn {metrics['turn']}: TTFT {s(metrics['ttft'])}, stream {s(metrics['stream_duration'])}, "
+            f"tokens {metrics['tokens_in']} in / {metrics['tokens_out']} out")
+    if metrics["tools"]:
+        tools = ", ".join(f"{t['name']} {s(t['latency'])}" for t in metrics["tools"])
+        line += f", tools {s(metrics['tool_wall_time'])} ({tools})"
+    if metrics.get("tool_cache"):
+        cache = metrics["tool_cache"]
+        line += f", tool cache {cache['hits']} hits / {cache['misses']} misses"
+    if metrics.get("route"):
+        line += f", routed to {metrics['route']['route']} ({metrics['route']['reason']})"
+    if metrics.get("prompt_cache"):
+        line += f", prompt cache {metrics['prompt_cache']['cached_input_tokens']}/{metrics['prompt_cache']['input_tokens']} input tokens cached"
+        if metrics["prompt_cache"].get("context_cache_error"):
+            line += f" (context caching off: {metrics['prompt_cache']['context_cache_error']})"
+    return line
+
+class MetricsLogger:
+    """Appends turn summaries to a JSONL file for offline analysis."""
+    def __init__(self, path: str, session_id: Optional[str] = None):
+        self.path = path
+        self.session_id = session_id
+        parent = os.path.dirname(os.path.abspath(path))
+        os.makedirs(parent, exist_ok=True)
+
+    def log(self, metrics: Dict[str, Any], **extra: Any):
+        record = {"timestamp": datetime.now().isoformat(), "session": self.session_id, **extra, **metrics}
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
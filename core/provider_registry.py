@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+
+import os
+from typing import List, Any, Dict, Optional
+
+from core.config import (DEFAULT_PROVIDER, MODEL_NAME, GROQ_MODEL_NAME, GROQ_BASE_URL,
+                         GEMINI_CONTEXT_CACHE, GEMINI_CONTEXT_CACHE_TTL)
+from core.providers import GroqProvider
+from core.tool_schema_cache import ToolSchemaCache
+
+PROVIDERS = ("groq", "gemini")
+
+class ProviderRegistry:
+    """
+    Application-wide provider state for servers with many sessions (the web UI).
+
+    Tool schemas are converted once per provider (or loaded from `schema_cache`), and each provider
+    SDK client (with its HTTP connection pool) is created once on first use and shared. `session()`
+    hands out a lightweight provider per conversation that only carries per-session state such as
+    prompt cache statistics.
+    Call `aclose()` on shutdown.
+    """
+    def __init__(self, mcp_tools: List[Any], use_gemini_context_cache: bool = GEMINI_CONTEXT_CACHE,
+                 schema_cache: Optional[ToolSchemaCache] = None):
+        self.mcp_tools = mcp_tools
+        self.schema_cache = schema_cache or ToolSchemaCache()
+        self.use_gemini_context_cache = use_gemini_context_cache
+        self._groq_tools = None
+        self._gemini_tools = None
+        self._groq_client = None
+        self._gemini_client = None
+        self._gemini_caches: Dict[str, Any] = {}  # model name -> GeminiContextCache, one upload per model
+
+    @property
+    def groq_tools(self) -> List[Dict[str, Any]]:
+        if self._groq_tools is None:
+            self._groq_tools = self.schema_cache.get("groq", self.mcp_tools).declarations
+        return self._groq_tools
+
+    @property
+    def gemini_tools(self) -> List[Any]:
+        if self._gemini_tools is None:
+            self._gemini_tools = self.schema_cache.get("gemini", self.mcp_tools).declarations
+        return self._gemini_tools
+
+    @property
+    def groq_client(self):
+        if self._groq_client is None:
+            from groq import AsyncGroq
+            self._groq_client = AsyncGroq(api_key=os.environ.get("GROQ_API_KEY"), base_url=GROQ_BASE_URL)
+        return self._groq_client
+
+    @property
+    def gemini_client(self):
+        if self._gemini_client is None:
+            from google import genai
+            self._gemini_client = genai.Client(api_key=os.environ.get("GOOGLE_API_KEY"))
+        return self._gemini_client
+
+    def session(self, provider_name: Optional[str] = None, model_name: Optional[str] = None):
+        """Returns a provider for one conversation, backed by the shared clients and tool schemas."""
+        provider_name = provider_name or DEFAULT_PROVIDER
+        if provider_name == "gemini":
+            from core.gemini_provider import GeminiProvider, GeminiContextCache
+            model_name = model_name or MODEL_NAME
+            context_cache = None
+            if self.use_gemini_context_cache:
+                context_cache = self._gemini_caches.get(model_name)
+                if context_cache is None:
+                    context_cache = GeminiContextCache(self.gemini_client, model_name, self.gemini_tools, GEMINI_CONTEXT_CACHE_TTL)
+                    self._gemini_caches[model_name] = context_cache
+            return GeminiProvider(self.gemini_client, model_name, self.gemini_tools,
+                                  use_context_cache=False, context_cache=context_cache)
+        if provider_name == "groq":
+            return GroqProvider(self.groq_client, model_name or GROQ_MODEL_NAME, self.groq_tools, tools_prepared=True)
+        raise ValueError(f"Unknown provider '{provider_name}'. Expected one of: {', '.join(PROVIDERS)}")
+
+    async def aclose(self):
+        """Deletes shared Gemini context caches and closes the clients' connection pools."""
+        for context_cache in self._gemini_caches.values():
+            await context_cache.aclose()
+        self._gemini_caches.clear()
+        if self._groq_client is not None:
+            await self._groq_client.close()
+            self._groq_client = None
+        if self._gemini_client is not None:
+            await self._gemini_client.aio.aclose()
+            self._gemini_client.close()
+            self._gemini_client = None
@@ -1,50 +1,93 @@
 # -*- coding: utf-8 -*-
 
-import asyncio
-from typing import List, Any, Dict, AsyncGenerator, Protocol
-from google.genai import types as gemini_types
-from google.genai.client import Client as GeminiClient
-from groq import AsyncGroq
 import json
-from core.config import SYSTEM_PROMPT
+from typing import List, Any, Dict, AsyncGenerator, Optional, Protocol, TYPE_CHECKING
+
+from core import config
+
+if TYPE_CHECKING:
+    from groq import AsyncGroq
+
+# Gemini support lives in core.gemini_provider so google-genai is only imported when it is used
+_GEMINI_NAMES = frozenset({"GeminiProvider", "GeminiContextCache", "GeminiConversation", "to_gemini_contents", "stable_gemini_tools"})
+
+def __getattr__(name):
+    if name in _GEMINI_NAMES:
+        from core import gemini_provider
+        return getattr(gemini_provider, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 class BaseProvider(Protocol):
-    async def generate_content_stream(self, history: List[Any], system_instruction: str) -> AsyncGenerator[Dict[str, Any], None]:
+    async def generate_content_stream(self, history: List[Dict[str, Any]]) -> AsyncGenerator[Dict[str, Any], None]:
+        """Streams a reply to `history`, a provider-neutral message list (see core.conversation)."""
         ...
 
-class GeminiProvider:
-    def __init__(self, client: GeminiClient, model_name: str, gemini_tools: List[gemini_types.Tool]):
-        self.client = client
-        self.model_name = model_name
-        self.gemini_tools = gemini_tools
+def to_openai_messages(history: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Converts neutral history into OpenAI-style chat messages, including assistant tool calls and `tool` messages."""
+    messages = []
+    for m in history:
+        if m['role'] == 'tool':
+            messages.append({"role": "tool", "tool_call_id": m['tool_call_id'], "content": m['content']})
+        elif m['role'] == 'assistant' and m.get('tool_calls'):
+            messages.append({
+                "role": "assistant",
+                "content": m.get('content') or None,
+                "tool_calls": [
+                    {"id": tc['id'], "type": "function", "function": {"name": tc['name'], "arguments": json.dumps(tc['args'])}}
+                    for tc in m['tool_calls']
+                ],
+            })
+        else:
+            messages.append({"role": m['role'], "content": m['content']})
+    return messages
 
-    async def generate_content_stream(self, history: List[Any], system_instruction: str) -> AsyncGenerator[Dict[str, Any], None]:
-        config = gemini_types.GenerateContentConfig(
-            tools=self.gemini_tools,
-            system_instruction=system_instruction,
-            thinking_config=gemini_types.ThinkingConfig(include_thoughts=True)
-        )
-        
-        stream = await self.client.aio.models.generate_content_stream(
-            model=self.model_name,
-            contents=history,
-            config=config
-        )
+class PromptCacheStats:
+    """Counts cached versus uncached input tokens as reported by the provider's usage metadata."""
+    def __init__(self):
+        self.requests = 0
+        self.input_tokens = 0
+        self.cached_input_tokens = 0
+        self.context_cache_error: Optional[str] = None  # why explicit context caching was turned off, if it was
 
-        async for chunk in stream:
-            yield {"type": "gemini_chunk", "data": chunk}
+    def record(self, input_tokens: int, cached_tokens: int):
+        self.requests += 1
+        self.input_tokens += input_tokens or 0
+        self.cached_input_tokens += cached_tokens or 0
+
+    @property
+    def uncached_input_tokens(self) -> int:
+        return self.input_tokens - self.cached_input_tokens
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "input_tokens": self.input_tokens,
+            "cached_input_tokens": self.cached_input_tokens,
+            "uncached_input_tokens": self.uncached_input_tokens,
+            "cached_ratio": round(self.cached_input_tokens / self.input_tokens, 3) if self.input_tokens else 0.0,
+            **({"context_cache_error": self.context_cache_error} if self.context_cache_error else {}),
+        }
+
+def stable_openai_tools(tools: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Returns the tool definitions sorted by name with deterministically ordered keys."""
+    ordered = sorted(tools, key=lambda t: t["function"]["name"])
+    return [json.loads(json.dumps(t, sort_keys=True)) for t in ordered]
 
 class GroqProvider:
-    def __init__(self, client: AsyncGroq, model_name: str, tools: List[Dict[str, Any]]):
+    name = "groq"
+
+    def __init__(self, client: "AsyncGroq", model_name: str, tools: List[Dict[str, Any]], tools_prepared: bool = False):
         self.client = client
         self.model_name = model_name
-        self.tools = tools
+        # System message and tools form a fixed prefix so provider-side prefix caches can hit.
+        # `tools_prepared` means `tools` already went through stable_openai_tools (see ProviderRegistry).
+        self.tools = tools if tools_prepared else stable_openai_tools(tools)
+        self._system_message = {"role": "system", "content": config.SYSTEM_PROMPT}
+        self.cache_stats = PromptCacheStats()
 
-    async def generate_content_stream(self, history: List[Any], user_input: str) -> AsyncGenerator[Dict[str, Any], None]:
-        # History is a list of {"role": "...", "content": "..."}
-        messages = [{"role": "system", "content": SYSTEM_PROMPT}]
-        messages.extend(history)
-        messages.append({"role": "user", "content": user_input})
+    async def generate_content_stream(self, history: List[Dict[str, Any]]) -> AsyncGenerator[Dict[str, Any], None]:
+        messages = [self._system_message]
+        messages.extend(to_openai_messages(history))
 
         # Groq stream
         stream = await self.client.chat.completions.create(
@@ -58,34 +101,8 @@ class GroqProvider:
         )
 
         async for chunk in stream:
+            usage = getattr(getattr(chunk, 'x_groq', None), 'usage', None) or getattr(chunk, 'usage', None)
+            if usage:
+                details = getattr(usage, 'prompt_tokens_details', None)
+                self.cache_stats.record(usage.prompt_tokens, getattr(details, 'cached_tokens', 0) if details else 0)
             yield {"type": "groq_chunk", "data": chunk}
-
-class GeminiProvider:
-    def __init__(self, client: GeminiClient, model_name: str, gemini_tools: List[gemini_types.Tool]):
-        self.client = client
-        self.model_name = model_name
-        self.gemini_tools = gemini_tools
-
-    async def generate_content_stream(self, history: List[Any], user_input: str) -> AsyncGenerator[Dict[str, Any], None]:
-        # Convert simple history to Gemini Content if necessary
-        gemini_history = []
-        for m in history:
-            role = 'model' if m['role'] == 'assistant' else m['role']
-            gemini_history.append(gemini_types.Content(role=role, parts=[gemini_types.Part.from_text(text=m['content'])]))
-        
-        gemini_history.append(gemini_types.Content(role='user', parts=[gemini_types.Part.from_text(text=user_input)]))
-
-        config = gemini_types.GenerateContentConfig(
-            tools=self.gemini_tools,
-            system_instruction=SYSTEM_PROMPT,
-            thinking_config=gemini_types.ThinkingConfig(include_thoughts=True)
-        )
-        
-        stream = await self.client.aio.models.generate_content_stream(
-            model=self.model_name,
-            contents=gemini_history,
-            config=config
-        )
-
-        async for chunk in stream:
-            yield {"type": "gemini_chunk", "data": chunk}
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+
+"""
+Offline record/replay of provider streams.
+
+Fixtures are JSONL files with one provider chunk per line:
+    {"turn": 0, "type": "groq_chunk", "data": {...}}
+`turn` counts generate_content_stream calls within the recorded session and `data` is the chunk's
+JSON dump, so recorded sessions replay through AICore exactly like live ones, tool calls included.
+"""
+
+import asyncio
+import json
+import os
+import time
+from collections import defaultdict
+from typing import List, Any, Dict, AsyncGenerator, Optional
+
+from core.token_estimator import TokenEstimator
+
+# Paces replayed chunks by the token counts their provider would see
+_PACING_ESTIMATORS = {"gemini_chunk": TokenEstimator("gemini"), "groq_chunk": TokenEstimator("groq")}
+
+class _Record(dict):
+    """Read-only attribute view of a recorded chunk. Missing attributes read as None, like unset SDK fields."""
+    def __getattr__(self, name: str) -> Any:
+        return _wrap(self.get(name))
+
+    def __getitem__(self, key: Any) -> Any:
+        return _wrap(dict.__getitem__(self, key))
+
+def _wrap(value: Any) -> Any:
+    if isinstance(value, dict) and not isinstance(value, _Record):
+        return _Record(value)
+    if isinstance(value, list):
+        return [_wrap(v) for v in value]
+    return value
+
+def _chunk_tokens(event_type: str, data: Dict[str, Any]) -> int:
+    """Approximate number of generated tokens in a recorded chunk, used for pacing."""
+    text = ""
+    if event_type == "gemini_chunk":
+        for candidate in data.get("candidates") or []:
+            for part in (candidate.get("content") or {}).get("parts") or []:
+                text += part.get("text") or ""
+                if part.get("function_call"):
+                    text += json.dumps(part["function_call"])
+    else:
+        for choice in data.get("choices") or []:
+            delta = choice.get("delta") or {}
+            text += (delta.get("content") or "") + (delta.get("reasoning") or "")
+            for tc in delta.get("tool_calls") or []:
+                text += json.dumps(tc.get("function") or {})
+    return _PACING_ESTIMATORS.get(event_type, _PACING_ESTIMATORS["groq_chunk"]).text_tokens(text)
+
+def load_fixture(path: str) -> List[List[Dict[str, Any]]]:
+    """Returns the recorded events grouped by turn."""
+    turns = defaultdict(list)
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                turns[record["turn"]].append({"type": record["type"], "data": record["data"]})
+    return [turns[i] for i in sorted(turns)]
+
+class ReplayProvider:
+    """
+    BaseProvider that streams recorded chunks instead of calling a model.
+    Each generate_content_stream call replays the next recorded turn. `tokens_per_second` paces the
+    stream like a real model (None streams as fast as possible) and `first_token_latency` adds a
+    delay before the first chunk. With `cycle`, replay wraps around to the first turn.
+    """
+    def __init__(self, fixture_path: str, tokens_per_second: Optional[float] = None,
+                 first_token_latency: float = 0.0, cycle: bool = False):
+        self.fixture_path = fixture_path
+        self.turns = load_fixture(fixture_path)
+        self.tokens_per_second = tokens_per_second
+        self.first_token_latency = first_token_latency
+        self.cycle = cycle
+        self.calls = 0
+        self.simulated_seconds: List[float] = []  # time spent sleeping to imitate the model, per call
+
+    def reset(self):
+        self.calls = 0
+        self.simulated_seconds = []
+
+    async def _sleep(self, seconds: float):
+        # Count the time actually slept so timer overshoot is not attributed to the caller
+        started = time.perf_counter()
+        await asyncio.sleep(seconds)
+        self.simulated_seconds[-1] += time.perf_counter() - started
+
+    async def generate_content_stream(self, history: List[Dict[str, Any]]) -> AsyncGenerator[Dict[str, Any], None]:
+        index = self.calls % len(self.turns) if self.cycle and self.turns else self.calls
+        if index >= len(self.turns):
+            raise RuntimeError(f"Replay fixture {self.fixture_path} has no turn {index}.")
+        self.calls += 1
+        self.simulated_seconds.append(0.0)
+
+        if self.first_token_latency:
+            await self._sleep(self.first_token_latency)
+        for event in self.turns[index]:
+            if self.tokens_per_second:
+                await self._sleep(_chunk_tokens(event["type"], event["data"]) / self.tokens_per_second)
+            yield {"type": event["type"], "data": _wrap(event["data"])}
+
+class RecordingProvider:
+    """Wraps a live provider and writes every chunk it streams to a fixture file for ReplayProvider."""
+    def __init__(self, provider: Any, fixture_path: str):
+        self.provider = provider
+        self.fixture_path = fixture_path
+        self.turn = 0
+        parent = os.path.dirname(os.path.abspath(fixture_path))
+        os.makedirs(parent, exist_ok=True)
+
+    def __getattr__(self, name: str) -> Any:
+        # Expose the wrapped provider's attributes (cache_stats, model_name, ...)
+        return getattr(self.provider, name)
+
+    async def generate_content_stream(self, history: List[Dict[str, Any]]) -> AsyncGenerator[Dict[str, Any], None]:
+        turn = self.turn
+        self.turn += 1
+        with open(self.fixture_path, "a", encoding="utf-8") as f:
+            async for event in self.provider.generate_content_stream(history):
+                data = event["data"]
+                if hasattr(data, "model_dump"):
+                    data = data.model_dump(mode="json", exclude_none=True)
+                f.write(json.dumps({"turn": turn, "type": event["type"], "data": data}) + "\n")
+                yield event
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+
+import time
+from collections import deque
+from typing import List, Any, Deque, Dict, AsyncGenerator, Optional, Tuple
+
+from core.config import ROUTER_FAST_MAX_PROMPT_TOKENS, ROUTER_SIMPLE_MESSAGE_CHARS
+from core.token_estimator import TokenEstimator
+
+MAX_DECISIONS = 200  # recent decisions kept in RoutingProvider.decisions
+
+class RouteStats:
+    """Exponentially weighted latency and error rate of one route."""
+    def __init__(self, smoothing: float = 0.3):
+        self.smoothing = smoothing
+        self.calls = 0
+        self.errors = 0
+        self.fallbacks = 0
+        self.ttft: Optional[float] = None
+        self.duration: Optional[float] = None
+        self.error_rate = 0.0
+        self.last_error_at = 0.0
+        self.slow_skips = 0  # turns routed elsewhere since this route last looked slower than the strongest
+
+    def _ewma(self, current: Optional[float], value: float) -> float:
+        return value if current is None else current + self.smoothing * (value - current)
+
+    def record_success(self, ttft: Optional[float], duration: float):
+        self.calls += 1
+        if ttft is not None:
+            self.ttft = self._ewma(self.ttft, ttft)
+        self.duration = self._ewma(self.duration, duration)
+        self.error_rate = self._ewma(self.error_rate, 0.0)
+
+    def record_error(self):
+        self.calls += 1
+        self.errors += 1
+        self.error_rate = self._ewma(self.error_rate, 1.0)
+        self.last_error_at = time.monotonic()
+
+    def healthy(self, max_error_rate: float, cooldown_seconds: float) -> bool:
+        """A failing route is given another chance once `cooldown_seconds` have passed since its last error."""
+        return self.error_rate <= max_error_rate or time.monotonic() - self.last_error_at >= cooldown_seconds
+
+    def as_dict(self) -> Dict[str, Any]:
+        def r(value):
+            return round(value, 3) if value is not None else None
+        return {"calls": self.calls, "errors": self.errors, "fallbacks": self.fallbacks,
+                "ttft": r(self.ttft), "duration": r(self.duration), "error_rate": round(self.error_rate, 3)}
+
+class RoutingProvider:
+    """
+    BaseProvider that picks one of several providers per model turn.
+
+    `routes` is ordered from the fastest to the strongest model, e.g. [("fast", groq_8b), ("strong", kimi)].
+    Continuations after tool results and short questions with a small prompt go to the fastest route
+    (as long as its recent time to first token beats the strongest route's); everything else goes to
+    the strongest. A faster route that looks slower is still tried on every `probe_every`-th turn it
+    would have had, so its latency stays current. A route whose recent error rate is above
+    `max_error_rate` is skipped until `error_cooldown_seconds` after its last error. If the chosen
+    provider fails before streaming anything, the next route is tried.
+    The last MAX_DECISIONS decisions are kept in `decisions` (and the latest in `last_decision`) with
+    their reason and latency; `chosen` counts them all by route.
+    """
+    def __init__(self, routes: List[Tuple[str, Any]], fast_max_prompt_tokens: int = ROUTER_FAST_MAX_PROMPT_TOKENS,
+                 simple_message_chars: int = ROUTER_SIMPLE_MESSAGE_CHARS, max_error_rate: float = 0.5,
+                 error_cooldown_seconds: float = 60.0, probe_every: int = 10, estimator: Optional[TokenEstimator] = None):
+        if len(routes) < 2:
+            raise ValueError("RoutingProvider needs at least two routes.")
+        self.routes = routes
+        self.fast_max_prompt_tokens = fast_max_prompt_tokens
+        self.simple_message_chars = simple_message_chars
+        self.max_error_rate = max_error_rate
+        self.error_cooldown_seconds = error_cooldown_seconds
+        self.probe_every = max(1, probe_every)
+        self.estimator = estimator or TokenEstimator.for_provider(routes[-1][1])
+        self.stats = {name: RouteStats() for name, _ in routes}
+        self.decisions: Deque[Dict[str, Any]] = deque(maxlen=MAX_DECISIONS)
+        self.chosen: Dict[str, int] = {}
+        self.last_decision: Optional[Dict[str, Any]] = None
+        self._last_provider = routes[-1][1]
+
+    def __getattr__(self, name: str) -> Any:
+        # Tool declarations, provider name etc. of the strongest route
+        if name == "routes":
+            raise AttributeError(name)
+        return getattr(self.routes[-1][1], name)
+
+    @property
+    def cache_stats(self):
+        return getattr(self._last_provider, "cache_stats", None)
+
+    @property
+    def model_name(self):
+        return getattr(self._last_provider, "model_name", None)
+
+    def choose(self, history: List[Dict[str, Any]]) -> Tuple[int, str, int]:
+        """Returns (route index, reason, estimated prompt tokens) for the next request."""
+        prompt_tokens = self.estimator.request_tokens(history)
+        last = history[-1] if history else {}
+        if prompt_tokens > self.fast_max_prompt_tokens:
+            index, reason = len(self.routes) - 1, "large_prompt"
+        elif last.get("role") == "tool":
+            index, reason = 0, "tool_followup"
+        elif last.get("role") == "user" and len(last.get("content") or "") <= self.simple_message_chars:
+            index, reason = 0, "short_request"
+        else:
+            index, reason = len(self.routes) - 1, "complex_request"
+
+        # A faster route only pays off while it actually responds sooner
+        strongest = self.stats[self.routes[-1][0]]
+        chosen = self.stats[self.routes[index][0]]
+        if index < len(self.routes) - 1 and chosen.ttft is not None and strongest.ttft is not None and chosen.ttft > strongest.ttft:
+            chosen.slow_skips += 1
+            if chosen.slow_skips >= self.probe_every:
+                # Its latency is only measured when it is used; probe it so a slow spell does not last forever
+                chosen.slow_skips = 0
+                reason += "+probe"
+            else:
+                index, reason = len(self.routes) - 1, reason + "+slower_than_" + self.routes[-1][0]
+
+        # Step away from routes that have been failing; prefer stronger ones, then weaker ones
+        order = list(range(index, len(self.routes))) + list(range(index - 1, -1, -1))
+        for candidate in order:
+            if self.stats[self.routes[candidate][0]].healthy(self.max_error_rate, self.error_cooldown_seconds):
+                if candidate != index:
+                    reason += "+unhealthy_" + self.routes[index][0]
+                return candidate, reason, prompt_tokens
+        return index, reason, prompt_tokens
+
+    async def generate_content_stream(self, history: List[Dict[str, Any]]) -> AsyncGenerator[Dict[str, Any], None]:
+        index, reason, prompt_tokens = self.choose(history)
+        decision = {"route": self.routes[index][0], "reason": reason, "prompt_tokens": prompt_tokens, "fallback_from": []}
+        self.decisions.append(decision)
+        self.last_decision = decision
+
+        # Fallback order: the chosen route, then stronger ones, then weaker ones
+        order = list(range(index, len(self.routes))) + list(range(index - 1, -1, -1))
+        for position, route_index in enumerate(order):
+            name, provider = self.routes[route_index]
+            stats = self.stats[name]
+            decision["route"] = name
+            self._last_provider = provider
+            started = time.perf_counter()
+            ttft = None
+            try:
+                async for event in provider.generate_content_stream(history):
+                    if ttft is None:
+                        ttft = time.perf_counter() - started
+                    yield event
+            except Exception as e:
+                stats.record_error()
+                if ttft is not None or position == len(order) - 1:
+                    # Output has already streamed (it cannot be taken back) or nothing is left to try
+                    decision["error"] = f"{type(e).__name__}: {e}"
+                    self._count(name)
+                    raise
+                decision["fallback_from"].append({"route": name, "error": f"{type(e).__name__}: {e}"})
+                self.stats[self.routes[order[position + 1]][0]].fallbacks += 1
+                continue
+            duration = time.perf_counter() - started
+            stats.record_success(ttft, duration)
+            decision["ttft"] = round(ttft, 3) if ttft is not None else None
+            decision["duration"] = round(duration, 3)
+            self._count(name)
+            return
+
+    def _count(self, route: str):
+        self.chosen[route] = self.chosen.get(route, 0) + 1
+
+    def summary(self) -> Dict[str, Any]:
+        """Per-route call counts, latencies and error rates plus how often each route was chosen."""
+        return {"chosen": dict(self.chosen), "routes": {name: s.as_dict() for name, s in self.stats.items()}}
+
+    async def aclose(self):
+        for _, provider in self.routes:
+            if hasattr(provider, "aclose"):
+                await provider.aclose()
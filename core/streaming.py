@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+
+import json
+from typing import List, Any, Dict
+
+from core.conversation import tool_call
+
+class ToolCallAccumulator:
+    """
+    Joins OpenAI/Groq streamed `delta.tool_calls` fragments by `index`.
+    The first fragment of a call carries its id and name, later fragments append to the JSON arguments.
+    A call is complete as soon as its arguments parse as a JSON object (nothing can validly follow the
+    closing brace), or when the stream moves on to a later index. A finished call whose arguments are
+    not a JSON object keeps the raw text as `invalid_arguments` (see AICore), so it is never run with
+    arguments the model did not send.
+    """
+    def __init__(self):
+        self._pending: Dict[int, Dict[str, Any]] = {}
+        self._next_index = 0
+        self._emitted = 0
+
+    def add(self, delta_tool_calls: List[Any]) -> List[Dict[str, Any]]:
+        """Feeds one chunk's tool-call deltas and returns the calls that became complete, in call order."""
+        for tc in delta_tool_calls:
+            index = tc.index if getattr(tc, 'index', None) is not None else self._next_index
+            self._next_index = max(self._next_index, index + 1)
+            entry = self._pending.setdefault(index, {"id": None, "name": "", "arguments": "", "done": False})
+            if getattr(tc, 'id', None):
+                entry["id"] = tc.id
+            function = getattr(tc, 'function', None)
+            if function is not None:
+                if function.name:
+                    entry["name"] += function.name
+                if function.arguments:
+                    entry["arguments"] += function.arguments
+            # A later index means every earlier call has finished streaming
+            for earlier in self._pending:
+                if earlier < index:
+                    self._pending[earlier]["done"] = True
+        return self._drain(final=False)
+
+    def finish(self) -> List[Dict[str, Any]]:
+        """Returns every call still pending once the stream has ended."""
+        return self._drain(final=True)
+
+    def _drain(self, final: bool) -> List[Dict[str, Any]]:
+        completed = []
+        while self._emitted in self._pending:
+            entry = self._pending[self._emitted]
+            args = self._parse(entry["arguments"])
+            if args is None and not (entry["done"] or final):
+                break
+            invalid = entry["arguments"] if args is None and entry["arguments"].strip() else None
+            completed.append(tool_call(entry["name"], args or {}, entry["id"], invalid_arguments=invalid))
+            del self._pending[self._emitted]
+            self._emitted += 1
+        return completed
+
+    @staticmethod
+    def _parse(arguments: str) -> Any:
+        text = arguments.strip()
+        if not text.endswith('}'):
+            return None
+        try:
+            parsed = json.loads(text)
+        except json.JSONDecodeError:
+            return None
+        return parsed if isinstance(parsed, dict) else None
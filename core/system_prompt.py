@@ -289,7 +289,7 @@ This tool transforms you from a single-file editor into a full-scale project arc
     2.  Completely replacing an existing file with entirely new content.
 -   **Prohibited Use Cases:** **NEVER use this for small or partial modifications.** This tool is a sledgehammer, not a scalpel; using it for small changes will destroy the rest of the file's content.
 -   **Input Deep Dive:** `input_snapshot_content: str`. The string must be formatted with `$$path/to/file` headers and `line_num:content` lines. The tool strips the line numbers before writing.
--   **Output Interpretation:** A summary report. Look for "Successfully wrote" for each file.
+-   **Output Interpretation:** A summary report with the number of files written, unchanged and failed. Look for "Successfully wrote" for each file that changed; files whose content was already identical are counted as unchanged and not touched.
 -   **Correct Usage Example:**
     `write_files_from_snapshot(input_snapshot_content='''$$README.md
     ```markdown
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+
+import json
+from typing import List, Any, Dict, Optional
+
+from core import config
+from core.config import REQUEST_TOKEN_LIMIT, REQUEST_SIZE_POLICY
+
+# Starting points for characters per token, before calibration against reported usage
+DEFAULT_CHARS_PER_TOKEN = {"gemini": 4.0, "groq": 3.6}
+FALLBACK_CHARS_PER_TOKEN = 4.0
+MESSAGE_OVERHEAD_TOKENS = 4  # role and framing per message
+
+# Request size policies
+TRIM = "trim"
+REFUSE = "refuse"
+OFF = "off"
+
+def _tools_text(provider: Any) -> str:
+    """Serialized tool declarations of a provider, as far as it exposes them."""
+    gemini_tools = getattr(provider, "gemini_tools", None)
+    if gemini_tools:
+        return "".join(t.model_dump_json(exclude_none=True) for t in gemini_tools)
+    tools = getattr(provider, "tools", None)
+    if isinstance(tools, list):
+        return json.dumps(tools)
+    return ""
+
+class TokenEstimator:
+    """
+    Offline token counts for requests, without a tokenizer.
+    Counts characters and divides by a per-provider characters-per-token ratio. After each request,
+    `calibrate` compares the last estimate with the prompt tokens the provider reported and moves
+    the ratio towards the observed one (exponential moving average).
+    """
+    def __init__(self, provider_name: Optional[str] = None, chars_per_token: Optional[float] = None,
+                 prefix_chars: int = 0, smoothing: float = 0.3):
+        self.provider_name = provider_name
+        self.chars_per_token = chars_per_token or DEFAULT_CHARS_PER_TOKEN.get(provider_name, FALLBACK_CHARS_PER_TOKEN)
+        self.prefix_chars = prefix_chars  # system prompt and tool declarations, sent with every request
+        self.smoothing = smoothing
+        self.calibrations = 0
+        self.last_estimate = 0
+        self._last_request: Optional[tuple] = None  # (characters, messages) of the last estimated request
+
+    @classmethod
+    def for_provider(cls, provider: Any) -> "TokenEstimator":
+        name = getattr(provider, "name", None)
+        return cls(name, prefix_chars=len(config.SYSTEM_PROMPT) + len(_tools_text(provider)))
+
+    def text_tokens(self, text: str) -> int:
+        return int(len(text) / self.chars_per_token) + 1 if text else 0
+
+    @staticmethod
+    def message_chars(message: Dict[str, Any]) -> int:
+        chars = len(message.get("content") or "")
+        for call in message.get("tool_calls", []):
+            chars += len(call["name"]) + len(json.dumps(call["args"]))
+        return chars
+
+    def message_tokens(self, message: Dict[str, Any]) -> int:
+        return int(self.message_chars(message) / self.chars_per_token) + MESSAGE_OVERHEAD_TOKENS
+
+    def history_tokens(self, history: List[Dict[str, Any]]) -> int:
+        return sum(self.message_tokens(m) for m in history)
+
+    @property
+    def prefix_tokens(self) -> int:
+        return int(self.prefix_chars / self.chars_per_token)
+
+    def request_tokens(self, history: List[Dict[str, Any]]) -> int:
+        """Estimated prompt tokens for sending `history`, remembered for the next `calibrate`."""
+        chars = self.prefix_chars + sum(self.message_chars(m) for m in history)
+        self._last_request = (chars, len(history))
+        self.last_estimate = int(chars / self.chars_per_token) + MESSAGE_OVERHEAD_TOKENS * len(history)
+        return self.last_estimate
+
+    def calibrate(self, actual_prompt_tokens: int):
+        """Adjusts the ratio using the prompt tokens reported for the last estimated request."""
+        if not actual_prompt_tokens or self._last_request is None:
+            return
+        chars, messages = self._last_request
+        content_tokens = actual_prompt_tokens - MESSAGE_OVERHEAD_TOKENS * messages
+        if content_tokens <= 0 or not chars:
+            return
+        observed = min(10.0, max(1.0, chars / content_tokens))
+        self.chars_per_token += self.smoothing * (observed - self.chars_per_token)
+        self.calibrations += 1
+        self._last_request = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"estimated_tokens_in": self.last_estimate, "chars_per_token": round(self.chars_per_token, 3),
+                "calibrations": self.calibrations}
+
+class RequestSizeGuard:
+    """
+    Checks the estimated size of a request before it is sent.
+    Over `max_request_tokens`, the `trim` policy cuts the largest tool outputs (recent ones included)
+    until the request fits, and `refuse` stops the request. `off` or a limit of 0 disables the guard.
+    """
+    def __init__(self, estimator: TokenEstimator, max_request_tokens: int = REQUEST_TOKEN_LIMIT,
+                 policy: str = REQUEST_SIZE_POLICY, min_tool_chars: int = 500):
+        if policy not in (TRIM, REFUSE, OFF):
+            raise ValueError(f"Unknown request size policy '{policy}'. Expected one of: {TRIM}, {REFUSE}, {OFF}")
+        self.estimator = estimator
+        self.max_request_tokens = max_request_tokens
+        self.policy = policy
+        self.min_tool_chars = min_tool_chars
+
+    def enforce(self, history: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        Applies the policy to `history` in place. Returns a `request_trimmed` or `request_too_large`
+        event when it had to act, None when the request fits.
+        """
+        estimated = self.estimator.request_tokens(history)
+        if self.policy == OFF or self.max_request_tokens <= 0 or estimated <= self.max_request_tokens:
+            return None
+        if self.policy == TRIM:
+            trimmed = self._trim(history, estimated - self.max_request_tokens)
+            after = self.estimator.request_tokens(history)
+            if after <= self.max_request_tokens:
+                return {"type": "request_trimmed", "tokens_before": estimated, "tokens_after": after,
+                        "limit": self.max_request_tokens, "trimmed_tool_outputs": trimmed}
+            estimated = after
+        return {"type": "request_too_large", "estimated_tokens": estimated, "limit": self.max_request_tokens,
+                "policy": self.policy}
+
+    def recover(self, history: List[Dict[str, Any]]) -> int:
+        """
+        After a refusal, trims tool outputs (whatever the policy) until `history` fits the limit again,
+        so the next request of the conversation can be sent. Returns the number of outputs trimmed.
+        """
+        estimated = self.estimator.request_tokens(history)
+        if self.max_request_tokens <= 0 or estimated <= self.max_request_tokens:
+            return 0
+        return self._trim(history, estimated - self.max_request_tokens)
+
+    def _trim(self, history: List[Dict[str, Any]], excess_tokens: int) -> int:
+        excess_chars = int(excess_tokens * self.estimator.chars_per_token) + 1
+        candidates = sorted((i for i, m in enumerate(history) if m["role"] == "tool"),
+                            key=lambda i: len(history[i].get("content") or ""), reverse=True)
+        trimmed = 0
+        for i in candidates:
+            if excess_chars <= 0:
+                break
+            content = history[i].get("content") or ""
+            keep = max(self.min_tool_chars, len(content) - excess_chars - 200)  # leave room for the notice
+            if keep >= len(content):
+                break  # candidates are sorted, the rest are smaller still
+            notice = (f"[Output of `{history[i]['name']}` truncated to fit the request size limit, "
+                      f"{len(content) - keep} characters omitted. Narrow the request, e.g. a subdirectory or a single file.]\n")
+            history[i] = dict(history[i], content=notice + content[:keep])
+            excess_chars -= len(content) - len(history[i]["content"])
+            trimmed += 1
+        return trimmed
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple, TYPE_CHECKING
+
+from core.tool_utils import tool_result_to_text
+
+if TYPE_CHECKING:
+    from swe_tools.path_matcher import PathMatcher
+
+# Read-only tools whose output depends only on their arguments and the files under their paths
+CACHEABLE_TOOLS = frozenset({"read_file_content", "view_directory_structure", "read_codebase_snapshot"})
+
+def path_fingerprint(path: str, matcher: Optional["PathMatcher"] = None) -> Optional[str]:
+    """
+    Hashes the mtime and size of a file. A directory is fingerprinted by the generation of its
+    workspace index (see swe_tools/workspace_index.py), which changes with any change the walkers would
+    see, so a lookup costs no filesystem walk. Where the index cannot vouch for the subtree (polling,
+    an index that is full, WORKSPACE_INDEX=off), the mtime and size of every file and directory under
+    it are hashed instead, skipping entries `matcher` ignores (the tools skip them as well) but never
+    .gitignore files, since they decide what the tools see. Returns None if the path does not exist.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    digest = hashlib.sha1(f"{st.st_mtime_ns}:{st.st_size}".encode())
+    if os.path.isdir(path):
+        from swe_tools.workspace_index import workspace_generation
+        generation = workspace_generation(path)
+        if generation is not None:
+            digest.update(f"index:{generation}".encode())
+            return digest.hexdigest()
+        stack = [path]
+        while stack:
+            current = stack.pop()
+            try:
+                entries = sorted(os.scandir(current), key=lambda e: e.name)
+            except OSError:
+                continue
+            for entry in entries:
+                rel = os.path.relpath(entry.path, path)
+                if matcher is not None and entry.name != ".gitignore" and matcher.is_ignored(rel, entry.is_dir(follow_symlinks=False)):
+                    continue
+                try:
+                    est = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                digest.update(f"{rel}:{est.st_mtime_ns}:{est.st_size}\n".encode())
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+    return digest.hexdigest()
+
+class ToolResultCache:
+    """
+    LRU cache (bounded by result size in bytes) for read-only tool results.
+    Keys combine the tool name, its arguments and a fingerprint of the paths involved, so edits
+    made outside the agent are picked up as well. Mutating tools clear the whole cache.
+    Relative paths are resolved against `root`, the tool server's working directory (default: ours).
+    """
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024, root: Optional[str] = None):
+        self.max_bytes = max_bytes
+        self.root = root
+        self._entries: "OrderedDict[str, Tuple[Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def key(self, tool_name: str, tool_args: Dict[str, Any]) -> Optional[str]:
+        """Returns the cache key of a call, or None if the call cannot be cached. Does blocking filesystem I/O."""
+        if self.max_bytes <= 0 or tool_name not in CACHEABLE_TOOLS:
+            return None
+        args = tool_args or {}
+        if args.get("cursor") or args.get("page_files") or args.get("page_bytes"):
+            return None  # paged calls advance a listing kept by the tool server
+        path = os.path.abspath(os.path.join(self.root or os.getcwd(), args.get("path", ".")))
+        matcher = None
+        if os.path.isdir(path):
+            from swe_tools.path_matcher import PathMatcher, parse_ignore_arg
+            matcher = PathMatcher(path, parse_ignore_arg(args.get("ignore")))
+        fingerprint = path_fingerprint(path, matcher)
+        if fingerprint is None:
+            return None
+        return f"{tool_name}:{json.dumps(args, sort_keys=True, default=str)}:{fingerprint}"
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key: str, tool_result: Any):
+        if getattr(tool_result, 'isError', False) or isinstance(tool_result, dict):
+            return  # errors and denials are never cached
+        size = len(tool_result_to_text(tool_result).encode('utf-8', errors='ignore'))
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._bytes -= self._entries.pop(key)[1]
+        self._entries[key] = (tool_result, size)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+            self.evictions += 1
+
+    def invalidate(self):
+        if self._entries:
+            self._entries.clear()
+            self._bytes = 0
+        self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
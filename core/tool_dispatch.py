@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import os
+import time
+from typing import List, Any, Dict, Optional, FrozenSet, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from mcp import ClientSession
+
+from core.tool_cache import ToolResultCache
+
+# Tools that only observe the filesystem. They can run side by side.
+READ_ONLY_TOOLS = frozenset({
+    "read_file_content",
+    "view_directory_structure",
+    "read_codebase_snapshot",
+    "view_images",
+    "read_process_logs",
+    "list_background_processes",
+})
+
+def is_read_only(tool_name: str) -> bool:
+    """Returns True if the tool never modifies the workspace. Unknown tools are treated as mutating."""
+    return tool_name in READ_ONLY_TOOLS
+
+def _abs(path: str, root: Optional[str] = None) -> str:
+    """`path` made absolute against `root` (the tool server's working directory; default: ours)."""
+    return os.path.normcase(os.path.abspath(os.path.join(root or os.getcwd(), path.strip() or ".")))
+
+def _snapshot_paths(text: str) -> List[str]:
+    """Extracts the '$path' headers used by edit_file_lines and write_files_from_snapshot."""
+    return [line.strip()[1:].strip() for line in (text or "").splitlines() if line.strip().startswith('$')]
+
+def tool_paths(tool_name: str, tool_args: Dict[str, Any], root: Optional[str] = None) -> Optional[FrozenSet[str]]:
+    """
+    Returns the absolute paths a tool call reads or writes, resolving relative paths against `root`.
+    None means the footprint is unknown (e.g. a shell command) and the call conflicts with everything.
+    """
+    args = tool_args or {}
+    if tool_name == "read_file_content":
+        return frozenset({_abs(args.get("path", "."), root)})
+    if tool_name in ("view_directory_structure", "read_codebase_snapshot"):
+        return frozenset({_abs(args.get("path", "."), root)})
+    if tool_name in ("view_images", "delete_files_and_folders"):
+        return frozenset(_abs(p, root) for p in str(args.get("paths", "")).split(',') if p.strip())
+    if tool_name in ("read_process_logs", "list_background_processes"):
+        return frozenset({_abs(".logs", root)})
+    if tool_name == "edit_file_lines":
+        return frozenset(_abs(p, root) for p in _snapshot_paths(args.get("changes", "")))
+    if tool_name == "write_files_from_snapshot":
+        out_dir = args.get("output_directory", ".")
+        return frozenset(_abs(os.path.join(out_dir, p), root) for p in _snapshot_paths(args.get("input_snapshot_content", "")))
+    return None
+
+def _paths_overlap(a: Optional[FrozenSet[str]], b: Optional[FrozenSet[str]]) -> bool:
+    if a is None or b is None:
+        return True
+    for p in a:
+        for q in b:
+            if p == q or p.startswith(q.rstrip(os.sep) + os.sep) or q.startswith(p.rstrip(os.sep) + os.sep):
+                return True
+    return False
+
+class ToolBatch:
+    """
+    The tool calls of a single model turn.
+    Read-only calls fan out (bounded by the dispatcher's semaphore). A call waits for every
+    earlier call it conflicts with, i.e. one of the two is mutating and their paths overlap,
+    so mutating calls stay ordered by the paths they touch.
+    """
+    def __init__(self, dispatcher: "ToolDispatcher"):
+        self.dispatcher = dispatcher
+        self._calls: List[Tuple[str, Dict[str, Any], bool, Optional[FrozenSet[str]]]] = []
+        self._tasks: List[asyncio.Task] = []
+        self.latencies: List[Optional[float]] = []  # seconds spent in each call, excluding time spent waiting
+
+    def submit(self, tool_name: str, tool_args: Dict[str, Any]) -> int:
+        """Schedules a call and returns its index in call order."""
+        read_only = is_read_only(tool_name)
+        paths = tool_paths(tool_name, tool_args, self.dispatcher.root)
+        deps = [
+            task for (_, _, other_ro, other_paths), task in zip(self._calls, self._tasks)
+            if not (read_only and other_ro) and _paths_overlap(paths, other_paths)
+        ]
+        self._calls.append((tool_name, tool_args, read_only, paths))
+        self.latencies.append(None)
+        index = len(self._tasks)
+        self._tasks.append(asyncio.ensure_future(self._run(index, tool_name, tool_args, read_only, deps)))
+        return index
+
+    async def _run(self, index: int, tool_name: str, tool_args: Dict[str, Any], read_only: bool, deps: List[asyncio.Task]) -> Any:
+        if deps:
+            await asyncio.wait(deps)
+        if read_only:
+            async with self.dispatcher.semaphore:
+                return await self._timed(index, tool_name, tool_args)
+        return await self._timed(index, tool_name, tool_args)
+
+    async def _timed(self, index: int, tool_name: str, tool_args: Dict[str, Any]) -> Any:
+        started = time.perf_counter()
+        try:
+            return await self.dispatcher.call_tool(tool_name, tool_args)
+        finally:
+            self.latencies[index] = time.perf_counter() - started
+
+    async def results(self) -> List[Any]:
+        """Waits for every submitted call and returns the results in call order."""
+        return list(await asyncio.gather(*self._tasks))
+
+class ToolDispatcher:
+    """
+    Executes tool calls against an MCP session, either one by one or as a concurrent batch.
+    Read-only results are served from `cache` when the paths involved are unchanged; any other
+    tool (edits, deletes, shell commands) clears the cache once it has run. `root` is the tool
+    server's working directory, against which the model's relative paths are resolved (default: ours).
+    """
+    def __init__(self, mcp_session: "ClientSession", max_concurrency: int = 4, cache: Optional[ToolResultCache] = None,
+                 root: Optional[str] = None):
+        self.mcp_session = mcp_session
+        self.root = root
+        self.semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        self.cache = cache
+
+    async def call_tool(self, tool_name: str, tool_args: Dict[str, Any]) -> Any:
+        key = None
+        if self.cache is not None and is_read_only(tool_name):
+            loop = asyncio.get_running_loop()
+            key = await loop.run_in_executor(None, self.cache.key, tool_name, tool_args)
+            if key is not None:
+                cached = self.cache.get(key)
+                if cached is not None:
+                    return cached
+        try:
+            tool_result = await self.mcp_session.call_tool(tool_name, tool_args)
+        except Exception as e:
+            return {"status": "error", "message": f"Tool `{tool_name}` failed: {e}"}
+        finally:
+            if self.cache is not None and not is_read_only(tool_name):
+                self.cache.invalidate()
+        if key is not None:
+            self.cache.put(key, tool_result)
+        return tool_result
+
+    def batch(self) -> ToolBatch:
+        return ToolBatch(self)
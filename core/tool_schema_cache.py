@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+
+import hashlib
+import json
+import os
+import tempfile
+from typing import List, Any, Dict, Optional
+
+from core.config import TOOL_SCHEMA_CACHE_DIR
+
+# Bump when mcp_tool_to_openai_tool / mcp_tool_to_genai_tool change their output
+SCHEMA_FORMAT_VERSION = 2
+
+def _package_version(name: str) -> str:
+    from importlib.metadata import version, PackageNotFoundError
+    try:
+        return version(name)
+    except PackageNotFoundError:
+        return "unknown"
+
+class ToolDeclarations:
+    """A provider's converted tool declarations plus the tool names and descriptions the UI shows."""
+    def __init__(self, provider_name: str, tools: List[Dict[str, str]], declarations: List[Any], from_cache: bool = False):
+        self.provider_name = provider_name
+        self.tools = tools  # [{"name", "description"}] in server order
+        self.declarations = declarations  # stable_openai_tools() dicts, or one Gemini Tool in a list
+        self.from_cache = from_cache
+
+    @property
+    def names(self) -> List[str]:
+        return [t["name"] for t in self.tools]
+
+    @property
+    def descriptions(self) -> Dict[str, str]:
+        return {t["name"]: t["description"] for t in self.tools}
+
+class ToolSchemaCache:
+    """
+    Provider-specific tool declarations on disk, so a session can build its provider before the
+    tool server has answered `list_tools`.
+
+    Entries are keyed by the swe_tools source hash (the one the tool daemon checks), the provider, the
+    mcp and pydantic versions that generate the input schemas and SCHEMA_FORMAT_VERSION. Any change to
+    the tools therefore misses the cache, and the next `get` or `store` writes a fresh entry.
+    """
+    def __init__(self, cache_dir: Optional[str] = TOOL_SCHEMA_CACHE_DIR):
+        self.cache_dir = cache_dir or None  # empty disables the cache
+        self._version: Optional[str] = None
+
+    @property
+    def version(self) -> str:
+        if self._version is None:
+            from core.tool_transport import source_hash
+            self._version = hashlib.sha1(":".join([
+                str(SCHEMA_FORMAT_VERSION), source_hash(), _package_version("mcp"), _package_version("pydantic"),
+            ]).encode()).hexdigest()
+        return self._version
+
+    def path(self, provider_name: str) -> Optional[str]:
+        if not self.cache_dir:
+            return None
+        return os.path.join(self.cache_dir, f"{provider_name}-{self.version[:20]}.json")
+
+    def load(self, provider_name: str) -> Optional[ToolDeclarations]:
+        """The cached declarations for `provider_name`, or None on a miss or unreadable entry."""
+        path = self.path(provider_name)
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            if entry.get("version") != self.version or entry.get("provider") != provider_name:
+                return None
+            declarations = self._decode(provider_name, entry["declarations"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        return ToolDeclarations(provider_name, entry["tools"], declarations, from_cache=True)
+
+    def store(self, provider_name: str, mcp_tools: List[Any]) -> ToolDeclarations:
+        """Converts `mcp_tools` for `provider_name` and writes them to the cache (best effort)."""
+        tools = [{"name": t.name, "description": t.description or ""} for t in mcp_tools]
+        declarations = self._convert(provider_name, mcp_tools)
+        path = self.path(provider_name)
+        if path:
+            entry = {"version": self.version, "provider": provider_name, "tools": tools,
+                     "declarations": self._encode(provider_name, declarations)}
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(entry, f)
+                os.replace(tmp_path, path)
+            except OSError:
+                pass
+        return ToolDeclarations(provider_name, tools, declarations)
+
+    def get(self, provider_name: str, mcp_tools: List[Any]) -> ToolDeclarations:
+        cached = self.load(provider_name)
+        return cached if cached is not None else self.store(provider_name, mcp_tools)
+
+    @staticmethod
+    def _convert(provider_name: str, mcp_tools: List[Any]) -> List[Any]:
+        if provider_name == "gemini":
+            from core.gemini_provider import stable_gemini_tools
+            from core.tool_utils import mcp_tool_to_genai_tool
+            return stable_gemini_tools([mcp_tool_to_genai_tool(t) for t in mcp_tools])
+        from core.providers import stable_openai_tools
+        from core.tool_utils import mcp_tool_to_openai_tool
+        return stable_openai_tools([mcp_tool_to_openai_tool(t) for t in mcp_tools])
+
+    @staticmethod
+    def _encode(provider_name: str, declarations: List[Any]) -> List[Any]:
+        if provider_name == "gemini":
+            return [d.model_dump(mode="json", exclude_none=True) for tool in declarations for d in tool.function_declarations]
+        return declarations
+
+    @staticmethod
+    def _decode(provider_name: str, encoded: List[Any]) -> List[Any]:
+        if provider_name == "gemini":
+            from google.genai import types
+            from core.gemini_provider import stable_gemini_tools
+            return stable_gemini_tools([types.FunctionDeclaration.model_validate(d) for d in encoded])
+        return encoded
@@ -0,0 +1,323 @@
+# -*- coding: utf-8 -*-
+
+"""
+How the client reaches the swe_tools MCP server.
+
+`stdio` starts `python -m swe_tools.run_server` as a child process for every session. `daemon`
+attaches to a long-lived server for the current workspace (see swe_tools/daemon.py) over a Unix
+socket, starting one if none is running, and falls back to stdio if that fails. `inprocess` calls
+the tools in this process, without JSON-RPC framing or serialization.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+from core.config import TOOL_DAEMON_IDLE_SECONDS
+
+PACKAGE_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+SWE_TOOLS_DIR = os.path.join(PACKAGE_ROOT, "swe_tools")
+MCP_SERVER_MODULE = "swe_tools.run_server"
+MAX_MESSAGE_BYTES = 512 * 1024 * 1024  # one JSON-RPC message per line; snapshots can be large
+TRANSPORTS = ("stdio", "daemon", "inprocess")
+
+class DaemonUnavailable(Exception):
+    """No usable daemon: none is running, it did not start in time, or it runs other swe_tools code."""
+
+class InProcessToolSession:
+    """
+    The part of mcp.ClientSession that AICore and the CLI use, served by the swe_tools FastMCP instance
+    in this process. Results are the same CallToolResult objects a ClientSession returns, but nothing
+    is serialized. The swe_tools instance runs its synchronous tools in worker threads, so calls keep
+    the UI responsive and read-only calls overlap.
+    """
+    def __init__(self):
+        import swe_tools.run_server  # noqa: F401  registers every tool, as the server process does
+        from swe_tools.instance import mcp
+        self.mcp = mcp
+
+    async def initialize(self):
+        return None
+
+    async def list_tools(self):
+        import mcp.types as types
+        return types.ListToolsResult(tools=await self.mcp.list_tools())
+
+    async def call_tool(self, name: str, arguments: Optional[Dict[str, Any]] = None, *args, **kwargs):
+        import mcp.types as types
+        try:
+            result = await self.mcp.call_tool(name, arguments or {})
+        except Exception as e:
+            # Like the MCP server, tool failures become error results rather than exceptions
+            return types.CallToolResult(content=[types.TextContent(type="text", text=str(e))], isError=True)
+        if isinstance(result, tuple):
+            content, structured = result
+            return types.CallToolResult(content=list(content), structuredContent=structured)
+        if isinstance(result, dict):
+            return types.CallToolResult(content=[types.TextContent(type="text", text=json.dumps(result, indent=2))],
+                                        structuredContent=result)
+        return types.CallToolResult(content=list(result))
+
+class PendingToolSession:
+    """
+    Stands in for a tool session that is still starting (see `background_tool_session`).
+    Calls wait until the session is up; if it could not start, they raise the error instead.
+    """
+    def __init__(self):
+        self.session = None
+        self.transport_used: Optional[str] = None
+        self.error: Optional[BaseException] = None
+        self._ready = asyncio.Event()
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    async def wait_ready(self):
+        await self._ready.wait()
+        if self.session is None:
+            raise RuntimeError(f"Tool server failed to start: {self.error}")
+        return self.session
+
+    async def initialize(self):
+        await self.wait_ready()
+
+    async def list_tools(self):
+        return await (await self.wait_ready()).list_tools()
+
+    async def call_tool(self, name: str, arguments: Optional[Dict[str, Any]] = None, *args, **kwargs):
+        return await (await self.wait_ready()).call_tool(name, arguments, *args, **kwargs)
+
+def source_hash() -> str:
+    """Hash of the swe_tools sources. A daemon only serves clients with the same hash."""
+    digest = hashlib.sha1()
+    for name in sorted(os.listdir(SWE_TOOLS_DIR)):
+        if name.endswith(".py"):
+            digest.update(name.encode())
+            with open(os.path.join(SWE_TOOLS_DIR, name), "rb") as f:
+                digest.update(f.read())
+    return digest.hexdigest()
+
+def runtime_dir() -> str:
+    path = os.path.join(os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir(), f"clia-{os.getuid()}")
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    return path
+
+# Variables that differ between shells of the same environment; PYTHONPATH is set by start_daemon
+VOLATILE_ENV_VARS = frozenset({"_", "OLDPWD", "PWD", "SHLVL", "PYTHONPATH", "TERM_SESSION_ID", "WINDOWID",
+                               "TMUX_PANE", "SSH_TTY", "SSH_CLIENT", "SSH_CONNECTION", "COLUMNS", "LINES"})
+
+def environment_hash(env: Optional[Dict[str, str]] = None) -> str:
+    """Hash of the environment the tools (and the shell commands they run) would inherit."""
+    env = os.environ if env is None else env
+    digest = hashlib.sha1()
+    for name in sorted(env):
+        if name not in VOLATILE_ENV_VARS:
+            digest.update(f"{name}={env[name]}\0".encode("utf-8", "surrogateescape"))
+    return digest.hexdigest()
+
+def socket_path(workspace: str, env: Optional[Dict[str, str]] = None) -> str:
+    """
+    One socket per workspace directory and environment: a daemon runs its tools with the environment
+    of the client that started it, so a client with other variables gets a daemon of its own.
+    """
+    key = hashlib.sha1(f"{os.path.realpath(workspace)}\0{environment_hash(env)}".encode()).hexdigest()[:16]
+    return os.path.join(runtime_dir(), f"tools-{key}.sock")
+
+@asynccontextmanager
+async def json_line_streams(receive, send):
+    """
+    Adapts a byte stream carrying newline-delimited JSON-RPC messages to the (read, write) memory
+    streams that MCP sessions run on, like mcp's stdio transport does for stdin/stdout.
+    `receive` is a BufferedByteReceiveStream, `send` any anyio byte send stream.
+    """
+    import anyio
+    import mcp.types as types
+    from mcp.shared.message import SessionMessage
+
+    read_writer, read_stream = anyio.create_memory_object_stream(0)
+    write_stream, write_reader = anyio.create_memory_object_stream(0)
+
+    async def reader():
+        async with read_writer:
+            while True:
+                try:
+                    line = await receive.receive_until(b"\n", MAX_MESSAGE_BYTES)
+                except (anyio.IncompleteRead, anyio.EndOfStream, anyio.ClosedResourceError, anyio.BrokenResourceError):
+                    return
+                try:
+                    message = types.JSONRPCMessage.model_validate_json(line)
+                except Exception as exc:
+                    await read_writer.send(exc)
+                    continue
+                await read_writer.send(SessionMessage(message))
+
+    async def writer():
+        async with write_reader:
+            async for session_message in write_reader:
+                data = session_message.message.model_dump_json(by_alias=True, exclude_none=True)
+                try:
+                    await send.send(data.encode("utf-8") + b"\n")
+                except (anyio.ClosedResourceError, anyio.BrokenResourceError):
+                    return
+
+    async with anyio.create_task_group() as tg:
+        tg.start_soon(reader)
+        tg.start_soon(writer)
+        try:
+            yield read_stream, write_stream
+        finally:
+            tg.cancel_scope.cancel()
+
+async def _handshake(path: str, request: Dict[str, Any]) -> Tuple[Any, Any, Dict[str, Any]]:
+    """Connects to the daemon and exchanges the hello lines. Returns (stream, buffered stream, reply)."""
+    import anyio
+    from anyio.streams.buffered import BufferedByteReceiveStream
+    try:
+        stream = await anyio.connect_unix(path)
+    except OSError as e:
+        raise DaemonUnavailable(f"no daemon listening on {path}: {e}")
+    buffered = BufferedByteReceiveStream(stream)
+    try:
+        await stream.send(json.dumps(request).encode() + b"\n")
+        reply = json.loads(await buffered.receive_until(b"\n", 65536))
+    except Exception as e:
+        await stream.aclose()
+        raise DaemonUnavailable(f"daemon handshake failed: {e}")
+    return stream, buffered, reply
+
+def start_daemon(workspace: str, idle_seconds: int = TOOL_DAEMON_IDLE_SECONDS) -> subprocess.Popen:
+    """Starts a detached daemon for `workspace`. Its log goes next to the socket."""
+    path = socket_path(workspace)
+    log = open(path[:-len(".sock")] + ".log", "a")
+    return subprocess.Popen(
+        [sys.executable, "-m", "swe_tools.daemon", "--workspace", workspace, "--socket", path,
+         "--idle-timeout", str(idle_seconds)],
+        cwd=workspace, env={**os.environ, "PYTHONPATH": PACKAGE_ROOT},
+        stdin=subprocess.DEVNULL, stdout=log, stderr=log, start_new_session=True,
+    )
+
+async def stop_daemon(workspace: str) -> bool:
+    """Asks the daemon of the workspace and the current environment to exit. Returns False if none was running."""
+    try:
+        stream, _, _ = await _handshake(socket_path(workspace), {"op": "shutdown"})
+    except DaemonUnavailable:
+        return False
+    await stream.aclose()
+    return True
+
+@asynccontextmanager
+async def daemon_streams(workspace: str, start: bool = True, start_timeout: float = 15.0):
+    """
+    Yields (read, write, info) for an MCP session with the workspace's daemon. Starts a daemon if none
+    is running (or the running one serves different swe_tools sources). Raises DaemonUnavailable.
+    """
+    path = socket_path(workspace)
+    version = source_hash()
+    request = {"op": "session", "version": version}
+    try:
+        stream, buffered, reply = await _handshake(path, request)
+        if reply.get("status") != "ok":
+            await stream.aclose()
+            raise DaemonUnavailable(f"daemon refused the session: {reply}")
+    except DaemonUnavailable:
+        if not start:
+            raise
+        # A stale daemon shuts itself down after refusing; give it a moment to release the socket
+        process = start_daemon(workspace)
+        deadline = time.monotonic() + start_timeout
+        while True:
+            await asyncio.sleep(0.05)
+            try:
+                stream, buffered, reply = await _handshake(path, request)
+            except DaemonUnavailable:
+                reply = None
+            if reply is not None:
+                if reply.get("status") == "ok":
+                    break
+                await stream.aclose()
+                if reply.get("pid") == process.pid:
+                    # A daemon just started from the same sources still disagrees; retrying will not help
+                    raise DaemonUnavailable(f"daemon refused the session: {reply}")
+            if process.poll() is not None and process.returncode != 0 or time.monotonic() > deadline:
+                raise DaemonUnavailable(f"daemon did not start (see {path[:-len('.sock')]}.log)")
+        reply["started"] = True
+    async with stream:
+        async with json_line_streams(buffered, stream) as (read, write):
+            yield read, write, reply
+
+@asynccontextmanager
+async def open_tool_session(transport: str = "stdio", workspace: Optional[str] = None,
+                            errlog=None) -> AsyncIterator[Tuple[Any, str]]:
+    """
+    Yields (initialized ClientSession, description of the transport actually used).
+    With `daemon`, any failure to reach or start a daemon falls back to stdio. `inprocess` tools run
+    in the current working directory, so `workspace` must be it. `errlog` receives the stdio server's stderr.
+    """
+    if transport not in TRANSPORTS:
+        raise ValueError(f"Unknown tool transport '{transport}'. Expected one of: {', '.join(TRANSPORTS)}")
+    from mcp import ClientSession
+    workspace = os.path.abspath(workspace or os.getcwd())
+
+    if transport == "inprocess":
+        if workspace != os.getcwd():
+            raise ValueError("The inprocess transport runs tools in the current directory; chdir to the workspace first.")
+        yield InProcessToolSession(), "inprocess"
+        return
+
+    if transport == "daemon":
+        try:
+            async with daemon_streams(workspace) as (read, write, info):
+                async with ClientSession(read, write) as session:
+                    await session.initialize()
+                    state = "started" if info.get("started") else "attached"
+                    yield session, f"daemon ({state}, pid {info.get('pid')})"
+                    return
+        except DaemonUnavailable as e:
+            fallback_reason = str(e)
+        transport = "stdio"
+    else:
+        fallback_reason = None
+
+    from mcp.client.stdio import stdio_client, StdioServerParameters
+    server_params = StdioServerParameters(command=sys.executable, args=["-m", MCP_SERVER_MODULE], cwd=workspace,
+                                          env={**os.environ, "PYTHONPATH": PACKAGE_ROOT})
+    async with stdio_client(server_params, errlog=errlog or sys.stderr) as (read, write):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            yield session, "stdio" + (f" (daemon unavailable: {fallback_reason})" if fallback_reason else "")
+
+@asynccontextmanager
+async def background_tool_session(transport: str = "stdio", workspace: Optional[str] = None,
+                                  errlog=None) -> AsyncIterator[PendingToolSession]:
+    """
+    Like `open_tool_session`, but yields a PendingToolSession right away and connects in a background
+    task, so callers can get on with other start-up work (or the user's first prompt) meanwhile.
+    """
+    pending = PendingToolSession()
+    closing = asyncio.Event()
+
+    async def connect():
+        try:
+            async with open_tool_session(transport, workspace, errlog) as (session, used):
+                pending.session, pending.transport_used = session, used
+                pending._ready.set()
+                await closing.wait()
+        except Exception as e:
+            pending.error = e
+        finally:
+            pending._ready.set()
+
+    task = asyncio.create_task(connect())
+    try:
+        yield pending
+    finally:
+        closing.set()
+        await task
@@ -1,63 +1,153 @@
 # -*- coding: utf-8 -*-
 
-from typing import List, Any, Dict
-from google.genai import types
-from mcp.types import Tool as MCPTool
-
-def mcp_tool_to_genai_tool(mcp_tool: MCPTool) -> types.FunctionDeclaration:
-    """Converts an MCP Tool object to a Gemini FunctionDeclaration."""
-    gemini_properties: Dict[str, Any] = {}
-    required_params: List[str] = []
-    
-    if mcp_tool.inputSchema:
-        schema = mcp_tool.inputSchema
-        if 'properties' in schema and isinstance(schema['properties'], dict):
-            for param_name, param_details in schema['properties'].items():
-                param_type = param_details.get('type', 'STRING').upper()
-                param_description = param_details.get('description', f'Parameter {param_name}')
-                
-                # The 'type' parameter for Schema expects a string, not an enum.
-                gemini_properties[param_name] = types.Schema(
-                    type=param_type,
-                    description=param_description
-                )
-        if 'required' in schema and isinstance(schema['required'], list):
-            required_params = schema['required']
-            
+import json
+from typing import Any, Dict, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from google.genai import types
+    from mcp.types import Tool as MCPTool
+
+# JSON Schema keywords passed through to the providers besides type, description and the nested ones
+_OPENAI_KEYWORDS = ("enum", "format", "minimum", "maximum", "minItems", "maxItems", "minLength", "maxLength", "pattern")
+_GENAI_KEYWORDS = {"enum": "enum", "format": "format", "minimum": "minimum", "maximum": "maximum",
+                   "minItems": "min_items", "maxItems": "max_items", "minLength": "min_length",
+                   "maxLength": "max_length", "pattern": "pattern"}
+MAX_SCHEMA_DEPTH = 12  # recursive $refs are cut off here as plain objects
+
+def _resolve_schema(schema: Dict[str, Any], defs: Dict[str, Any]) -> Tuple[Dict[str, Any], bool]:
+    """
+    Inlines `$ref`s into `$defs` and unwraps `Optional[...]` (anyOf/type lists with null).
+    Returns (schema, nullable).
+    """
+    seen = set()
+    while "$ref" in schema:
+        ref = schema["$ref"]
+        if ref in seen or not ref.startswith("#/"):
+            break
+        seen.add(ref)
+        target = defs.get(ref.rsplit("/", 1)[-1], {})
+        schema = {**target, **{k: v for k, v in schema.items() if k != "$ref"}}
+    nullable = False
+    variants = schema.get("anyOf") or schema.get("oneOf")
+    if variants:
+        non_null = [v for v in variants if v.get("type") != "null"]
+        if len(non_null) < len(variants):
+            nullable = True
+            rest = {k: v for k, v in schema.items() if k not in ("anyOf", "oneOf")}
+            if len(non_null) == 1:
+                inner, _ = _resolve_schema(non_null[0], defs)
+                schema = {**inner, **rest}
+            else:
+                schema = {**rest, "anyOf": non_null}
+    if isinstance(schema.get("type"), list):
+        types_ = [t for t in schema["type"] if t != "null"]
+        nullable = nullable or len(types_) < len(schema["type"])
+        schema = {**schema, "type": types_[0] if types_ else "string"}
+    return schema, nullable
+
+def _openai_schema(schema: Dict[str, Any], defs: Dict[str, Any], name: str = "", depth: int = 0) -> Dict[str, Any]:
+    if depth > MAX_SCHEMA_DEPTH:
+        return {"type": "object"}
+    schema, _ = _resolve_schema(schema, defs)
+    depth += 1
+    if "anyOf" in schema and "type" not in schema:
+        converted = {"anyOf": [_openai_schema(v, defs, depth=depth) for v in schema["anyOf"]]}
+    else:
+        converted = {"type": str(schema.get("type", "string")).lower()}
+    description = schema.get("description") or (f"Parameter {name}" if name else None)
+    if description:
+        converted["description"] = description
+    for keyword in _OPENAI_KEYWORDS:
+        if keyword in schema:
+            converted[keyword] = schema[keyword]
+    if isinstance(schema.get("items"), dict):
+        converted["items"] = _openai_schema(schema["items"], defs, depth=depth)
+    if isinstance(schema.get("properties"), dict):
+        converted["properties"] = {k: _openai_schema(v, defs, k, depth) for k, v in schema["properties"].items()}
+        converted["required"] = list(schema.get("required", []))
+    if isinstance(schema.get("additionalProperties"), dict):
+        converted["additionalProperties"] = _openai_schema(schema["additionalProperties"], defs, depth=depth)
+    return converted
+
+def _genai_schema(schema: Dict[str, Any], defs: Dict[str, Any], name: str = "", depth: int = 0) -> "types.Schema":
+    from google.genai import types
+    if depth > MAX_SCHEMA_DEPTH:
+        return types.Schema(type="OBJECT")
+    schema, nullable = _resolve_schema(schema, defs)
+    depth += 1
+    fields: Dict[str, Any] = {}
+    if "anyOf" in schema and "type" not in schema:
+        fields["any_of"] = [_genai_schema(v, defs, depth=depth) for v in schema["anyOf"]]
+    else:
+        # The 'type' parameter for Schema expects a string, not an enum.
+        fields["type"] = str(schema.get("type", "STRING")).upper()
+    description = schema.get("description") or (f"Parameter {name}" if name else None)
+    if description:
+        fields["description"] = description
+    if nullable:
+        fields["nullable"] = True
+    for keyword, field in _GENAI_KEYWORDS.items():
+        if keyword in schema:
+            fields[field] = [str(v) for v in schema[keyword]] if keyword == "enum" else schema[keyword]
+    if isinstance(schema.get("items"), dict):
+        fields["items"] = _genai_schema(schema["items"], defs, depth=depth)
+    if isinstance(schema.get("properties"), dict):
+        fields["properties"] = {k: _genai_schema(v, defs, k, depth) for k, v in schema["properties"].items()}
+        fields["required"] = list(schema.get("required", []))
+    return types.Schema(**fields)
+
+def _parameters_schema(mcp_tool: "MCPTool") -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """The tool's input schema as an object schema, plus its `$defs`."""
+    schema = dict(mcp_tool.inputSchema or {})
+    defs = schema.get("$defs") or schema.get("definitions") or {}
+    schema["type"] = "object"
+    schema.setdefault("properties", {})
+    schema.pop("description", None)  # the tool description already says it
+    return schema, defs
+
+def mcp_tool_to_genai_tool(mcp_tool: "MCPTool") -> "types.FunctionDeclaration":
+    """Converts an MCP Tool object to a Gemini FunctionDeclaration, nested schemas included."""
+    from google.genai import types
+    schema, defs = _parameters_schema(mcp_tool)
     return types.FunctionDeclaration(
         name=mcp_tool.name,
         description=mcp_tool.description,
-        parameters=types.Schema(type='OBJECT', properties=gemini_properties, required=required_params)
+        parameters=_genai_schema(schema, defs)
     )
 
-def mcp_tool_to_openai_tool(mcp_tool: MCPTool) -> Dict[str, Any]:
-    """Converts an MCP Tool object to an OpenAI-compatible tool definition."""
-    properties: Dict[str, Any] = {}
-    required_params: List[str] = []
-
-    if mcp_tool.inputSchema:
-        schema = mcp_tool.inputSchema
-        if 'properties' in schema and isinstance(schema['properties'], dict):
-            for param_name, param_details in schema['properties'].items():
-                param_type = param_details.get('type', 'string').lower()
-                param_description = param_details.get('description', f'Parameter {param_name}')
-                
-                properties[param_name] = {
-                    "type": param_type,
-                    "description": param_description
-                }
-        if 'required' in schema and isinstance(schema['required'], list):
-            required_params = schema['required']
-
+def mcp_tool_to_openai_tool(mcp_tool: "MCPTool") -> Dict[str, Any]:
+    """Converts an MCP Tool object to an OpenAI-compatible tool definition, nested schemas included."""
+    schema, defs = _parameters_schema(mcp_tool)
     return {
         "type": "function",
         "function": {
             "name": mcp_tool.name,
             "description": mcp_tool.description,
-            "parameters": {
-                "type": "object",
-                "properties": properties,
-                "required": required_params
-            }
+            "parameters": _openai_schema(schema, defs)
         }
     }
+
+def tool_result_to_text(tool_result: Any) -> str:
+    """Flattens an MCP tool result (CallToolResult, FastMCP content list/tuple, dict or str) into text for the model."""
+    if isinstance(tool_result, str):
+        return tool_result
+    if isinstance(tool_result, dict):
+        return json.dumps(tool_result, default=str)
+    if isinstance(tool_result, tuple) and len(tool_result) == 2:
+        # FastMCP.call_tool returns (content_blocks, structured_result)
+        tool_result = tool_result[0]
+    blocks = getattr(tool_result, 'content', tool_result)
+    if not isinstance(blocks, (list, tuple)):
+        return str(tool_result)
+    texts = []
+    for block in blocks:
+        if getattr(block, 'text', None) is not None:
+            texts.append(block.text)
+        elif getattr(block, 'mimeType', None):
+            texts.append(f"[{block.type} content: {block.mimeType}]")
+        else:
+            texts.append(str(block))
+    text = "\n".join(texts)
+    if getattr(tool_result, 'isError', False):
+        return f"Error: {text}"
+    return text
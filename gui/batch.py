@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+
+import argparse
+import json
+import os
+
+from dotenv import load_dotenv
+
+from core.batch import BatchRunner, load_tasks, READ_ONLY
+from core.budget import TaskBudget
+from core.config import DEFAULT_PROVIDER
+from core.provider_registry import ProviderRegistry
+from gui.ui import create_message_panel, console
+
+async def batch_main(argv):
+    """`clia batch tasks.jsonl`: runs tasks headless and writes one JSON result per task."""
+    parser = argparse.ArgumentParser(prog="clia batch", description="Run many tasks without interaction")
+    parser.add_argument("tasks", help="JSONL file with one task per line ({\"id\", \"prompt\", \"workdir\", \"budget\"})")
+    parser.add_argument("--output", "-o", help="Results file (default: <tasks>.results.jsonl)")
+    parser.add_argument("--concurrency", "-j", type=int, default=4, help="Tasks running at the same time")
+    parser.add_argument("--policy", default=READ_ONLY,
+                        help="Tools approved without asking: 'read-only' (default), 'all', or a comma-separated list of tool names")
+    parser.add_argument("--provider", "-p", default=DEFAULT_PROVIDER, help="Override provider")
+    parser.add_argument("--model", "-m", help="Override model")
+    parser.add_argument("--deadline", type=float, help="Wall-clock budget per task in seconds (0 = unlimited)")
+    parser.add_argument("--max-tokens", type=int, help="Token budget per task (0 = unlimited)")
+    parser.add_argument("--max-tool-calls", type=int, help="Tool-call budget per task (0 = unlimited)")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    env_key = "GOOGLE_API_KEY" if args.provider == "gemini" else "GROQ_API_KEY"
+    if not os.environ.get(env_key):
+        console.print(create_message_panel(f"{env_key} is not set. Run `clia --setup` first.", role="error"))
+        return 1
+    try:
+        tasks = load_tasks(args.tasks)
+    except (OSError, ValueError) as e:
+        console.print(create_message_panel(f"Cannot read tasks: {e}", role="error"))
+        return 1
+    output = args.output or os.path.splitext(args.tasks)[0] + ".results.jsonl"
+
+    from swe_tools import mcp
+    registry = ProviderRegistry(await mcp.list_tools())
+    budget = TaskBudget().with_overrides(deadline_seconds=args.deadline, max_tokens=args.max_tokens,
+                                         max_tool_calls=args.max_tool_calls)
+
+    def on_result(result):
+        console.print(f"[{result['status']}] {result['id']} in {result['duration_seconds']:.1f}s, "
+                      f"{result['tool_calls']} tool calls, {result['tokens_in'] + result['tokens_out']} tokens")
+
+    console.print(create_message_panel(f"Running {len(tasks)} tasks, {args.concurrency} at a time. Results: {output}", role="info"))
+    runner = BatchRunner(lambda: registry.session(args.provider, args.model), output, concurrency=args.concurrency,
+                         policy=args.policy, budget=budget, on_result=on_result)
+    try:
+        report = await runner.run(tasks)
+    finally:
+        await registry.aclose()
+    console.print(create_message_panel(json.dumps(report, indent=2), role="info"))
+    return 0 if report["statuses"].get("ok", 0) == report["tasks"] else 1
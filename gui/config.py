@@ -1,8 +1,5 @@
 import os
-from dotenv import load_dotenv
-from core.config import MODEL_NAME, SYSTEM_PROMPT, MAX_TOOL_TURNS
-
-load_dotenv()
+from core.config import MODEL_NAME  # also loads .env
 
 # --- UI Configuration ---
 USER_NAME = "User"
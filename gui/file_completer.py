@@ -1,14 +1,32 @@
 import os
+import threading
 from prompt_toolkit.completion import Completer, Completion, CompleteEvent
 from prompt_toolkit.document import Document
+from core.config import WORKSPACE_INDEX
+from swe_tools.workspace_index import get_index, workspace_children
 
 class FileCompleter(Completer):
     """
     A completer that suggests files and directories in the current working directory
-    when the user types '@' followed by a filter string.
+    when the user types '@' followed by a filter string. A filter containing '/' completes
+    inside that directory. Entries come from the workspace index, so ignored files are not
+    suggested. When the CLI starts in a project root (a directory with .git), the top levels
+    of the index are listed in the background.
     """
+    WARM_UP_DEPTH = 2
+
     def __init__(self, path='.'):
-        self.base_path = path
+        self.base_path = os.path.abspath(path)
+        if WORKSPACE_INDEX != "off" and os.path.exists(os.path.join(self.base_path, '.git')):
+            threading.Thread(target=self._warm_up, name="file-index", daemon=True).start()
+
+    def _warm_up(self):
+        try:
+            index, rel_root = get_index(self.base_path)
+            for _ in index.walk(rel_root, max_depth=self.WARM_UP_DEPTH):
+                pass
+        except OSError:
+            pass
 
     def get_completions(self, document: Document, complete_event: CompleteEvent):
         text_before_cursor = document.text_before_cursor
@@ -22,17 +40,23 @@ class FileCompleter(Completer):
 
         # Get the text after the last '@'
         filter_text = text_before_cursor[at_index + 1:]
+        dir_part, _, name_filter = filter_text.rpartition('/')
 
-        files_and_dirs = []
         try:
-            # List all files and directories in the base_path
-            for entry in os.listdir(self.base_path):
-                # Filter based on the text typed after '@'
-                if entry.lower().startswith(filter_text.lower()):
-                    files_and_dirs.append(entry)
+            dirs, files = workspace_children(self.base_path, dir_part)
         except OSError:
             # Handle cases where directory might not exist or be accessible
-            pass
+            return
+        prefix = dir_part + '/' if dir_part else ''
+
+        files_and_dirs = []
+        for entry in dirs:
+            # Filter based on the text typed after '@' (or after its last '/')
+            if entry.lower().startswith(name_filter.lower()):
+                files_and_dirs.append(entry + '/')
+        for entry in files:
+            if entry.lower().startswith(name_filter.lower()):
+                files_and_dirs.append(entry)
 
         for item in sorted(files_and_dirs):
-            yield Completion(item, start_position=-len(filter_text))
+            yield Completion(prefix + item, start_position=-len(filter_text))
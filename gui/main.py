@@ -4,37 +4,27 @@
 import os
 import sys
 import asyncio
+import importlib
 import traceback
-from dotenv import load_dotenv
 from rich.text import Text
-from rich.live import Live
 from rich.panel import Panel
-from rich.spinner import Spinner
-from rich.console import Group
-from rich.markdown import Markdown
 from rich import box
 from datetime import datetime
-from google.genai import types
-from mcp import ClientSession
-from mcp.client.stdio import stdio_client, StdioServerParameters
-from prompt_toolkit import PromptSession
-from prompt_toolkit.auto_suggest import AutoSuggestFromHistory
-from prompt_toolkit.key_binding import KeyBindings
-from prompt_toolkit.keys import Keys
-from prompt_toolkit.formatted_text import HTML
-from prompt_toolkit.styles import Style
 
 import json
 
 from gui.config import MCP_SERVER_SCRIPT, THEME
-from core.config import MODEL_NAME
 from gui.ui import create_message_panel, show_welcome_screen, console, create_permission_panel
-from gui.client import get_gemini_client
-from core.tool_utils import mcp_tool_to_genai_tool
-from core.ai_core import AICore
-from gui.file_completer import FileCompleter
-from gui.tool_completer import ToolCompleter
-from gui.completers import CombinedCompleter
+
+# Imported only once a session starts, and only for the selected provider (see import_session_modules)
+SESSION_MODULES = [
+    "mcp", "mcp.client.stdio", "prompt_toolkit", "rich.live", "rich.spinner", "rich.markdown",
+    "core.ai_core", "core.budget", "core.tool_schema_cache", "core.tool_transport", "gui.completers",
+]
+PROVIDER_MODULES = {
+    "gemini": ["gui.client", "core.gemini_provider", "core.tool_utils"],
+    "groq": ["groq", "core.providers", "core.tool_utils"],
+}
 
 PERMISSIONS_FILE = "permissions.json"
 
@@ -62,13 +52,18 @@ sys.stdout.reconfigure(encoding='utf-8')
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 import argparse
-from core.config import DEFAULT_PROVIDER, GROQ_MODEL_NAME, MODEL_NAME, SYSTEM_PROMPT
-from core.providers import GeminiProvider, GroqProvider
-from groq import AsyncGroq
+from core.config import DEFAULT_PROVIDER, GROQ_MODEL_NAME, MODEL_NAME, METRICS_LOG_FILE, ROUTER_FAST_MODEL, TOOL_TRANSPORT
+from core.metrics import MetricsLogger, format_turn_summary
+
+def import_session_modules(provider_name):
+    """Imports what an interactive session with `provider_name` needs. Other providers' SDKs stay unloaded."""
+    for module in SESSION_MODULES + PROVIDER_MODULES.get(provider_name, PROVIDER_MODULES["groq"]):
+        importlib.import_module(module)
 
 async def onboarding_flow(force=False):
     """Interactive onboarding to choose provider and configure API keys."""
     # Reload env to ensure we have latest saved settings
+    from dotenv import load_dotenv
     load_dotenv()
     
     current_provider = os.environ.get("DEFAULT_PROVIDER")
@@ -152,8 +147,24 @@ async def main():
     parser.add_argument("--model", "-m", help="Override model")
     parser.add_argument("--base-url", "-b", help="Override API base URL")
     parser.add_argument("--setup", action="store_true", help="Force interactive setup")
+    parser.add_argument("--deadline", type=float, help="Wall-clock budget per request in seconds (0 = unlimited)")
+    parser.add_argument("--max-tokens", type=int, help="Token budget per request (0 = unlimited)")
+    parser.add_argument("--max-tool-calls", type=int, help="Tool-call budget per request (0 = unlimited)")
+    parser.add_argument("--show-timings", action="store_true", help="Show TTFT, streaming, token and tool timings after every model turn")
+    parser.add_argument("--metrics-log", default=METRICS_LOG_FILE, help="Append per-turn timing summaries to this JSONL file")
+    parser.add_argument("--fast-model", default=ROUTER_FAST_MODEL or None, help="Faster model for simple turns; the main model handles the rest")
+    parser.add_argument("--record", help="Record the model's streamed responses to a JSONL fixture for offline replay")
+    parser.add_argument("--transport", choices=["stdio", "daemon", "inprocess"], default=TOOL_TRANSPORT,
+                        help="Start a tool server per session (stdio), reuse a long-lived one for this workspace (daemon) "
+                             "or run the tools inside clia (inprocess)")
+    parser.add_argument("--profile-startup", action="store_true", help="Print an import-time breakdown of startup and exit")
     args = parser.parse_args()
 
+    if args.profile_startup:
+        from gui.startup_profile import print_startup_profile
+        print_startup_profile(args.provider or os.environ.get("DEFAULT_PROVIDER", DEFAULT_PROVIDER))
+        return
+
     # Smart onboarding
     provider_name, model_name, base_url = await onboarding_flow(force=args.setup)
     
@@ -168,13 +179,36 @@ async def main():
         # Trigger onboarding again if key is still missing
         provider_name, model_name, base_url = await onboarding_flow(force=True)
 
+    import_session_modules(provider_name)
+    from core.tool_schema_cache import ToolSchemaCache
+    from core.tool_transport import background_tool_session
+    from prompt_toolkit import PromptSession
+    from prompt_toolkit.auto_suggest import AutoSuggestFromHistory
+    from prompt_toolkit.key_binding import KeyBindings
+    from prompt_toolkit.keys import Keys
+    from prompt_toolkit.formatted_text import HTML
+    from prompt_toolkit.styles import Style
+    from rich.live import Live
+    from rich.spinner import Spinner
+    from rich.console import Group
+    from rich.markdown import Markdown
+    from core.ai_core import AICore
+    from core.budget import TaskBudget
+    from gui.file_completer import FileCompleter
+    from gui.tool_completer import ToolCompleter
+    from gui.completers import CombinedCompleter
+
     # Client instances
     gemini_client = None
     groq_client = None
 
     if provider_name == "gemini":
+        from gui.client import get_gemini_client
+        from core.gemini_provider import GeminiProvider
         gemini_client = await get_gemini_client()
     else:
+        from groq import AsyncGroq
+        from core.providers import GroqProvider
         groq_client = AsyncGroq(
             api_key=os.environ.get("GROQ_API_KEY"),
             base_url=base_url
@@ -186,204 +220,225 @@ async def main():
     console.print(create_message_panel(f"🛠️ Looking for tool server: {MCP_SERVER_SCRIPT}"))
 
     load_permissions()
+    metrics_logger = MetricsLogger(args.metrics_log, session_id=datetime.now().strftime("%Y%m%d-%H%M%S")) if args.metrics_log else None
 
-    server_params = StdioServerParameters(command=sys.executable, args=["-m", MCP_SERVER_SCRIPT], env={**os.environ.copy(), 'PYTHONPATH': os.getcwd()})
+    # Cached declarations let the provider be built while the tool server is still starting
+    schema_cache = ToolSchemaCache()
+    tool_declarations = schema_cache.load(provider_name)
 
     try:
-        async with stdio_client(server_params) as (read, write):
-            async with ClientSession(read, write) as mcp_session:
-                await mcp_session.initialize()
-                console.print(create_message_panel("✅ MCP Tool Server Connected."))
+        async with background_tool_session(args.transport) as mcp_session:
+            if tool_declarations is None:
+                await mcp_session.wait_ready()
+                console.print(create_message_panel(f"✅ MCP Tool Server Connected via {mcp_session.transport_used}."))
 
                 mcp_tools_response = await mcp_session.list_tools()
                 if not mcp_tools_response or not mcp_tools_response.tools:
                     console.print(create_message_panel("❌ ERROR: No tools found on the MCP server.", role="error"))
                     return
-
-                # Store tool descriptions for permission panel
-                tool_descriptions = {t.name: t.description for t in mcp_tools_response.tools}
-
-                if provider_name == "gemini":
-                    from core.tool_utils import mcp_tool_to_genai_tool
-                    gemini_tools = [mcp_tool_to_genai_tool(t) for t in mcp_tools_response.tools]
-                    provider = GeminiProvider(gemini_client, model_name, gemini_tools)
-                else:
-                    from core.tool_utils import mcp_tool_to_openai_tool
-                    groq_tools = [mcp_tool_to_openai_tool(t) for t in mcp_tools_response.tools]
-                    provider = GroqProvider(groq_client, model_name, groq_tools)
-
-                ai_core = AICore(provider, mcp_session)
-                chat_history = []
-
-                # Define custom styles for prompt_toolkit
-                custom_style = Style.from_dict({
-                    'completion-menu': 'bg:#1a1a1a #ffffff',
-                    'completion-menu.completion': 'bg:#1a1a1a #ffffff',
-                    'completion-menu.completion.current': 'bg:#007bff #ffffff',
-                    'completion-menu.completion.meta': 'fg:#888888',
-                    'completion-menu.completion.meta.current': 'fg:#ffffff bg:#007bff',
-                    'bottom-toolbar': 'bg:#333333 #ffffff',
-                })
-
-                # Initialize completers
-                file_completer = FileCompleter()
-                tool_names = [t.name for t in mcp_tools_response.tools]
-                tool_completer = ToolCompleter(tool_names=tool_names)
-                combined_completer = CombinedCompleter(file_completer, tool_completer)
-
-                # Define a callable for the bottom toolbar
-                def get_bottom_toolbar():
-                    return HTML(f"<b><style bg=\"#9400D3\" fg=\"#ffffff\">Press Ctrl-C to exit. Type '@' for file completion. Type '#' for tool completion.</style></b>")
-
-                # Setup prompt_toolkit session
-                session = PromptSession(
-                    completer=combined_completer,
-                    auto_suggest=AutoSuggestFromHistory(),
-                    bottom_toolbar=get_bottom_toolbar,
-                    style=custom_style
-                )
-
-                # Define key bindings
-                kb = KeyBindings()
-
-                @kb.add(Keys.ControlC)
-                def _(event):
-                    """Exit when Ctrl-C is pressed."""
-                    event.app.exit()
-
-
-
-                while True:
-                    try:
-                        user_task_input = await session.prompt_async(Text(f"{THEME['user_prompt_icon']} ", style=THEME['user_title']).plain, key_bindings=kb)
-
-                        if user_task_input is None:
-                            console.print(create_message_panel("Session ended. Goodbye!", role="info"))
-                            break
-                        if user_task_input.lower() in ["exit", "quit"]:
-                            console.print(create_message_panel("Session ended. Goodbye!"))
-                            break
-                        if not user_task_input.strip():
-                            continue
-
-                        console.print(create_message_panel(user_task_input, role="user"))
-
-                        spinner = Spinner("dots", text=Text("Thinking...", style="green"))
-                        thought_panel = Panel(
-                            Text(""),
-                            box=box.DOUBLE,
-                            border_style="green",
-                            padding=(1, 2),
-                            style=f"on {THEME['background_color']}"
-                        )
-                        live_group = Group(spinner)
-                        
-                        live = Live(live_group, console=console, auto_refresh=False, vertical_overflow="visible")
+                tool_declarations = schema_cache.store(provider_name, mcp_tools_response.tools)
+            else:
+                console.print(create_message_panel(f"✅ {len(tool_declarations.tools)} tools loaded from cache. "
+                                                   f"The tool server ({args.transport}) starts in the background."))
+
+            # Store tool descriptions for permission panel
+            tool_descriptions = tool_declarations.descriptions
+
+            if provider_name == "gemini":
+                provider = GeminiProvider(gemini_client, model_name, tool_declarations.declarations)
+                if args.fast_model:
+                    fast_provider = GeminiProvider(gemini_client, args.fast_model, provider.gemini_tools)
+            else:
+                provider = GroqProvider(groq_client, model_name, tool_declarations.declarations, tools_prepared=True)
+                if args.fast_model:
+                    fast_provider = GroqProvider(groq_client, args.fast_model, provider.tools, tools_prepared=True)
+
+            if args.fast_model:
+                from core.router import RoutingProvider
+                provider = RoutingProvider([("fast", fast_provider), ("strong", provider)])
+                console.print(create_message_panel(f"🔀 Routing simple turns to {args.fast_model}"))
+
+            if args.record:
+                from core.replay import RecordingProvider
+                provider = RecordingProvider(provider, args.record)
+
+            chat_history = []
+
+            # Define custom styles for prompt_toolkit
+            custom_style = Style.from_dict({
+                'completion-menu': 'bg:#1a1a1a #ffffff',
+                'completion-menu.completion': 'bg:#1a1a1a #ffffff',
+                'completion-menu.completion.current': 'bg:#007bff #ffffff',
+                'completion-menu.completion.meta': 'fg:#888888',
+                'completion-menu.completion.meta.current': 'fg:#ffffff bg:#007bff',
+                'bottom-toolbar': 'bg:#333333 #ffffff',
+            })
+
+            # Initialize completers
+            file_completer = FileCompleter()
+            tool_completer = ToolCompleter(tool_names=tool_declarations.names)
+            combined_completer = CombinedCompleter(file_completer, tool_completer)
+
+            # Define a callable for the bottom toolbar
+            def get_bottom_toolbar():
+                return HTML(f"<b><style bg=\"#9400D3\" fg=\"#ffffff\">Press Ctrl-C to exit. Type '@' for file completion. Type '#' for tool completion.</style></b>")
+
+            # Setup prompt_toolkit session
+            session = PromptSession(
+                completer=combined_completer,
+                auto_suggest=AutoSuggestFromHistory(),
+                bottom_toolbar=get_bottom_toolbar,
+                style=custom_style
+            )
+
+            # Define key bindings
+            kb = KeyBindings()
+
+            @kb.add(Keys.ControlC)
+            def _(event):
+                """Exit when Ctrl-C is pressed."""
+                event.app.exit()
+
+            # The Live display of the message being processed, paused while prompting for permission
+            ui_state = {"live": None}
+
+            async def ask_permission(tool_name, tool_args):
+                """Permission hook for AICore. Tools only run inside AICore once this returns True."""
+                if tool_name in always_allowed_tools:
+                    console.print(create_message_panel(f"Tool `{tool_name}` automatically allowed (always allowed).", role="info"))
+                    return True
+
+                live = ui_state["live"]
+                if live:
+                    live.stop()
+                tool_description = tool_descriptions.get(tool_name, "No description available.")
+                console.print(create_permission_panel(tool_name, str(tool_args), tool_description))
+                try:
+                    while True:
+                        permission_choice = await session.prompt_async(Text("Enter your choice (1, 2, or 3): ", style="bold white").plain)
+                        if permission_choice == "1":
+                            console.print(create_message_panel(f"Tool `{tool_name}` allowed for this turn.", role="info"))
+                            return True
+                        elif permission_choice == "2":
+                            always_allowed_tools.add(tool_name)
+                            save_permissions()
+                            console.print(create_message_panel(f"Tool `{tool_name}` always allowed from now on.", role="info"))
+                            return True
+                        elif permission_choice == "3":
+                            console.print(create_message_panel(f"Tool `{tool_name}` denied.", role="info"))
+                            return False
+                        else:
+                            console.print(create_message_panel("Invalid choice. Please enter 1, 2, or 3.", role="error"))
+                finally:
+                    if live:
                         live.start()
-                        
-                        first_thought_received = False
-                        
-                        try:
-                            #render spinner only
-                            live.refresh()
-                            async for event in ai_core.process_message(chat_history, user_task_input):
-                                if event["type"] == "stream":
-                                        live.refresh() 
-                                elif event["type"] == "stream_text":
-                                    # Used by Groq for text streaming
-                                    live.refresh()
-                                elif event["type"] == "thoughts": 
-                                    if not first_thought_received:
-                                        live_group.renderables.append(thought_panel)
-                                        first_thought_received = True
-                                    thought_panel.renderable = Markdown(event["content"], inline_code_lexer="python")
-                                elif event["type"] == "tool_call":
-                                    live.refresh()
-                                    
-                                    tool_name = event["tool_name"]
-                                    tool_args = event["tool_args"]
-                                    tool_description = tool_descriptions.get(tool_name, "No description available.")
-
-                                    tool_allowed = False
-                                    if tool_name in always_allowed_tools:
-                                        tool_allowed = True
-                                        console.print(create_message_panel(f"Tool `{tool_name}` automatically allowed (always allowed).", role="info"))
-                                    else:
-                                        live.stop()
-                                        console.print(create_permission_panel(tool_name, str(tool_args), tool_description))
-                                        while True:
-                                            permission_choice = await session.prompt_async(Text("Enter your choice (1, 2, or 3): ", style="bold white").plain)
-                                            if permission_choice == "1":
-                                                tool_allowed = True
-                                                console.print(create_message_panel(f"Tool `{tool_name}` allowed for this turn.", role="info"))
-                                                break
-                                            elif permission_choice == "2":
-                                                tool_allowed = True
-                                                always_allowed_tools.add(tool_name)
-                                                save_permissions()
-                                                console.print(create_message_panel(f"Tool `{tool_name}` always allowed from now on.", role="info"))
-                                                break
-                                            elif permission_choice == "3":
-                                                tool_allowed = False
-                                                console.print(create_message_panel(f"Tool `{tool_name}` denied.", role="info"))
-                                                break
-                                            else:
-                                                console.print(create_message_panel("Invalid choice. Please enter 1, 2, or 3.", role="error"))
-                                        live.start()
-                                        live.refresh()
-                                    
-                                    if tool_allowed:
-                                        console.print(create_message_panel(f"Calling tool `{tool_name}` with arguments: `{tool_args}`", role="tool_call"))
-                                        tool_result = await ai_core.mcp_session.call_tool(tool_name, tool_args)
-                                        
-                                        # Standardize tool result handling in history
-                                        # Note: History management for tool responses is complex across providers.
-                                        # For now, we update the simple history list.
-                                        
-                                        console.print(create_message_panel(f'''Tool `{tool_name}` returned: 
-                                                        ```json
-                                                        {str(tool_result)}
-                                                        ```''', role="info", title="Tool Result"))
-                                    else:
-                                        tool_result = {"status": "denied", "message": f"Tool call for `{tool_name}` was denied by the user."}
-                                        console.print(create_message_panel(f'''Tool `{tool_name}` returned: 
-                                                        ```json
-                                                        {str(tool_result)}
-                                                        ```''', role="info", title="Tool Result"))
-                                        live.refresh()
-                                elif event["type"] == "tool_result":
-                                    # Handled above, but we could add to history here if needed
-                                    pass
-                                elif event["type"] == "bot_response":
-                                    live.stop()  
-                                    console.print(create_message_panel(event["content"], role="bot"))
-                                    # Add user and bot messages to history
-                                    chat_history.append({"role": "user", "content": user_task_input})
-                                    chat_history.append({"role": "assistant", "content": event["content"]})
-                                    break
-                                elif event["type"] == "error":
-                                    live.stop()   
-                                    console.print(create_message_panel(event["content"], role="error"))
-                                    break
-                        finally:
-    
-                            live.stop()
+                        live.refresh()
 
-                    except EOFError:
+            budget = TaskBudget().with_overrides(deadline_seconds=args.deadline, max_tokens=args.max_tokens, max_tool_calls=args.max_tool_calls)
+            ai_core = AICore(provider, mcp_session, permission_callback=ask_permission, budget=budget)
+
+
+            while True:
+                try:
+                    user_task_input = await session.prompt_async(Text(f"{THEME['user_prompt_icon']} ", style=THEME['user_title']).plain, key_bindings=kb)
+
+                    if user_task_input is None:
+                        console.print(create_message_panel("Session ended. Goodbye!", role="info"))
                         break
-                    except KeyboardInterrupt:
-                        console.print(create_message_panel("\nChat interrupted by user. Exiting.", role="info"))
+                    if user_task_input.lower() in ["exit", "quit"]:
+                        console.print(create_message_panel("Session ended. Goodbye!"))
                         break
-                    except Exception as e:
-                        error_msg = f"An error occurred: {e}\n{traceback.format_exc()}"
-                        console.print(create_message_panel(error_msg, role="error"))
+                    if not user_task_input.strip():
                         continue
-    
+
+                    console.print(create_message_panel(user_task_input, role="user"))
+
+                    spinner = Spinner("dots", text=Text("Thinking...", style="green"))
+                    thought_panel = Panel(
+                        Text(""),
+                        box=box.DOUBLE,
+                        border_style="green",
+                        padding=(1, 2),
+                        style=f"on {THEME['background_color']}"
+                    )
+                    live_group = Group(spinner)
+                    
+                    live = Live(live_group, console=console, auto_refresh=False, vertical_overflow="visible")
+                    live.start()
+                    ui_state["live"] = live
+                    
+                    first_thought_received = False
+                    
+                    try:
+                        #render spinner only
+                        live.refresh()
+                        async for event in ai_core.process_message(chat_history, user_task_input):
+                            if event["type"] == "stream":
+                                    live.refresh() 
+                            elif event["type"] == "stream_text":
+                                # Used by Groq for text streaming
+                                live.refresh()
+                            elif event["type"] == "thoughts": 
+                                if not first_thought_received:
+                                    live_group.renderables.append(thought_panel)
+                                    first_thought_received = True
+                                thought_panel.renderable = Markdown(event["content"], inline_code_lexer="python")
+                            elif event["type"] == "tool_call":
+                                console.print(create_message_panel(f"Calling tool `{event['tool_name']}` with arguments: `{event['tool_args']}`", role="tool_call"))
+                                live.refresh()
+                            elif event["type"] == "tool_result":
+                                console.print(create_message_panel(f'''Tool `{event["tool_name"]}` returned: 
+                                                ```json
+                                                {str(event["result"])}
+                                                ```''', role="info", title="Tool Result"))
+                                live.refresh()
+                            elif event["type"] == "turn_summary":
+                                if metrics_logger:
+                                    metrics_logger.log(event["metrics"], provider=provider_name, model=model_name)
+                                if args.show_timings:
+                                    console.print(create_message_panel(format_turn_summary(event["metrics"]), role="info"))
+                                    live.refresh()
+                            elif event["type"] == "context_compacted":
+                                console.print(create_message_panel(f"Context compacted: saved {event['tokens_saved']} tokens ({event['tokens_before']} → {event['tokens_after']}).", role="info"))
+                                live.refresh()
+                            elif event["type"] == "request_trimmed":
+                                console.print(create_message_panel(f"Request too large: trimmed {event['trimmed_tool_outputs']} tool output(s) ({event['tokens_before']} → {event['tokens_after']} estimated tokens, limit {event['limit']}).", role="info"))
+                                live.refresh()
+                            elif event["type"] == "bot_response":
+                                live.stop()  
+                                console.print(create_message_panel(event["content"], role="bot"))
+                                # AICore has already recorded the exchange in chat_history
+                                break
+                            elif event["type"] == "budget_exhausted":
+                                live.stop()
+                                if event["partial"]:
+                                    console.print(create_message_panel(event["partial"], role="bot"))
+                            elif event["type"] == "error":
+                                live.stop()   
+                                console.print(create_message_panel(event["content"], role="error"))
+                                break
+                    finally:
+                        ui_state["live"] = None
+                        live.stop()
+
+                except EOFError:
+                    break
+                except KeyboardInterrupt:
+                    console.print(create_message_panel("\nChat interrupted by user. Exiting.", role="info"))
+                    break
+                except Exception as e:
+                    error_msg = f"An error occurred: {e}\n{traceback.format_exc()}"
+                    console.print(create_message_panel(error_msg, role="error"))
+                    continue
+
     except Exception as e:
         console.print(create_message_panel(f"❌ An unexpected error occurred during MCP server connection: {e}\n{traceback.format_exc()}", role="error"))
 
 def run_clia():
     """Entry point for the console script."""
+    if sys.argv[1:2] == ["batch"]:
+        from gui.batch import batch_main
+        sys.exit(asyncio.run(batch_main(sys.argv[2:])))
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
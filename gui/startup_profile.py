@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+
+import os
+import re
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+from rich.table import Table
+
+from gui.ui import console
+
+PACKAGE_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+_IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+def measure_startup_imports(provider_name: str) -> List[Tuple[str, int, int, int]]:
+    """
+    Imports the CLI and the modules a session with `provider_name` loads, in a fresh interpreter
+    under `-X importtime`. Returns (module, self us, cumulative us, depth) in import order.
+    """
+    code = f"import gui.main; gui.main.import_session_modules({provider_name!r})"
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=PACKAGE_ROOT,
+                            env={**os.environ, "PYTHONPATH": PACKAGE_ROOT}, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "import failed")
+    rows = []
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            rows.append((match.group(4), int(match.group(1)), int(match.group(2)), (len(match.group(3)) - 1) // 2))
+    return rows
+
+def print_startup_profile(provider_name: str, top: int = 15):
+    """Prints startup import time grouped by top-level package, plus the slowest direct imports."""
+    rows = measure_startup_imports(provider_name)
+    by_package: Dict[str, List[int]] = {}
+    for module, self_us, _, _ in rows:
+        package = module.split('.')[0]
+        entry = by_package.setdefault(package, [0, 0])
+        entry[0] += self_us
+        entry[1] += 1
+    total_us = sum(self_us for _, self_us, _, _ in rows)
+
+    console.print(f"Startup imports for provider '{provider_name}': {total_us / 1000:.0f} ms in {len(rows)} modules")
+    table = Table(title="Import time by package (self)")
+    table.add_column("Package")
+    table.add_column("ms", justify="right")
+    table.add_column("%", justify="right")
+    table.add_column("Modules", justify="right")
+    for package, (self_us, count) in sorted(by_package.items(), key=lambda item: -item[1][0])[:top]:
+        table.add_row(package, f"{self_us / 1000:.1f}", f"{self_us / total_us * 100:.0f}", str(count))
+    console.print(table)
+
+    direct = Table(title="Slowest top-level imports (cumulative)")
+    direct.add_column("Module")
+    direct.add_column("ms", justify="right")
+    for module, _, cumulative_us, _ in sorted((r for r in rows if r[3] == 0), key=lambda r: -r[2])[:top]:
+        direct.add_row(module, f"{cumulative_us / 1000:.1f}")
+    console.print(direct)
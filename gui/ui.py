@@ -8,7 +8,6 @@ from rich.panel import Panel
 from rich.text import Text
 from rich.align import Align
 from rich import box
-from rich.syntax import Syntax
 import json
 from typing import List
 from gui.config import THEME, USER_NAME, BOT_NAME, MODEL_NAME
@@ -27,6 +26,7 @@ def create_message_panel(text: str, role: str = "info", title: str | None = None
     if title:
         title_markup = f"[{THEME['info_title']}]{THEME['info_title_icon']} {title} [dim]({timestamp})[/]"
         if title == "Tool Result":
+            from rich.syntax import Syntax  # pulls in pygments; only needed for tool results
             try:
                 json_data = json.loads(text)
                 renderable_content = Syntax(json.dumps(json_data, indent=2), "json", theme="monokai", line_numbers=False)
@@ -1,12 +1,20 @@
-from swe_tools.instance import mcp
+# The tool modules (and FastMCP) are imported on first access to `mcp`, so helpers such as
+# swe_tools.path_matcher can be imported on their own without registering every tool.
 
-# Import all tool modules to register them with the FastMCP instance
-from swe_tools import cli_commander
-from swe_tools import codebase_restorer
-from swe_tools import codebase_snapshot_generator
-from swe_tools import directory_tree_viewer
-from swe_tools import file_deleter
-from swe_tools import file_fetcher
-from swe_tools import line_editor
-from swe_tools import utils
-from swe_tools import image_viewer
+def __getattr__(name):
+    if name == "mcp":
+        from swe_tools.instance import mcp
+
+        # Import all tool modules to register them with the FastMCP instance
+        from swe_tools import cli_commander
+        from swe_tools import codebase_restorer
+        from swe_tools import codebase_snapshot_generator
+        from swe_tools import directory_tree_viewer
+        from swe_tools import file_deleter
+        from swe_tools import file_fetcher
+        from swe_tools import line_editor
+        from swe_tools import utils
+        from swe_tools import image_viewer
+        globals()["mcp"] = mcp
+        return mcp
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,8 +1,65 @@
 import os
+import secrets
+import stat
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Tuple
+from core.config import RESTORE_WRITE_WORKERS
 from swe_tools.instance import mcp
 from swe_tools.utils import parse_multiline_commands
 
-@mcp.tool(name="write_files_from_snapshot", description="This tool is designed to reconstruct or update files and directories within the project's filesystem based on a provided 'snapshot' string. This snapshot string is a structured representation of file paths and their corresponding line-numbered content, typically generated by the `generate_codebase_snapshot` tool. When executed, this tool will parse the input snapshot, create any necessary parent directories if they do not already exist, and then write or completely overwrite the specified files with the provided content. This operation is powerful and can significantly alter the project's state. It is crucial to understand that existing files with matching paths in the snapshot will be entirely replaced by the content in the snapshot, and new files will be created if their paths do not exist. Therefore, this tool should be used with extreme caution, ideally after reviewing the snapshot content and confirming the intended changes. The tool provides a report detailing the success or failure of writing each file, including any errors encountered during directory creation or file writing.")
+# Outcomes of restore_file
+WRITTEN = "written"
+UNCHANGED = "unchanged"
+FAILED = "failed"
+
+def _same_content(path: str, data: bytes) -> bool:
+    """True if `path` is a regular file holding exactly `data` (sizes are compared before any read)."""
+    try:
+        st = os.stat(path)
+        if not stat.S_ISREG(st.st_mode) or st.st_size != len(data):
+            return False
+        with open(path, "rb") as f:
+            return f.read(len(data) + 1) == data
+    except OSError:
+        return False
+
+def restore_file(full_path: str, data: bytes) -> Tuple[str, str]:
+    """
+    Writes `data` to `full_path` unless the file already holds it. The new content goes to a temporary
+    file in the same directory that then replaces the target, so readers never see a half-written file.
+    The existing file's permissions are kept and symlinks are written through. Returns (outcome, error).
+    """
+    target = os.path.realpath(full_path)
+    if _same_content(target, data):
+        return UNCHANGED, ""
+    parent_dir = os.path.dirname(target)
+    tmp_path = os.path.join(parent_dir, f".{os.path.basename(target)}.{secrets.token_hex(4)}.tmp")
+    try:
+        if parent_dir: os.makedirs(parent_dir, exist_ok=True)
+        try:
+            with open(tmp_path, "xb") as f:
+                f.write(data)
+        except PermissionError:
+            if not os.path.isfile(target):
+                raise
+            with open(target, "wb") as f:  # the directory is not writable, but the file is
+                f.write(data)
+            return WRITTEN, ""
+        try:
+            os.chmod(tmp_path, stat.S_IMODE(os.stat(target).st_mode))
+        except FileNotFoundError:
+            pass  # a new file keeps the default permissions
+        os.replace(tmp_path, target)
+        return WRITTEN, ""
+    except Exception as e:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        return FAILED, str(e)
+
+@mcp.tool(name="write_files_from_snapshot", description="This tool is designed to reconstruct or update files and directories within the project's filesystem based on a provided 'snapshot' string. This snapshot string is a structured representation of file paths and their corresponding line-numbered content, typically generated by the `generate_codebase_snapshot` tool. When executed, this tool will parse the input snapshot, create any necessary parent directories if they do not already exist, and then write or completely overwrite the specified files with the provided content. This operation is powerful and can significantly alter the project's state. It is crucial to understand that existing files with matching paths in the snapshot will be entirely replaced by the content in the snapshot, and new files will be created if their paths do not exist. Therefore, this tool should be used with extreme caution, ideally after reviewing the snapshot content and confirming the intended changes. Files that already have exactly the snapshot's content are left untouched (their modification times do not change), and every other file is replaced atomically. The tool provides a report with the number of files written, unchanged and failed, and lists each file written or failed, including any errors encountered during directory creation or file writing.")
 def write_files_from_snapshot(input_snapshot_content: str, output_directory: str = ".") -> str:
     """
     Reconstructs files and directories from a provided snapshot string. This tool is used to create new files or overwrite existing ones based on the snapshot's content. The snapshot format includes '$filepath' followed by line-numbered code.
@@ -13,20 +70,24 @@ def write_files_from_snapshot(input_snapshot_content: str, output_directory: str
     """
     commands = parse_multiline_commands(input_snapshot_content)
     if not commands: return "Error: Input snapshot content is empty or invalid."
+    started = time.perf_counter()
     os.makedirs(output_directory, exist_ok=True)
+    jobs = [(file_path, os.path.join(output_directory, file_path),
+             "".join(c + os.linesep for _, c in contents).encode('utf-8'))
+            for file_path, contents in commands.items()]
+    workers = max(1, min(RESTORE_WRITE_WORKERS, len(jobs)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="restore") as pool:
+        results = list(pool.map(lambda job: restore_file(job[1], job[2]), jobs))
+
+    counts = {WRITTEN: 0, UNCHANGED: 0, FAILED: 0}
     report = []
-    files_created = 0
-    for file_path, contents in commands.items():
-        full_path = os.path.join(output_directory, file_path)
-        try:
-            parent_dir = os.path.dirname(full_path)
-            if parent_dir: os.makedirs(parent_dir, exist_ok=True)
-            file_lines = [c for _, c in contents]
-            with open(full_path, 'w', encoding='utf-8') as f:
-                f.writelines([line + '\n' for line in file_lines])
-            files_created += 1
+    for (file_path, _, _), (outcome, error) in zip(jobs, results):
+        counts[outcome] += 1
+        if outcome == WRITTEN:
             report.append(f"Successfully wrote {file_path}")
-        except Exception as e:
-            report.append(f"Error writing file {file_path}: {e}")
-    return f"Restorer finished. Created/modified {files_created} files.\n" + "\n".join(report)
-
+        elif outcome == FAILED:
+            report.append(f"Error writing file {file_path}: {error}")
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    summary = (f"Restorer finished in {elapsed_ms:.0f} ms. Wrote {counts[WRITTEN]} files, "
+               f"{counts[UNCHANGED]} unchanged (skipped), {counts[FAILED]} failed.\n")
+    return summary + "\n".join(report)
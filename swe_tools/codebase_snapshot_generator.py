@@ -1,8 +1,11 @@
 import os
-import mimetypes
 from typing import Optional
+from core.config import SNAPSHOT_MAX_FILE_BYTES, SNAPSHOT_MAX_TOTAL_BYTES
 from swe_tools.instance import mcp
-from swe_tools.utils import is_ignored, DEFAULT_IGNORE_PATTERNS
+from swe_tools.paging import cursors
+from swe_tools.path_matcher import parse_ignore_arg
+from swe_tools.snapshot_index import SnapshotPages, full_snapshot, snapshot_delta, snapshot_index
+from swe_tools.workspace_index import workspace_files
 
 @mcp.tool(name="read_codebase_snapshot", description="""This tool creates a comprehensive, detailed string representation (a 'snapshot') of a specified directory's contents, including all files and their line-numbered content. It is invaluable for capturing the exact state of a codebase, a specific module, or a set of files for various purposes such as:
 *   **Code Analysis:** Providing a complete view of code for review, understanding, or debugging.
@@ -11,37 +14,45 @@ from swe_tools.utils import is_ignored, DEFAULT_IGNORE_PATTERNS
 
 The snapshot output format is highly structured: each file's content is preceded by a `$` followed by its relative path (from the specified `path` argument), and then the content itself is presented with line numbers, enclosed within triple backticks (```). This format ensures clarity and easy parsing.
 
-The tool intelligently handles directory traversal and can exclude files and directories based on predefined and user-specified ignore patterns. By default, it respects common ignore patterns (e.g., `.git`, `node_modules`, `__pycache__`). Users can extend these exclusions by providing additional glob patterns via the `ignore` parameter.""")
-def read_codebase_snapshot(path: str = ".", ignore: Optional[str] = None) -> str:
+The tool intelligently handles directory traversal and can exclude files and directories based on predefined and user-specified ignore patterns. By default, it respects common ignore patterns (e.g., `.git`, `node_modules`, `__pycache__`). Users can extend these exclusions by providing additional glob patterns via the `ignore` parameter.
+
+Binary files are detected by their content and left out. Files larger than `max_file_bytes` are skipped, and the snapshot stops before the file that would take it past `max_total_bytes`; files are always in the same order (sorted by path within each directory), so the included files are a predictable prefix. Everything left out is listed in a report after the last file. If the report shows files over the total limit, snapshot a subdirectory or add `ignore` patterns rather than raising the limits.
+
+Every snapshot ends with a `[Snapshot token: ...]` line. To see what changed after edits, call the tool again with the same `path` and `ignore` and that token as `since`: the result then contains only the files added or modified since that snapshot (in the same format) and the list of deleted files, plus a new token. Unchanged files are not re-read. If the token has expired, a full snapshot is returned instead.
+
+To read a large directory in parts, set `page_files` (and/or `page_bytes`): each page then holds at most that many files (bytes), `max_total_bytes` does not apply, and the page ends with a line holding a `cursor`. Call the tool again with only that `cursor` for the next page; each cursor works once and expires after a few minutes without use. The last page carries the snapshot token. A `since` delta is always returned in one piece.""")
+def read_codebase_snapshot(path: str = ".", ignore: Optional[str] = None, max_file_bytes: int = SNAPSHOT_MAX_FILE_BYTES,
+                           max_total_bytes: int = SNAPSHOT_MAX_TOTAL_BYTES, since: Optional[str] = None,
+                           page_files: int = 0, page_bytes: int = 0, cursor: Optional[str] = None) -> str:
     """
     Creates a detailed string snapshot of a specified directory, including file paths and line-numbered content. This is useful for capturing the current state of a codebase or specific files for analysis or restoration. Ignored files and directories can be excluded.
 
     Args:
         path: The root directory to snapshot (e.g., '.'). Defaults to current directory.
         ignore: Optional comma-separated string of glob patterns to ignore.
+        max_file_bytes: Files larger than this are skipped (0 = no limit).
+        max_total_bytes: The snapshot stops before the file that would exceed this size (0 = no limit).
+        since: Token of an earlier snapshot of the same path; only the changes since then are returned.
+        page_files: Return at most this many files per page (0 = no paging).
+        page_bytes: Return at most this many bytes of file content per page (0 = no paging).
+        cursor: The cursor from the previous page; the other arguments except the page sizes are then ignored.
     """
-    user_ignore_patterns = [p.strip() for p in ignore.split(',')] if ignore is not None else []
-    all_ignore_patterns = list(set(DEFAULT_IGNORE_PATTERNS + user_ignore_patterns))
+    if cursor:
+        return cursors.resume(cursor, SnapshotPages.kind, page_files, page_bytes)
     abs_root = os.path.abspath(path)
     if not os.path.isdir(abs_root): return f"Error: Source directory not found: {abs_root}"
-    snapshot_parts = []
-    for dirpath, dirnames, filenames in os.walk(abs_root, topdown=True):
-        dirs_to_remove = {d for d in dirnames if is_ignored(os.path.relpath(os.path.join(dirpath, d), abs_root), all_ignore_patterns)}
-        dirnames[:] = [d for d in dirnames if d not in dirs_to_remove]
-        for filename in sorted(filenames):
-            filepath = os.path.join(dirpath, filename)
-            relative_filepath = os.path.relpath(filepath, abs_root).replace("\\", "/")
-            if is_ignored(relative_filepath, all_ignore_patterns): continue
-            snapshot_parts.append(f"${relative_filepath}\n```\n")
-            mime_type, _ = mimetypes.guess_type(filepath)
-            if mime_type and not mime_type.startswith('text/'):
-                snapshot_parts.append(f"Binary file: {mime_type} (content skipped)\n")
-            else:
-                try:
-                    with open(filepath, "r", encoding='utf-8', errors='ignore') as f:
-                        for i, line in enumerate(f):
-                            snapshot_parts.append(f"{i + 1}:{line.rstrip()}\n")
-                except Exception as e:
-                    snapshot_parts.append(f"Error reading file: {e}\n")
-            snapshot_parts.append("```\n\n")
-    return "".join(snapshot_parts) if snapshot_parts else "Snapshot could not be generated because the directory is empty or contains no matching files."
+    ignore_patterns = parse_ignore_arg(ignore)
+    base = snapshot_index.lookup(since, abs_root, ignore_patterns)
+    rel_paths = workspace_files(abs_root, ignore_patterns)
+    if base is None and (page_files > 0 or page_bytes > 0):
+        pages = cursors.start(SnapshotPages(abs_root, ignore_patterns, rel_paths, max_file_bytes), page_files, page_bytes)
+        return f"[Snapshot token {since} is unknown or has expired; full snapshot follows.]\n{pages}" if since else pages
+    rel_paths = list(rel_paths)
+    if base is not None:
+        return snapshot_delta(base, rel_paths, max_file_bytes, max_total_bytes)
+    snapshot, report, _ = full_snapshot(abs_root, ignore_patterns, rel_paths, max_file_bytes, max_total_bytes)
+    if not report.included and not report.skipped_count:
+        return "Snapshot could not be generated because the directory is empty or contains no matching files."
+    if since:
+        snapshot = f"[Snapshot token {since} is unknown or has expired; full snapshot follows.]\n" + snapshot
+    return snapshot
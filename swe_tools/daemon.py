@@ -0,0 +1,182 @@
+"""
+Long-lived tool server for one workspace.
+
+Serves the same tools as run_server.py, but over a Unix socket so that later `clia` sessions in the
+workspace attach to it instead of starting (and importing) a new server each time. Each connection
+starts with one JSON line: {"op": "session", "version": <swe_tools source hash>} (answered with
+{"status": "ok"} or {"status": "stale"}) or {"op": "shutdown"}. After an "ok", the connection carries
+newline-delimited MCP JSON-RPC like the stdio server does.
+
+The socket is keyed on the workspace and the client's environment (see core.tool_transport.socket_path),
+since the tools run with the environment of the client that started the daemon. The swe_tools instance
+runs tool calls in worker threads, so a long call does not hold up the other sessions.
+
+A daemon whose source hash no longer matches the client's stops accepting connections and exits when
+its last session ends, so that the client can start a fresh one. It also exits after
+`--idle-timeout` seconds without sessions. Started by core/tool_transport.py; run by hand with
+`python -m swe_tools.daemon --workspace DIR` or stop with `--stop`.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import anyio
+from anyio.streams.buffered import BufferedByteReceiveStream
+from mcp.server.lowlevel import Server
+
+# Add project root to sys.path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.config import TOOL_DAEMON_IDLE_SECONDS
+from core.tool_transport import json_line_streams, socket_path, source_hash
+
+def tool_server() -> Server:
+    """A low-level MCP server answering tool requests with the registered swe_tools."""
+    from swe_tools.instance import mcp
+    server = Server(mcp.name)
+    server.list_tools()(mcp.list_tools)
+    # FastMCP validates (and converts) the arguments itself
+    server.call_tool(validate_input=False)(mcp.call_tool)
+    return server
+
+def log(message):
+    print(f"{time.strftime('%Y-%m-%d %H:%M:%S')} [{os.getpid()}] {message}", file=sys.stderr, flush=True)
+
+class ToolDaemon:
+    def __init__(self, workspace, path, idle_timeout):
+        self.workspace = workspace
+        self.path = path
+        self.idle_timeout = idle_timeout
+        self.version = source_hash()
+        self.active = 0
+        self.sessions = 0
+        self.last_activity = time.monotonic()
+        self.retiring = False
+        self.listener = None
+        self._inode = None
+        self._task_group = None
+        self.server = tool_server()
+
+    async def _socket_in_use(self):
+        try:
+            stream = await anyio.connect_unix(self.path)
+        except OSError:
+            return False
+        await stream.aclose()
+        return True
+
+    def _release_socket(self):
+        # Only remove the socket file if it is still ours; a successor may have bound the path already
+        try:
+            if self._inode is not None and os.stat(self.path).st_ino == self._inode:
+                os.unlink(self.path)
+        except OSError:
+            pass
+        self._inode = None
+
+    async def _reply(self, stream, status):
+        reply = {"status": status, "version": self.version, "pid": os.getpid(), "workspace": self.workspace}
+        await stream.send(json.dumps(reply).encode() + b"\n")
+
+    async def _retire(self):
+        """Stops accepting connections; the daemon exits once the running sessions have ended."""
+        if not self.retiring:
+            self.retiring = True
+            self._release_socket()
+            await self.listener.aclose()
+
+    async def handle(self, stream):
+        async with stream:
+            try:
+                buffered = BufferedByteReceiveStream(stream)
+                request = json.loads(await buffered.receive_until(b"\n", 65536))
+                op = request.get("op")
+                if op == "shutdown":
+                    log("shutdown requested")
+                    await self._reply(stream, "ok")
+                    self._task_group.cancel_scope.cancel()
+                    return
+                if op != "session":
+                    await self._reply(stream, "error")
+                    return
+                if request.get("version") != self.version:
+                    log(f"client runs other swe_tools sources ({request.get('version')}), retiring")
+                    await self._retire()
+                    await self._reply(stream, "stale")
+                    return
+                if self.retiring:
+                    await self._reply(stream, "stale")
+                    return
+
+                self.active += 1
+                self.sessions += 1
+                log(f"session {self.sessions} started ({self.active} active)")
+                try:
+                    await self._reply(stream, "ok")
+                    async with json_line_streams(buffered, stream) as (read, write):
+                        await self.server.run(read, write, self.server.create_initialization_options())
+                finally:
+                    self.active -= 1
+                    self.last_activity = time.monotonic()
+                    log(f"session ended ({self.active} active)")
+            except Exception as e:
+                # One broken client must not take the other sessions down
+                log(f"connection failed: {type(e).__name__}: {e}")
+
+    async def watch_idle(self):
+        while True:
+            await anyio.sleep(1.0)
+            if self.active:
+                continue
+            if self.retiring or (self.idle_timeout > 0 and time.monotonic() - self.last_activity >= self.idle_timeout):
+                log("retired" if self.retiring else f"idle for {self.idle_timeout}s, exiting")
+                self._task_group.cancel_scope.cancel()
+                return
+
+    async def serve(self):
+        if os.path.exists(self.path):
+            if await self._socket_in_use():
+                log(f"another daemon is already serving {self.path}")
+                return
+            os.unlink(self.path)  # left behind by a daemon that did not exit cleanly
+        self.listener = await anyio.create_unix_listener(self.path)
+        os.chmod(self.path, 0o600)
+        self._inode = os.stat(self.path).st_ino
+        log(f"serving {self.workspace} on {self.path} (version {self.version[:12]})")
+        try:
+            async with anyio.create_task_group() as tg:
+                self._task_group = tg
+                tg.start_soon(self.watch_idle)
+                try:
+                    await self.listener.serve(self.handle, task_group=tg)
+                except anyio.ClosedResourceError:
+                    pass  # retiring; watch_idle ends the daemon after the last session
+        finally:
+            self._release_socket()
+
+def main():
+    parser = argparse.ArgumentParser(description="Long-lived swe_tools server for one workspace")
+    parser.add_argument("--workspace", default=os.getcwd(), help="Directory the tools operate in")
+    parser.add_argument("--socket", help="Unix socket path (default: derived from the workspace)")
+    parser.add_argument("--idle-timeout", type=float, default=TOOL_DAEMON_IDLE_SECONDS,
+                        help="Exit after this many seconds without sessions (0 = never)")
+    parser.add_argument("--stop", action="store_true", help="Stop the workspace's daemon and exit")
+    args = parser.parse_args()
+
+    workspace = os.path.abspath(args.workspace)
+    if args.stop:
+        from core.tool_transport import stop_daemon
+        stopped = anyio.run(stop_daemon, workspace)
+        print("stopped" if stopped else "no daemon running")
+        return
+
+    os.chdir(workspace)
+    # Register every tool, as run_server.py does
+    import swe_tools.run_server  # noqa: F401
+    anyio.run(ToolDaemon(workspace, args.socket or socket_path(workspace), args.idle_timeout).serve)
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,45 @@
 import os
-from typing import Optional
+from typing import Iterator, List, Optional
 from swe_tools.instance import mcp
-from swe_tools.utils import is_ignored, DEFAULT_IGNORE_PATTERNS
+from swe_tools.paging import Pager, cursors, page_trailer
+from swe_tools.path_matcher import parse_ignore_arg
+from swe_tools.workspace_index import workspace_files
+
+def _empty_message(path: str) -> str:
+    if not os.listdir(path):
+        return f"The directory at '{path}' is empty."
+    return f"The directory at '{path}' contains no files (only empty directories or ignored files)."
+
+class TreePages(Pager):
+    """The file list of view_directory_structure, walked one page at a time."""
+    kind = "view_directory_structure"
+
+    def __init__(self, path: str, paths: Iterator[str]):
+        super().__init__()
+        self.path = path
+        self.paths = paths
+
+    def items(self) -> Iterator[str]:
+        return self.paths
+
+    def item_bytes(self, item: str) -> int:
+        return len(item.encode("utf-8")) + 1
+
+    def render(self, page: List[str], done: bool) -> str:
+        if done and not self.emitted:
+            return _empty_message(self.path)
+        return "".join(f"{p}\n" for p in page) + page_trailer(self, done)
 
 @mcp.tool(name="view_directory_structure", description="""This tool lists all files within a specified directory and its subdirectories, returning a simple, newline-separated list of their relative paths. It is a fundamental utility for getting a flat list of all files in a project or a specific part of it. This is useful for tasks like:
 *   **File Inventory:** Getting a complete list of all files in a directory.
 *   **Bulk Processing:** Providing a list of files to be processed by other tools.
 *   **Context Gathering:** Quickly understanding which files exist in a certain area of the codebase.
 
-The tool can traverse directories up to a specified depth and supports excluding files or directories using glob patterns. By default, it respects common ignore patterns (e.g., `.git`, `node_modules`, `__pycache__`). Users can extend these exclusions by providing additional glob patterns via the `ignore` parameter.""")
-def view_directory_tree(path: str = ".", max_depth: int = 999, ignore: Optional[str] = None) -> str:
+The tool can traverse directories up to a specified depth and supports excluding files or directories using glob patterns. By default, it respects common ignore patterns (e.g., `.git`, `node_modules`, `__pycache__`). Users can extend these exclusions by providing additional glob patterns via the `ignore` parameter.
+
+On large directories, set `page_files` (and/or `page_bytes`) to get the list one page at a time. A paged result ends with a line holding a `cursor`; call the tool again with only that `cursor` to get the next page. Each cursor works once and expires after a few minutes without use.""")
+def view_directory_tree(path: str = ".", max_depth: int = 999, ignore: Optional[str] = None,
+                        page_files: int = 0, page_bytes: int = 0, cursor: Optional[str] = None) -> str:
     """
     Generates a list of full relative paths for all files in a directory.
     This helps in getting a simple list of all files for processing.
@@ -19,39 +49,25 @@ def view_directory_tree(path: str = ".", max_depth: int = 999, ignore: Optional[
         path: The root directory to start from. Defaults to '.'.
         max_depth: The maximum depth to traverse. Defaults to 999 (effectively unlimited).
         ignore: Optional comma-separated string of glob patterns to ignore.
+        page_files: Return at most this many paths per page (0 = no paging).
+        page_bytes: Return at most this many bytes per page (0 = no paging).
+        cursor: The cursor from the previous page; the other arguments except the page sizes are then ignored.
     """
+    if cursor:
+        return cursors.resume(cursor, TreePages.kind, page_files, page_bytes)
     if not os.path.isabs(path):
         path = os.path.abspath(path)
 
-    user_ignore_patterns = [p.strip() for p in ignore.split(',')] if ignore is not None else []
-    all_ignore_patterns = list(set(DEFAULT_IGNORE_PATTERNS + user_ignore_patterns))
     if not os.path.isdir(path):
         return f"The specified path does not exist or is not a directory: {path}"
 
-    file_paths = []
-    for dirpath, dirnames, filenames in os.walk(path, topdown=True):
-        # Prune directories to respect max_depth
-        if dirpath != path:
-            rel_depth = os.path.relpath(dirpath, path).count(os.sep)
-            if rel_depth >= max_depth:
-                dirnames[:] = [] # Don't go deeper
-                continue
-
-        # Filter ignored directories
-        dirs_to_remove = {d for d in dirnames if is_ignored(os.path.relpath(os.path.join(dirpath, d), path), all_ignore_patterns)}
-        dirnames[:] = [d for d in dirnames if d not in dirs_to_remove]
-
-        for filename in sorted(filenames):
-            filepath = os.path.join(dirpath, filename)
-            relative_filepath = os.path.relpath(filepath, path).replace("\\", "/")
-            if not is_ignored(relative_filepath, all_ignore_patterns):
-                file_paths.append(relative_filepath)
+    # Answered from the workspace index: ignored directories and directories past max_depth are skipped
+    file_paths = workspace_files(path, parse_ignore_arg(ignore), max_depth)
+    if page_files > 0 or page_bytes > 0:
+        return cursors.start(TreePages(path, file_paths), page_files, page_bytes)
+    file_paths = list(file_paths)
 
     if not file_paths:
-        if not os.listdir(path):
-             return f"The directory at '{path}' is empty."
-        else:
-             return f"The directory at '{path}' contains no files (only empty directories or ignored files)."
-
+        return _empty_message(path)
 
     return "\n".join(file_paths)
@@ -1,3 +1,22 @@
+import functools
+import inspect
+
+import anyio
 from mcp.server.fastmcp import FastMCP
 
-mcp = FastMCP("CliSweAiTools")
+class ThreadedFastMCP(FastMCP):
+    """
+    FastMCP that runs synchronous tools in worker threads. FastMCP itself calls them inline on the
+    server's event loop, so concurrent calls would run one after another and a long tool would stall
+    every other request (and, in the daemon, every other session).
+    """
+    def add_tool(self, fn, *args, **kwargs):
+        if not inspect.iscoroutinefunction(fn):
+            sync_fn = fn
+
+            @functools.wraps(sync_fn)
+            async def fn(**arguments):
+                return await anyio.to_thread.run_sync(functools.partial(sync_fn, **arguments))
+        super().add_tool(fn, *args, **kwargs)
+
+mcp = ThreadedFastMCP("CliSweAiTools")
@@ -0,0 +1,149 @@
+"""
+Resumable, paged results for the listing tools (`view_directory_structure`, `read_codebase_snapshot`).
+
+A paged call walks the tree lazily and stops as soon as the page is full, so the first page costs the
+same however large the workspace is. The suspended walk is kept in the tool server under an opaque
+cursor; each page hands out a new cursor, and a cursor is good for exactly one call. Walks that are
+not continued within PAGE_CURSOR_TTL_SECONDS are dropped.
+"""
+
+import secrets
+import threading
+from abc import ABC, abstractmethod
+import time
+from collections import OrderedDict
+from typing import Any, Iterator, List, Optional, Tuple
+
+from core.config import PAGE_CURSOR_TTL_SECONDS
+
+MAX_CURSORS = 32
+CURSOR_PREFIX = "cur-"
+
+class Pager(ABC):
+    """
+    A lazily walked listing cut into pages. Subclasses implement `items` (the listing's entries in
+    order), `item_bytes` (0 for entries that do not count towards a page, e.g. skipped files) and
+    `render`.
+    """
+    kind = ""
+
+    def __init__(self):
+        self._items: Optional[Iterator[Any]] = None
+        self._pending: List[Any] = []  # the entry that did not fit on the previous page
+        self.pages = 0
+        self.emitted = 0  # entries that counted towards a page so far
+        self.page_start = 0  # `emitted` before the current page
+        self.cursor_token: Optional[str] = None  # continues after the current page; set by CursorStore
+        self.page_files = 0
+        self.page_bytes = 0
+
+    @abstractmethod
+    def items(self) -> Iterator[Any]:
+        ...
+
+    @abstractmethod
+    def item_bytes(self, item: Any) -> int:
+        ...
+
+    @abstractmethod
+    def render(self, page: List[Any], done: bool) -> str:
+        ...
+
+    def next_page(self) -> Tuple[List[Any], bool]:
+        """
+        The next page's entries and whether the listing is complete. A page holds at most `page_files`
+        counted entries and `page_bytes` bytes (0 = no limit), but always at least one entry.
+        """
+        page_files, page_bytes = self.page_files, self.page_bytes
+        if self._items is None:
+            self._items = self.items()
+        page: List[Any] = []
+        counted = used = 0
+        self.page_start = self.emitted
+        while True:
+            if self._pending:
+                item = self._pending.pop()
+            else:
+                item = next(self._items, None)
+                if item is None:
+                    self.pages += 1
+                    return page, True
+            size = self.item_bytes(item)
+            if size and counted and ((page_files and counted >= page_files) or (page_bytes and used + size > page_bytes)):
+                self._pending.append(item)
+                self.pages += 1
+                return page, False
+            page.append(item)
+            if size:
+                counted += 1
+                used += size
+                self.emitted += 1
+
+    def close(self):
+        if self._items is not None:
+            self._items.close()  # stops the walk (and any reads in flight)
+
+class CursorStore:
+    """The suspended listings of this tool server by cursor id, expired after `ttl` seconds of inactivity."""
+    def __init__(self, ttl: float = PAGE_CURSOR_TTL_SECONDS, max_cursors: int = MAX_CURSORS):
+        self.ttl = ttl
+        self.max_cursors = max_cursors
+        # cursor id -> (pager, last used), least recently used first. A pager whose page is being built
+        # is not in here, so a cursor can only be continued once and expiry never closes a running walk.
+        self._cursors: "OrderedDict[str, Tuple[Pager, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _expire(self):
+        now = time.monotonic()
+        stale = [cid for cid, (_, last_used) in self._cursors.items() if now - last_used > self.ttl]
+        stale += list(self._cursors)[len(stale):max(len(stale), len(self._cursors) - self.max_cursors)]
+        for cid in stale:
+            self._cursors.pop(cid)[0].close()
+
+    def _page(self, cursor_id: str, pager: Pager, page_files: int, page_bytes: int) -> str:
+        if page_files or page_bytes:
+            pager.page_files, pager.page_bytes = max(page_files, 0), max(page_bytes, 0)
+        page, done = pager.next_page()
+        if done:
+            pager.close()
+            pager.cursor_token = None
+        else:
+            pager.cursor_token = f"{CURSOR_PREFIX}{cursor_id}.{pager.pages + 1}"
+            with self._lock:
+                self._cursors[cursor_id] = (pager, time.monotonic())
+                self._expire()
+        return pager.render(page, done)
+
+    def start(self, pager: Pager, page_files: int, page_bytes: int) -> str:
+        """Renders the first page of `pager`; if more follows, the pager is kept under a new cursor."""
+        return self._page(secrets.token_hex(8), pager, page_files, page_bytes)
+
+    def resume(self, token: str, kind: str, page_files: int, page_bytes: int) -> str:
+        """
+        Renders the page a cursor token continues with, or an error if the token is unknown, expired or
+        used. Without `page_files` and `page_bytes` the page sizes of the first call are kept.
+        """
+        token = (token or "").strip()
+        cursor_id = token[len(CURSOR_PREFIX):].split(".", 1)[0] if token.startswith(CURSOR_PREFIX) else ""
+        with self._lock:
+            self._expire()
+            entry = self._cursors.get(cursor_id)
+            if entry is None or entry[0].cursor_token != token:
+                return (f"Error: cursor {token!r} is unknown, expired or was already used. "
+                        f"Call the tool again without `cursor` to start over.")
+            if entry[0].kind != kind:
+                return f"Error: cursor {token!r} belongs to another tool."
+            pager = self._cursors.pop(cursor_id)[0]
+        return self._page(cursor_id, pager, page_files, page_bytes)
+
+    def __len__(self) -> int:
+        return len(self._cursors)
+
+cursors = CursorStore()
+
+def page_trailer(pager: Pager, done: bool) -> str:
+    """The closing line of a page: which files it held and the cursor for the next one."""
+    span = f"{pager.page_start + 1}-{pager.emitted}" if pager.emitted > pager.page_start else "none"
+    if done:
+        return f"[Page {pager.pages}, files {span}: end of listing, {pager.emitted} files in total.]\n"
+    return f"[Page {pager.pages}, files {span}: more files follow. Call again with cursor=\"{pager.cursor_token}\" to continue.]\n"
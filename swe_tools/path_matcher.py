@@ -0,0 +1,254 @@
+"""
+Ignore rules for every directory walker (the snapshot and tree tools, the tool result cache and the
+CLI's file listing).
+
+The default and user patterns are compiled once per pattern set: names without wildcards go into a
+set, the rest into a single regular expression. A path is ignored when its relative path or its
+basename matches, exactly like the `fnmatch` loop in `utils.is_ignored`. `.gitignore` files in the
+walked tree (and in its parent directories up to the repository root) are honoured as well, with
+git's precedence: deeper files override higher ones and the last matching line wins.
+"""
+
+import fnmatch
+import os
+import re
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+DEFAULT_IGNORE_PATTERNS = [
+    ".git", ".gitignore", ".svn", "node_modules", "venv", ".venv",
+    "__pycache__", "build", "dist", "*.log", ".tmp", ".DS_Store",
+    "*.pyc", "*.pyo", "*.pyd", "*.db", "*.sqlite",
+    "*.egg", "*.egg-info", "*.whl", "*.zip", "*.tar.gz",
+    "*.tar.bz2", "*.tar.xz", "*.rar", "*.7z",
+    "*.bak", "*.swp", "*.swo", "*.tmp", "*.temp",
+    "*.out", "*.o", "*.obj", "*.class", "*.jar",
+    "*.exe", "*.dll", "*.so", "*.dylib",
+    "*.pdb", "*.lib", "*.a", "*.dSYM",
+    "*.log", "*.log.*", "*.log.gz", "*.log.bz2",
+    "*.log.xz", "*.log.zip", "*.log.tar.gz",
+    "*.log.tar.bz2", "*.log.tar.xz", "*.log.7z",
+    "*.log.rar", "*.log.7zip", "*.log.7z.xz",
+    "*.log.7z.bz2", "*.log.7z.gz", ".next"
+]
+
+_GLOB_CHARS = re.compile(r"[*?\[]")
+
+def parse_ignore_arg(ignore: Optional[str]) -> Tuple[str, ...]:
+    """The tools' comma-separated `ignore` argument as a tuple of patterns."""
+    return tuple(p.strip() for p in ignore.split(",") if p.strip()) if ignore else ()
+
+class PatternSet:
+    """fnmatch patterns compiled into one set lookup plus one regex. Use `compile_patterns` to share instances."""
+    def __init__(self, patterns: Sequence[str]):
+        self.patterns = tuple(dict.fromkeys(patterns))
+        self.literals = frozenset(p for p in self.patterns if not _GLOB_CHARS.search(p))
+        globs = [p for p in self.patterns if p not in self.literals]
+        self.regex = re.compile("|".join(f"(?:{fnmatch.translate(p)})" for p in globs)) if globs else None
+
+    def matches(self, relative_path: str) -> bool:
+        """True if the relative path (with / separators) or its basename matches any pattern."""
+        name = relative_path.rsplit("/", 1)[-1]
+        if name in self.literals or relative_path in self.literals:
+            return True
+        return self.regex is not None and (self.regex.match(name) is not None or self.regex.match(relative_path) is not None)
+
+@lru_cache(maxsize=64)
+def _compile(patterns: Tuple[str, ...]) -> PatternSet:
+    return PatternSet(patterns)
+
+def compile_patterns(extra: Sequence[str] = (), defaults: Sequence[str] = DEFAULT_IGNORE_PATTERNS) -> PatternSet:
+    return _compile(tuple(defaults) + tuple(extra))
+
+def _gitignore_regex(pattern: str) -> str:
+    """Translates one gitignore pattern (already stripped of `!` and the trailing `/`) to a regex body."""
+    anchored = "/" in pattern
+    pattern = pattern.lstrip("/")
+    out = []
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == "*":
+            if pattern[i:i + 2] == "**":
+                at_start = i == 0 or pattern[i - 1] == "/"
+                at_end = i + 2 == n or pattern[i + 2] == "/"
+                if at_start and at_end:
+                    if i + 2 == n:
+                        out.append(".*")  # trailing "/**": everything inside
+                    else:
+                        out.append("(?:.*/)?")  # leading "**/" or "/**/": zero or more directories
+                        i += 1  # also consume the slash
+                    i += 2
+                    continue
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "[":
+            j = pattern.find("]", i + 2)
+            if j == -1:
+                out.append(re.escape(c))
+            else:
+                body = pattern[i + 1:j]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                out.append(f"[{body.replace(chr(92), chr(92) * 2)}]")
+                i = j
+        elif c == "\\" and i + 1 < n:
+            i += 1
+            out.append(re.escape(pattern[i]))
+        else:
+            out.append(re.escape(c))
+        i += 1
+    body = "".join(out)
+    return body if anchored else f"(?:.*/)?{body}"
+
+class GitIgnore:
+    """The rules of one .gitignore file, matched against paths relative to its directory."""
+    def __init__(self, lines: Sequence[str]):
+        self.rules: List[Tuple["re.Pattern", bool, bool]] = []  # (regex, negated, directories only)
+        for line in lines:
+            line = line.rstrip("\n").rstrip("\r")
+            if not line.strip() or line.startswith("#"):
+                continue
+            if not line.endswith("\\ "):
+                line = line.rstrip(" ")
+            negated = line.startswith("!")
+            if negated or line.startswith("\\!") or line.startswith("\\#"):
+                line = line[1:]
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            if not line:
+                continue
+            self.rules.append((re.compile(_gitignore_regex(line) + r"\Z", re.DOTALL), negated, dir_only))
+        # Without `!` rules the order does not matter, so all rules fit in one regex per path kind
+        self._combined: Optional[Tuple[Optional["re.Pattern"], Optional["re.Pattern"]]] = None
+        if not any(negated for _, negated, _ in self.rules):
+            def combine(rules):
+                return re.compile("|".join(f"(?:{r.pattern})" for r in rules), re.DOTALL) if rules else None
+            self._combined = (combine([r for r, _, dir_only in self.rules if not dir_only]),
+                              combine([r for r, _, _ in self.rules]))
+
+    def match(self, relative_path: str, is_dir: bool) -> Optional[bool]:
+        """True (ignored), False (re-included by a `!` rule) or None when no rule applies."""
+        if self._combined is not None:
+            regex = self._combined[1 if is_dir else 0]
+            return True if regex is not None and regex.match(relative_path) else None
+        for regex, negated, dir_only in reversed(self.rules):
+            if dir_only and not is_dir:
+                continue
+            if regex.match(relative_path):
+                return not negated
+        return None
+
+_gitignore_cache: Dict[str, Tuple[int, int, GitIgnore]] = {}
+
+def load_gitignore(path: str) -> Optional[GitIgnore]:
+    """Parses a .gitignore file, reusing the parsed rules while its mtime and size are unchanged."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    cached = _gitignore_cache.get(path)
+    if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+        return cached[2]
+    try:
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            rules = GitIgnore(f.readlines())
+    except OSError:
+        return None
+    _gitignore_cache[path] = (st.st_mtime_ns, st.st_size, rules)
+    return rules
+
+class PathMatcher:
+    """
+    Decides which paths under `root` a walker skips: the default patterns, the caller's `extra`
+    patterns and, with `use_gitignore`, the .gitignore files. Paths are relative to `root`.
+    """
+    def __init__(self, root: str, extra: Sequence[str] = (), use_gitignore: bool = True,
+                 defaults: Sequence[str] = DEFAULT_IGNORE_PATTERNS):
+        self.root = os.path.abspath(root)
+        self.patterns = compile_patterns(extra, defaults)
+        self.use_gitignore = use_gitignore
+        self._gitignores: Dict[str, Optional[GitIgnore]] = {}  # directory relative to root -> rules
+        self._outer: List[Tuple[str, GitIgnore]] = []  # (prefix of root inside the outer directory, rules)
+        if use_gitignore:
+            self._load_outer_gitignores()
+
+    def _load_outer_gitignores(self):
+        """Rules from the directories between the repository root and `root`, closest last."""
+        if os.path.isdir(os.path.join(self.root, ".git")):
+            return
+        current = self.root
+        outer = []
+        while True:
+            parent = os.path.dirname(current)
+            if parent == current:
+                return  # not inside a repository
+            current = parent
+            rules = load_gitignore(os.path.join(current, ".gitignore"))
+            if rules:
+                outer.append((os.path.relpath(self.root, current).replace(os.sep, "/") + "/", rules))
+            if os.path.exists(os.path.join(current, ".git")):
+                break
+        self._outer = list(reversed(outer))
+
+    def _gitignore_for(self, rel_dir: str) -> Optional[GitIgnore]:
+        if rel_dir not in self._gitignores:
+            self._gitignores[rel_dir] = load_gitignore(os.path.join(self.root, rel_dir, ".gitignore"))
+        return self._gitignores[rel_dir]
+
+    def forget_gitignore(self, rel_dir: str):
+        """Drops the parsed .gitignore of `rel_dir`, so the next match reloads it (after the file changed)."""
+        self._gitignores.pop(rel_dir, None)
+
+    def gitignored(self, relative_path: str, is_dir: bool) -> bool:
+        parts = relative_path.split("/")
+        # Deepest .gitignore first; the first one with a matching rule decides
+        for depth in range(len(parts) - 1, -1, -1):
+            rules = self._gitignore_for("/".join(parts[:depth]))
+            if rules:
+                decision = rules.match("/".join(parts[depth:]), is_dir)
+                if decision is not None:
+                    return decision
+        for prefix, rules in reversed(self._outer):
+            decision = rules.match(prefix + relative_path, is_dir)
+            if decision is not None:
+                return decision
+        return False
+
+    def is_ignored(self, relative_path: str, is_dir: Optional[bool] = None) -> bool:
+        """
+        Whether the path itself is ignored. Its parent directories are not checked: walkers never
+        reach paths below an ignored directory because they prune it.
+        """
+        relative_path = relative_path.replace("\\", "/").strip("/")
+        if not relative_path or relative_path == ".":
+            return False
+        if self.patterns.matches(relative_path):
+            return True
+        if not self.use_gitignore:
+            return False
+        if is_dir is None:
+            is_dir = os.path.isdir(os.path.join(self.root, relative_path))
+        return self.gitignored(relative_path, is_dir)
+
+    def walk(self, max_depth: Optional[int] = None) -> Iterator[Tuple[str, str, List[str], List[str]]]:
+        """
+        os.walk over `root` that prunes ignored directories and drops ignored files. Yields
+        (dirpath, relative dirpath with / separators, sorted directory names, sorted file names).
+        Callers may prune the directory names further. With `max_depth`, directories at relative depth
+        `max_depth` or deeper are neither listed nor entered (the tree tool's historic semantics).
+        """
+        for dirpath, dirnames, filenames in os.walk(self.root, topdown=True):
+            rel_dir = os.path.relpath(dirpath, self.root).replace(os.sep, "/")
+            if rel_dir == ".":
+                rel_dir = ""
+            elif max_depth is not None and rel_dir.count("/") >= max_depth:
+                dirnames[:] = []
+                continue
+            if self.use_gitignore and ".gitignore" in filenames:
+                self._gitignore_for(rel_dir)
+            prefix = rel_dir + "/" if rel_dir else ""
+            dirnames[:] = sorted(d for d in dirnames if not self.is_ignored(prefix + d, True))
+            files = sorted(f for f in filenames if not self.is_ignored(prefix + f, False))
+            yield dirpath, rel_dir, dirnames, files
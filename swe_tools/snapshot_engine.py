@@ -0,0 +1,171 @@
+"""
+Builds the text of `read_codebase_snapshot`.
+
+Files are read on a thread pool, a bounded window ahead of the file being formatted, and always
+emitted in walk order (directories and files sorted by name), so the same tree gives the same
+snapshot. Binary files are recognised by their content. A per-file and a total byte budget keep the
+result within what a model can take; every file left out is listed in a report at the end.
+"""
+
+import hashlib
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+from core.config import SNAPSHOT_MAX_FILE_BYTES, SNAPSHOT_MAX_TOTAL_BYTES, SNAPSHOT_READ_WORKERS
+
+SNIFF_BYTES = 8192
+REPORT_NAMES_PER_REASON = 20  # skipped files listed by name per reason; the rest are counted
+
+# Skip reasons, in report order
+BINARY = "binary"
+TOO_LARGE = "over the per-file limit"
+OVER_BUDGET = "over the total limit"
+UNREADABLE = "unreadable"
+SKIP_REASONS = (BINARY, TOO_LARGE, OVER_BUDGET, UNREADABLE)
+
+def is_binary(sample: bytes) -> bool:
+    """Content sniffing: NUL bytes, or mostly non-text bytes in a sample that is not valid UTF-8."""
+    if not sample:
+        return False
+    if b"\0" in sample:
+        return True
+    try:
+        sample.decode("utf-8")
+        return False
+    except UnicodeDecodeError as e:
+        if e.start >= len(sample) - 3:
+            return False  # a multi-byte character cut off at the end of the sample
+    control = sum(1 for b in sample if b < 32 and b not in (9, 10, 12, 13))
+    return control / len(sample) > 0.1
+
+def format_lines(text: str) -> str:
+    """`N:line` per line, trailing whitespace stripped, as the restorer and line editor expect."""
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    lines = text.split("\n")
+    if lines and lines[-1] == "":
+        lines.pop()
+    return "".join(f"{i}:{line.rstrip()}\n" for i, line in enumerate(lines, 1))
+
+class SnapshotFile:
+    """One file of a snapshot: its formatted block, or the reason it was skipped."""
+    __slots__ = ("rel_path", "size", "mtime_ns", "digest", "block", "skipped")
+
+    def __init__(self, rel_path: str, size: int = 0, mtime_ns: int = 0, digest: Optional[str] = None,
+                 block: Optional[str] = None, skipped: Optional[str] = None):
+        self.rel_path = rel_path
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.digest = digest  # sha1 of the content, if it was read
+        self.block = block
+        self.skipped = skipped
+
+def read_snapshot_file(root: str, rel_path: str, max_file_bytes: int) -> SnapshotFile:
+    """Reads and formats one file. Runs on the pool, so it only touches its own file."""
+    try:
+        with open(os.path.join(root, rel_path), "rb") as f:
+            st = os.fstat(f.fileno())
+            if max_file_bytes and st.st_size > max_file_bytes:
+                return SnapshotFile(rel_path, st.st_size, st.st_mtime_ns, skipped=TOO_LARGE)
+            data = f.read()
+    except OSError:
+        return SnapshotFile(rel_path, skipped=UNREADABLE)
+    digest = hashlib.sha1(data).hexdigest()
+    if is_binary(data[:SNIFF_BYTES]):
+        return SnapshotFile(rel_path, len(data), st.st_mtime_ns, digest, skipped=BINARY)
+    text = data.decode("utf-8", errors="ignore")
+    return SnapshotFile(rel_path, len(data), st.st_mtime_ns, digest, block=f"${rel_path}\n```\n{format_lines(text)}```\n\n")
+
+def read_in_order(root: str, rel_paths: Iterable[str], max_file_bytes: int,
+                  workers: int = SNAPSHOT_READ_WORKERS) -> Iterator[SnapshotFile]:
+    """
+    Yields the files of `rel_paths` in order while up to `workers * 4` of them are read ahead on a
+    thread pool. Stopping the iteration stops the reading as well.
+    """
+    if workers <= 1:
+        for rel_path in rel_paths:
+            yield read_snapshot_file(root, rel_path, max_file_bytes)
+        return
+    window = workers * 4
+    pending: deque = deque()
+    paths = iter(rel_paths)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="snapshot") as pool:
+        try:
+            for rel_path in paths:
+                pending.append(pool.submit(read_snapshot_file, root, rel_path, max_file_bytes))
+                if len(pending) >= window:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+class SnapshotReport:
+    """What went into a snapshot and what was left out, by reason."""
+    def __init__(self):
+        self.included = 0
+        self.included_bytes = 0
+        self.skipped: Dict[str, List[str]] = {reason: [] for reason in SKIP_REASONS}
+        self.unchanged = 0  # files left out because their content matched `known`
+        # (mtime_ns, size, sha1 or None) of every file that was opened, for snapshot_index
+        self.files: Dict[str, Tuple[int, int, Optional[str]]] = {}
+
+    def skip(self, rel_path: str, reason: str):
+        self.skipped[reason].append(rel_path)
+
+    @property
+    def skipped_count(self) -> int:
+        return sum(len(paths) for paths in self.skipped.values())
+
+    def render(self, max_file_bytes: int, max_total_bytes: int) -> str:
+        if not self.skipped_count:
+            return ""
+        limits = {TOO_LARGE: f" ({max_file_bytes} bytes)", OVER_BUDGET: f" ({max_total_bytes} bytes)"}
+        lines = [f"[Snapshot report: {self.included} files included ({self.included_bytes} bytes), "
+                 f"{self.skipped_count} skipped.]"]
+        for reason in SKIP_REASONS:
+            paths = self.skipped[reason]
+            if not paths:
+                continue
+            shown = ", ".join(paths[:REPORT_NAMES_PER_REASON])
+            more = f" and {len(paths) - REPORT_NAMES_PER_REASON} more" if len(paths) > REPORT_NAMES_PER_REASON else ""
+            lines.append(f"Skipped, {reason}{limits.get(reason, '')}: {len(paths)} - {shown}{more}")
+        if self.skipped[OVER_BUDGET] or self.skipped[TOO_LARGE]:
+            lines.append("Narrow `path`, add `ignore` patterns, raise the limits or use `read_file_content` for single files.")
+        return "\n".join(lines) + "\n"
+
+def build_snapshot(root: str, rel_paths: Iterable[str], max_file_bytes: int = SNAPSHOT_MAX_FILE_BYTES,
+                   max_total_bytes: int = SNAPSHOT_MAX_TOTAL_BYTES,
+                   workers: int = SNAPSHOT_READ_WORKERS,
+                   known: Optional[Mapping[str, Optional[str]]] = None) -> Tuple[str, SnapshotReport]:
+    """
+    Returns the snapshot text of `rel_paths` (in the given order) and its report. Once the next file
+    would push the snapshot past `max_total_bytes`, it and all later files are skipped, so the
+    included files are always a prefix of the walk. A limit of 0 disables it. Files whose content
+    hash equals their entry in `known` are read but left out.
+    """
+    report = SnapshotReport()
+    parts: List[str] = []
+    rel_paths = list(rel_paths)
+    for index, entry in enumerate(read_in_order(root, rel_paths, max_file_bytes, workers)):
+        if entry.skipped != UNREADABLE:
+            report.files[entry.rel_path] = (entry.mtime_ns, entry.size, entry.digest)
+        if known is not None and entry.digest is not None and known.get(entry.rel_path) == entry.digest:
+            report.unchanged += 1
+            continue
+        if entry.skipped:
+            report.skip(entry.rel_path, entry.skipped)
+            continue
+        block_bytes = len(entry.block.encode("utf-8"))
+        if max_total_bytes and report.included_bytes + block_bytes > max_total_bytes:
+            report.skip(entry.rel_path, OVER_BUDGET)
+            # Later files are not read at all, so binaries among them are counted as over the limit too
+            for rel_path in rel_paths[index + 1:]:
+                report.skip(rel_path, OVER_BUDGET)
+            break
+        parts.append(entry.block)
+        report.included += 1
+        report.included_bytes += block_bytes
+    return "".join(parts), report
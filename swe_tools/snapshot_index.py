@@ -0,0 +1,187 @@
+"""
+Snapshot tokens for `read_codebase_snapshot`.
+
+Every snapshot records the files it walked (path -> mtime, size and content hash) in the tool server,
+under a token derived from the paths and hashes. A later call with `since=<token>` walks the tree
+again, re-reads only the files whose mtime or size changed (or that were written so close to the
+snapshot that their mtime cannot be trusted) and returns just the files added, modified or deleted
+since. The server keeps the last MAX_STATES states; an unknown or expired token gets a full snapshot.
+Paged snapshots (SnapshotPages) record their state as they go and hand out the token on the last page.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from swe_tools.paging import Pager, page_trailer
+from swe_tools.snapshot_engine import UNREADABLE, SnapshotFile, SnapshotReport, build_snapshot, read_in_order
+
+MAX_STATES = 16
+# Files modified less than this before a snapshot are hashed again on the next delta, since a
+# second write within the filesystem's timestamp granularity leaves mtime and size unchanged
+RACY_WINDOW_NS = 2_000_000_000
+DELTA_NAMES_LISTED = 200
+TOKEN_PREFIX = "snap-"
+
+FileState = Tuple[int, int, Optional[str]]  # (mtime_ns, size, sha1 of the content or None if it was not read)
+
+class SnapshotState:
+    """The files one snapshot (or delta) saw, under its content-addressed token."""
+    __slots__ = ("root", "ignore", "files", "taken_ns", "token")
+
+    def __init__(self, root: str, ignore: Tuple[str, ...], files: Dict[str, FileState], taken_ns: int):
+        self.root = root
+        self.ignore = ignore
+        self.files = files
+        self.taken_ns = taken_ns
+        digest = hashlib.sha1(f"{root}\0{','.join(ignore)}\n".encode())
+        for rel_path in sorted(files):
+            mtime_ns, size, content = files[rel_path]
+            digest.update(f"{rel_path}\0{content or f'{size}:{mtime_ns}'}\n".encode())
+        self.token = TOKEN_PREFIX + digest.hexdigest()[:20]
+
+    def unchanged(self, rel_path: str, st: os.stat_result) -> bool:
+        """True when the file still has the recorded mtime and size, and that mtime was safely older than the snapshot."""
+        known = self.files.get(rel_path)
+        return (known is not None and known[0] == st.st_mtime_ns and known[1] == st.st_size
+                and known[0] < self.taken_ns - RACY_WINDOW_NS)
+
+class SnapshotIndex:
+    """The recent snapshot states of this tool server, least recently used first."""
+    def __init__(self, max_states: int = MAX_STATES):
+        self.max_states = max_states
+        self._states: "OrderedDict[str, SnapshotState]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def remember(self, state: SnapshotState) -> str:
+        with self._lock:
+            self._states.pop(state.token, None)
+            self._states[state.token] = state
+            while len(self._states) > self.max_states:
+                self._states.popitem(last=False)
+        return state.token
+
+    def lookup(self, token: Optional[str], root: str, ignore: Tuple[str, ...]) -> Optional[SnapshotState]:
+        """The state of `token` if it is known and was taken with the same root and ignore patterns."""
+        if not token:
+            return None
+        with self._lock:
+            state = self._states.get(token.strip())
+            if state is None or state.root != root or state.ignore != ignore:
+                return None
+            self._states.move_to_end(state.token)
+            return state
+
+snapshot_index = SnapshotIndex()
+
+def _stat_unread(root: str, rel_paths: Sequence[str], report: SnapshotReport, files: Dict[str, FileState]):
+    """Records mtime and size of the files the engine never opened (those past the total limit)."""
+    for rel_path in rel_paths:
+        if rel_path in files or rel_path in report.files:
+            continue
+        try:
+            st = os.stat(os.path.join(root, rel_path))
+        except OSError:
+            continue
+        files[rel_path] = (st.st_mtime_ns, st.st_size, None)
+
+def _names(label: str, paths: List[str]) -> str:
+    if not paths:
+        return ""
+    more = f" and {len(paths) - DELTA_NAMES_LISTED} more" if len(paths) > DELTA_NAMES_LISTED else ""
+    return f"{label}: {', '.join(paths[:DELTA_NAMES_LISTED])}{more}\n"
+
+def _token_line(token: str) -> str:
+    return f"[Snapshot token: {token} - pass it as `since` to get only the changes after this snapshot.]\n"
+
+def full_snapshot(root: str, ignore: Tuple[str, ...], rel_paths: Sequence[str], max_file_bytes: int,
+                  max_total_bytes: int) -> Tuple[str, SnapshotReport, str]:
+    """Snapshot of every file in `rel_paths`; returns the text, its report and the token of its state."""
+    taken_ns = time.time_ns()
+    text, report = build_snapshot(root, rel_paths, max_file_bytes, max_total_bytes)
+    files = dict(report.files)
+    _stat_unread(root, rel_paths, report, files)
+    token = snapshot_index.remember(SnapshotState(root, ignore, files, taken_ns))
+    return text + report.render(max_file_bytes, max_total_bytes) + _token_line(token), report, token
+
+def snapshot_delta(base: SnapshotState, rel_paths: Sequence[str], max_file_bytes: int, max_total_bytes: int) -> str:
+    """The files of `rel_paths` added or modified since `base`, and those of `base` that are gone."""
+    taken_ns = time.time_ns()
+    root = base.root
+    files: Dict[str, FileState] = {}
+    candidates = []
+    for rel_path in rel_paths:
+        try:
+            st = os.stat(os.path.join(root, rel_path))
+        except OSError:
+            continue
+        if base.unchanged(rel_path, st):
+            files[rel_path] = base.files[rel_path]
+        else:
+            candidates.append(rel_path)
+    current = set(files).union(candidates)
+    deleted = [rel_path for rel_path in sorted(base.files) if rel_path not in current]
+
+    known = {rel_path: base.files[rel_path][2] for rel_path in candidates if rel_path in base.files}
+    text, report = build_snapshot(root, candidates, max_file_bytes, max_total_bytes, known=known)
+    files.update(report.files)
+    _stat_unread(root, candidates, report, files)
+    added, modified = [], []
+    for rel_path in candidates:
+        if rel_path not in base.files:
+            added.append(rel_path)
+        elif report.files.get(rel_path, (0, 0, None))[2] is None or report.files[rel_path][2] != base.files[rel_path][2]:
+            modified.append(rel_path)
+    token = snapshot_index.remember(SnapshotState(root, base.ignore, files, taken_ns))
+
+    unchanged = len(current) - len(added) - len(modified)
+    if not (added or modified or deleted):
+        return f"[No changes since {base.token}: {unchanged} files unchanged.]\n" + _token_line(token)
+    header = (f"[Snapshot delta since {base.token}: {len(added)} added, {len(modified)} modified, "
+              f"{len(deleted)} deleted, {unchanged} unchanged.]\n")
+    summary = _names("Added", added) + _names("Modified", modified) + _names("Deleted", deleted)
+    return header + summary + "\n" + text + report.render(max_file_bytes, max_total_bytes) + _token_line(token)
+
+class SnapshotPages(Pager):
+    """A full snapshot walked and read one page at a time; the total byte limit does not apply."""
+    kind = "read_codebase_snapshot"
+
+    def __init__(self, root: str, ignore: Tuple[str, ...], rel_paths: Iterator[str], max_file_bytes: int):
+        super().__init__()
+        self.root = root
+        self.ignore = ignore
+        self.rel_paths = rel_paths
+        self.max_file_bytes = max_file_bytes
+        self.taken_ns = time.time_ns()
+        self.files: Dict[str, FileState] = {}
+        self.seen = 0
+
+    def items(self) -> Iterator[SnapshotFile]:
+        for entry in read_in_order(self.root, self.rel_paths, self.max_file_bytes):
+            self.seen += 1
+            if entry.skipped != UNREADABLE:
+                self.files[entry.rel_path] = (entry.mtime_ns, entry.size, entry.digest)
+            yield entry
+
+    def item_bytes(self, item: SnapshotFile) -> int:
+        return len(item.block.encode("utf-8")) if item.block is not None else 0
+
+    def render(self, page: List[SnapshotFile], done: bool) -> str:
+        if done and not self.seen:
+            return "Snapshot could not be generated because the directory is empty or contains no matching files."
+        report = SnapshotReport()
+        parts = []
+        for entry in page:
+            if entry.skipped:
+                report.skip(entry.rel_path, entry.skipped)
+            else:
+                parts.append(entry.block)
+                report.included += 1
+                report.included_bytes += self.item_bytes(entry)
+        text = "".join(parts) + report.render(self.max_file_bytes, 0) + page_trailer(self, done)
+        if done:
+            text += _token_line(snapshot_index.remember(SnapshotState(self.root, self.ignore, self.files, self.taken_ns)))
+        return text
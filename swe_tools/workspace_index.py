@@ -0,0 +1,495 @@
+"""
+In-memory index of a workspace's directories and files, shared by every listing in the process: the
+tree and snapshot tools, gui.file_utils.get_local_file_list and the CLI's `@` file completion.
+
+The index holds, per directory, the sorted names of the entries the walkers do not ignore (default
+patterns and .gitignore files, see path_matcher.py). Directories are listed with os.scandir the first
+time a query reaches them (a walk with max_depth lists no deeper) and brought up to date before each
+query: with inotify where available (only the directories that changed are listed again), otherwise
+by comparing the mtime of every indexed directory and .gitignore file with the recorded one. Repeated
+queries then walk memory, so they cost O(result) instead of a filesystem walk.
+
+An index keeps at most WORKSPACE_INDEX_MAX_DIRS directories; deeper ones are listed per query, like
+the filesystem walk. The filesystem root and the home directory are never indexed.
+
+WORKSPACE_INDEX selects the mode: "inotify" (the default; falls back to polling where inotify is
+missing or out of watches), "poll", or "off" to walk the filesystem on every call as before.
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import itertools
+import os
+import struct
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, FrozenSet, Iterator, List, Optional, Sequence, Set, Tuple
+
+from core.config import WORKSPACE_INDEX, WORKSPACE_INDEX_MAX_DIRS
+from swe_tools.path_matcher import PathMatcher, compile_patterns
+
+MAX_INDEXES = 4  # workspaces indexed at once, least recently used dropped first
+_serials = itertools.count()  # tells the indexes apart in generation tokens
+# Directories modified this close to their listing are listed again on the next poll, since a second
+# change within the filesystem's timestamp granularity leaves their mtime unchanged
+RACY_WINDOW_NS = 2_000_000_000
+
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_DELETE_SELF = 0x400
+IN_MOVE_SELF = 0x800
+IN_Q_OVERFLOW = 0x4000
+IN_IGNORED = 0x8000
+IN_ONLYDIR = 0x1000000
+_EVENT = struct.Struct("iIII")
+
+class Inotify:
+    """Just enough of inotify(7) through ctypes. The constructor raises OSError where it is unavailable."""
+    MASK = (IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_MODIFY | IN_CLOSE_WRITE | IN_DELETE_SELF
+            | IN_MOVE_SELF | IN_ONLYDIR)
+
+    def __init__(self):
+        libc_name = ctypes.util.find_library("c")
+        if not libc_name:
+            raise OSError(errno.ENOSYS, "libc not found")
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self._libc, "inotify_init1"):
+            raise OSError(errno.ENOSYS, "inotify is not available")
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+    def add_watch(self, path: str) -> int:
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), self.MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), path)
+        return wd
+
+    def rm_watch(self, wd: int):
+        self._libc.inotify_rm_watch(self.fd, wd)
+
+    def read_events(self) -> List[Tuple[int, int, str]]:
+        """Pending (watch descriptor, mask, name) events, without blocking."""
+        events = []
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return events
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _EVENT.unpack_from(data, offset)
+                offset += _EVENT.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+                offset += length
+                events.append((wd, mask, name))
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+class _Dir:
+    """One indexed directory. Replaced, never modified, so walks may run while the index refreshes."""
+    __slots__ = ("dirs", "links", "files", "mtime_ns", "racy", "gitignore")
+
+    def __init__(self, dirs: List[str], links: FrozenSet[str], files: List[str], mtime_ns: int, racy: bool,
+                 gitignore: Optional[Tuple[int, int]]):
+        self.dirs = dirs  # subdirectories that are not ignored, sorted
+        self.links = links  # those of `dirs` that are symlinks: listed but not entered, like os.walk
+        self.files = files  # files that are not ignored, sorted
+        self.mtime_ns = mtime_ns
+        self.racy = racy
+        self.gitignore = gitignore  # (mtime_ns, size) of the directory's .gitignore, if it has one
+
+def _gitignore_stat(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(os.path.join(path, ".gitignore"))
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+class WorkspaceIndex:
+    """The directories and files under `root` that the walkers see; see the module docstring."""
+    def __init__(self, root: str, watch: str = WORKSPACE_INDEX, max_dirs: int = WORKSPACE_INDEX_MAX_DIRS):
+        self.root = os.path.abspath(root)
+        self.max_dirs = max(1, max_dirs)
+        self.matcher = PathMatcher(self.root)
+        self._dirs: Dict[str, _Dir] = {}  # relative directory ("" for the root) -> listing
+        self._lock = threading.RLock()
+        self._inotify: Optional[Inotify] = None
+        self._wd_dirs: Dict[int, str] = {}
+        self._dir_wds: Dict[str, int] = {}
+        self.watcher = "poll"
+        if watch == "inotify":
+            try:
+                self._inotify = Inotify()
+                self.watcher = "inotify"
+            except OSError as e:
+                self.watcher = f"poll (inotify unavailable: {e.strerror or e})"
+        self.build_seconds = 0.0
+        self.refreshes = 0
+        self.last_refresh_seconds = 0.0
+        self.last_refresh_dirs = 0  # directories listed again by the last refresh
+        self.total_refresh_seconds = 0.0
+        self.rebuilds = 0
+        self.serial = next(_serials)
+        self.generation = 0  # bumped whenever a refresh sees a change (with inotify, file writes included)
+        self.unkept_lists = 0  # directories listed for one query only because the index was full
+        self.build()
+
+    # Building and updating
+
+    def _stop_watching(self, reason: str):
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+            self._wd_dirs.clear()
+            self._dir_wds.clear()
+            self.watcher = f"poll ({reason})"
+
+    def _watch(self, rel_dir: str, path: str):
+        if self._inotify is None:
+            return
+        try:
+            wd = self._inotify.add_watch(path)
+        except OSError as e:
+            if e.errno == errno.ENOSPC:
+                self._stop_watching("inotify watch limit reached")
+            return
+        self._wd_dirs[wd] = rel_dir
+        self._dir_wds[rel_dir] = wd
+
+    def _list_dir(self, rel_dir: str, watch: bool = True) -> Optional[_Dir]:
+        """Lists one directory (watching it first, so no change slips in between)."""
+        path = os.path.join(self.root, rel_dir) if rel_dir else self.root
+        if watch:
+            self._watch(rel_dir, path)
+        listed_ns = time.time_ns()
+        try:
+            st = os.stat(path)
+            entries = list(os.scandir(path))
+        except OSError:
+            return None
+        gitignore = _gitignore_stat(path)
+        old = self._dirs.get(rel_dir)
+        if old is not None and old.gitignore != gitignore:
+            self.matcher.forget_gitignore(rel_dir)
+        prefix = rel_dir + "/" if rel_dir else ""
+        dirs, links, files = [], set(), []
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            if self.matcher.is_ignored(prefix + entry.name, is_dir):
+                continue
+            if is_dir:
+                dirs.append(entry.name)
+                if entry.is_symlink():
+                    links.add(entry.name)
+            else:
+                files.append(entry.name)
+        dirs.sort()
+        files.sort()
+        return _Dir(dirs, frozenset(links), files, st.st_mtime_ns, st.st_mtime_ns >= listed_ns - RACY_WINDOW_NS, gitignore)
+
+    def _load(self, rel_dir: str) -> Optional[_Dir]:
+        """
+        The listing of `rel_dir`, listing the directory now if no query needed it before (None if it
+        cannot be listed). The listing is kept and watched while the index holds fewer than `max_dirs`
+        directories; past that, directories are listed for the current query only.
+        """
+        listing = self._dirs.get(rel_dir)
+        if listing is not None:
+            return listing
+        with self._lock:
+            listing = self._dirs.get(rel_dir)
+            if listing is not None:
+                return listing
+            parent, _, name = rel_dir.rpartition("/")
+            parent_listing = self._dirs.get(parent)
+            keep = not rel_dir or (parent_listing is not None and name in parent_listing.dirs
+                                   and len(self._dirs) < self.max_dirs)
+            listing = self._list_dir(rel_dir, watch=keep)
+            if listing is not None:
+                if keep:
+                    self._dirs[rel_dir] = listing
+                else:
+                    self.unkept_lists += 1
+            return listing
+
+    def _rescan(self, rel_dir: str) -> int:
+        """Lists `rel_dir` again and drops the subdirectories that went away (new ones are listed on demand)."""
+        old = self._dirs.get(rel_dir)
+        if old is None:
+            return 0
+        listing = self._list_dir(rel_dir)
+        if listing is None:
+            self._drop(rel_dir)
+            return 1
+        prefix = rel_dir + "/" if rel_dir else ""
+        gone = set(old.dirs) - old.links
+        if listing.gitignore == old.gitignore:
+            gone -= set(listing.dirs) - listing.links
+        # else the rules changed for the whole subtree: everything below is listed again on demand
+        for name in gone:
+            self._drop(prefix + name)
+        self._dirs[rel_dir] = listing
+        return 1
+
+    def _drop(self, rel_dir: str):
+        """Forgets a directory and its subtree."""
+        stack = [rel_dir]
+        while stack:
+            current = stack.pop()
+            listing = self._dirs.pop(current, None)
+            wd = self._dir_wds.pop(current, None)
+            # A moved directory keeps its watch descriptor; leave it alone if it was re-registered elsewhere
+            if wd is not None and self._wd_dirs.get(wd) == current:
+                del self._wd_dirs[wd]
+                if self._inotify is not None:
+                    self._inotify.rm_watch(wd)
+            if listing is not None:
+                prefix = current + "/" if current else ""
+                stack.extend(prefix + name for name in listing.dirs if name not in listing.links)
+
+    def build(self):
+        """(Re)starts the index from the root's listing; deeper directories are listed as queries reach them."""
+        with self._lock:
+            started = time.perf_counter()
+            for wd in list(self._wd_dirs):
+                if self._inotify is not None:
+                    self._inotify.rm_watch(wd)
+            self._wd_dirs.clear()
+            self._dir_wds.clear()
+            self._dirs = {}
+            self._load("")
+            self.build_seconds = time.perf_counter() - started
+
+    def _changed_dirs(self) -> Optional[Set[str]]:
+        """Directories to list again, or None when the whole index must be rebuilt."""
+        dirty: Set[str] = set()
+        if self._inotify is not None:
+            events = self._inotify.read_events()
+            if events:
+                self.generation += 1
+            for wd, mask, name in events:
+                if mask & IN_Q_OVERFLOW:
+                    return None
+                rel_dir = self._wd_dirs.get(wd)
+                if rel_dir is None:
+                    continue
+                if mask & IN_IGNORED:
+                    self._wd_dirs.pop(wd, None)
+                    if self._dir_wds.get(rel_dir) == wd:
+                        del self._dir_wds[rel_dir]
+                elif mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                    continue  # the parent directory reports the change as well
+                elif mask & (IN_MODIFY | IN_CLOSE_WRITE) and name != ".gitignore":
+                    continue  # file contents are not indexed
+                else:
+                    dirty.add(rel_dir)
+            if self._inotify is not None:
+                return dirty
+        # Polling (or inotify gave up while draining): compare directory and .gitignore mtimes
+        for rel_dir, listing in list(self._dirs.items()):
+            path = os.path.join(self.root, rel_dir) if rel_dir else self.root
+            try:
+                mtime_ns = os.stat(path).st_mtime_ns
+            except OSError:
+                dirty.add(rel_dir.rpartition("/")[0] if rel_dir else rel_dir)
+                continue
+            if listing.racy or mtime_ns != listing.mtime_ns or _gitignore_stat(path) != listing.gitignore:
+                dirty.add(rel_dir)
+        return dirty
+
+    def refresh(self):
+        """Brings the index up to date with the filesystem."""
+        with self._lock:
+            started = time.perf_counter()
+            dirty = self._changed_dirs()
+            if dirty is None or dirty:
+                self.generation += 1
+            if dirty is None:
+                self.rebuilds += 1
+                self.build()
+                listed = len(self._dirs)
+            else:
+                listed = 0
+                # Parents first: their listing decides which subdirectories still exist
+                for rel_dir in sorted(dirty, key=lambda d: (d.count("/") if d else -1, d)):
+                    listed += self._rescan(rel_dir)
+            self.refreshes += 1
+            self.last_refresh_dirs = listed
+            self.last_refresh_seconds = time.perf_counter() - started
+            self.total_refresh_seconds += self.last_refresh_seconds
+
+    def close(self):
+        with self._lock:
+            if self._inotify is not None:
+                self._inotify.close()
+                self._inotify = None
+
+    # Queries
+
+    def has_dir(self, rel_dir: str) -> bool:
+        """True when the walkers enter `rel_dir`: no directory on the way is ignored or a symlink."""
+        current = ""
+        for name in rel_dir.split("/") if rel_dir else ():
+            listing = self._load(current)
+            if listing is None or name not in listing.dirs or name in listing.links:
+                return False
+            current = f"{current}/{name}" if current else name
+        return self._load(current) is not None
+
+    def children(self, rel_dir: str) -> Tuple[List[str], List[str]]:
+        """The (directories, files) directly in `rel_dir`, or two empty lists if it is not indexed."""
+        listing = self._load(rel_dir) if self.has_dir(rel_dir) else None
+        return (listing.dirs, listing.files) if listing is not None else ([], [])
+
+    def walk(self, rel_root: str = "", max_depth: Optional[int] = None,
+             extra: Sequence[str] = ()) -> Iterator[Tuple[str, str, List[str], List[str]]]:
+        """
+        Same contract as PathMatcher.walk for the directory `rel_root` of the index: yields (dirpath,
+        directory relative to `rel_root`, sorted directory names, sorted file names), top-down, and
+        `extra` patterns are matched against paths relative to `rel_root`. Callers may prune the
+        directory names. Only the directories the walk reaches are listed, so a shallow walk of a large
+        tree stays shallow. `rel_root` must be a directory `has_dir` accepts.
+        """
+        extra_patterns = compile_patterns(extra, defaults=()) if extra else None
+        stack = [""]
+        while stack:
+            rel_dir = stack.pop()
+            if rel_dir and max_depth is not None and rel_dir.count("/") >= max_depth:
+                continue
+            index_dir = f"{rel_root}/{rel_dir}" if rel_root and rel_dir else rel_root or rel_dir
+            listing = self._load(index_dir)
+            if listing is None:
+                continue
+            prefix = rel_dir + "/" if rel_dir else ""
+            dirnames, filenames = list(listing.dirs), listing.files
+            if extra_patterns is not None:
+                dirnames = [d for d in dirnames if not extra_patterns.matches(prefix + d)]
+                filenames = [f for f in filenames if not extra_patterns.matches(prefix + f)]
+            dirpath = os.path.join(self.root, *index_dir.split("/")) if index_dir else self.root
+            yield dirpath, rel_dir, dirnames, filenames
+            stack.extend(prefix + d for d in reversed(dirnames) if d not in listing.links)
+
+    def generation_token(self, rel_root: str = "") -> Optional[str]:
+        """
+        A token that changes whenever anything the walkers see under `rel_root` changes, file contents
+        included, or None where the index cannot tell: without inotify (polling does not see file
+        writes) or when part of the subtree lies past `max_dirs`. Lists the whole subtree.
+        """
+        if self._inotify is None:
+            return None
+        for _, rel_dir, _, _ in self.walk(rel_root):
+            if "/".join(p for p in (rel_root, rel_dir) if p) not in self._dirs:
+                return None
+        if self._inotify is None:
+            return None  # ran out of watches while listing
+        return f"{self.serial}.{self.generation}"
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "root": self.root,
+            "watcher": self.watcher,
+            "directories": len(self._dirs),
+            "files": sum(len(listing.files) for listing in list(self._dirs.values())),
+            "max_dirs": self.max_dirs,
+            "unkept_lists": self.unkept_lists,
+            "build_ms": round(self.build_seconds * 1000, 2),
+            "refreshes": self.refreshes,
+            "rebuilds": self.rebuilds,
+            "generation": self.generation,
+            "last_refresh_ms": round(self.last_refresh_seconds * 1000, 3),
+            "last_refresh_dirs": self.last_refresh_dirs,
+            "total_refresh_ms": round(self.total_refresh_seconds * 1000, 2),
+        }
+
+_indexes: "OrderedDict[str, WorkspaceIndex]" = OrderedDict()
+_indexes_lock = threading.Lock()
+
+def _walked_directly(path: str) -> bool:
+    """True where listings skip the index: WORKSPACE_INDEX is "off" or `path` is / or the home directory."""
+    if WORKSPACE_INDEX == "off":
+        return True
+    path = os.path.abspath(path)
+    return path == os.path.dirname(path) or path == os.path.abspath(os.path.expanduser("~"))
+
+def get_index(path: str) -> Tuple[WorkspaceIndex, str]:
+    """
+    An up-to-date index containing `path` and the path relative to its root. Reuses the index of an
+    enclosing workspace unless `path` is not indexed there (ignored), in which case `path` gets its own.
+    """
+    path = os.path.abspath(path)
+    with _indexes_lock:
+        index, rel_root = None, ""
+        for root, candidate in _indexes.items():
+            if path == root or path.startswith(root.rstrip(os.sep) + os.sep):
+                rel = os.path.relpath(path, root).replace(os.sep, "/")
+                index, rel_root = candidate, "" if rel == "." else rel
+                break
+        if index is not None:
+            _indexes.move_to_end(index.root)
+        else:
+            index = _indexes[path] = WorkspaceIndex(path)
+            while len(_indexes) > MAX_INDEXES:
+                _indexes.popitem(last=False)[1].close()
+    index.refresh()
+    if rel_root and not index.has_dir(rel_root):
+        with _indexes_lock:
+            index = _indexes.get(path)
+            if index is None:
+                index = _indexes[path] = WorkspaceIndex(path)
+        index.refresh()
+        rel_root = ""
+    return index, rel_root
+
+def workspace_walk(path: str, extra: Sequence[str] = (),
+                   max_depth: Optional[int] = None) -> Iterator[Tuple[str, str, List[str], List[str]]]:
+    """PathMatcher(path, extra).walk(max_depth), answered from the workspace index where `path` is indexed."""
+    if _walked_directly(path):
+        return PathMatcher(path, extra).walk(max_depth=max_depth)
+    index, rel_root = get_index(path)
+    return index.walk(rel_root, max_depth, extra)
+
+def workspace_files(path: str, extra: Sequence[str] = (), max_depth: Optional[int] = None) -> Iterator[str]:
+    """The relative paths of the files `workspace_walk` yields, in walk order."""
+    for _, rel_dir, _, filenames in workspace_walk(path, extra, max_depth):
+        for filename in filenames:
+            yield f"{rel_dir}/{filename}" if rel_dir else filename
+
+def workspace_generation(path: str) -> Optional[str]:
+    """The index's `generation_token` for the directory `path`, or None where it has none."""
+    if _walked_directly(path):
+        return None
+    index, rel_root = get_index(path)
+    return index.generation_token(rel_root)
+
+def workspace_children(path: str, rel_dir: str = "") -> Tuple[List[str], List[str]]:
+    """The (directories, files) the walkers see directly in `rel_dir` under `path`, each sorted."""
+    rel_dir = rel_dir.replace(os.sep, "/").strip("/")
+    if _walked_directly(path):
+        matcher = PathMatcher(path)
+        prefix = rel_dir + "/" if rel_dir else ""
+        dirs, files = [], []
+        try:
+            with os.scandir(os.path.join(path, rel_dir)) as entries:
+                for entry in entries:
+                    is_dir = entry.is_dir()
+                    if not matcher.is_ignored(prefix + entry.name, is_dir):
+                        (dirs if is_dir else files).append(entry.name)
+        except OSError:
+            pass
+        return sorted(dirs), sorted(files)
+    index, rel_root = get_index(path)
+    return index.children("/".join(p for p in (rel_root, rel_dir) if p))
@@ -0,0 +1,114 @@
+import asyncio
+import json
+
+import mcp.types as types
+import pytest
+
+from core.ai_core import AICore
+from core.replay import ReplayProvider
+from core.token_estimator import RequestSizeGuard, TokenEstimator
+
+def chunk(delta):
+    return {"id": "chatcmpl-test", "object": "chat.completion.chunk", "created": 0, "model": "test",
+            "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}
+
+def function(index, name, args):
+    return {"index": index, "id": f"call_{index}", "type": "function",
+            "function": {"name": name, "arguments": json.dumps(args)}}
+
+@pytest.fixture
+def provider(tmp_path):
+    turns = [
+        [chunk({"role": "assistant", "content": "Reading, then editing. "}),
+         chunk({"tool_calls": [function(0, "read_file_content", {"path": "a.py"})]}),
+         chunk({"tool_calls": [function(1, "edit_file_lines", {"changes": "$a.py\n1: x = 2"})]})],
+        [chunk({"role": "assistant", "content": "Done."})],
+    ]
+    fixture = tmp_path / "turns.jsonl"
+    with open(fixture, "w") as f:
+        for turn, chunks in enumerate(turns):
+            for data in chunks:
+                f.write(json.dumps({"turn": turn, "type": "groq_chunk", "data": data}) + "\n")
+    return ReplayProvider(str(fixture))
+
+class StubSession:
+    def __init__(self):
+        self.calls = []
+
+    async def call_tool(self, name, args):
+        self.calls.append(name)
+        return types.CallToolResult(content=[types.TextContent(type="text", text=f"{name} ok")])
+
+def run(core, history):
+    async def main():
+        return [event async for event in core.process_message(history, "Change x in a.py")]
+    return asyncio.run(main())
+
+@pytest.mark.parametrize("concurrent", [True, False])
+def test_every_tool_call_gets_a_result(provider, concurrent):
+    async def deny_edits(name, args):
+        return name != "edit_file_lines"
+    session = StubSession()
+    history = []
+    run(AICore(provider, session, permission_callback=deny_edits, concurrent_tools=concurrent), history)
+    assert session.calls == ["read_file_content"]
+    assert [m["role"] for m in history] == ["user", "assistant", "tool", "tool", "assistant"]
+    assert [c["id"] for c in history[1]["tool_calls"]] == [m["tool_call_id"] for m in history[2:4]]
+    assert "denied" in history[3]["content"]
+
+@pytest.mark.parametrize("concurrent", [True, False])
+def test_aborted_approval_leaves_no_dangling_tool_calls(provider, concurrent):
+    async def prompt_closed(name, args):
+        if name == "edit_file_lines":
+            raise EOFError
+        return True
+    history = []
+    with pytest.raises(EOFError):
+        run(AICore(provider, StubSession(), permission_callback=prompt_closed, concurrent_tools=concurrent), history)
+    assert [m["role"] for m in history] == ["user"]
+
+def test_call_with_invalid_json_is_reported_instead_of_run(tmp_path):
+    fixture = tmp_path / "turns.jsonl"
+    broken = {"index": 0, "id": "call_0", "type": "function",
+              "function": {"name": "view_directory_structure", "arguments": '{"path": "src", "max_depth": }'}}
+    with open(fixture, "w") as f:
+        for turn, data in [(0, chunk({"role": "assistant", "tool_calls": [broken]})), (1, chunk({"content": "Retrying."}))]:
+            f.write(json.dumps({"turn": turn, "type": "groq_chunk", "data": data}) + "\n")
+    session = StubSession()
+    history = []
+    run(AICore(ReplayProvider(str(fixture)), session), history)
+    assert session.calls == []
+    assert [m["role"] for m in history] == ["user", "assistant", "tool", "assistant"]
+    assert json.loads(history[2]["content"])["message"].endswith('arguments were not valid JSON: {"path": "src", "max_depth": }')
+
+class LargeOutputSession(StubSession):
+    async def call_tool(self, name, args):
+        self.calls.append(name)
+        return types.CallToolResult(content=[types.TextContent(type="text", text="x" * 40_000)])
+
+@pytest.mark.parametrize("oversized", ["user_message", "tool_output"])
+def test_request_after_a_refusal_goes_through(tmp_path, oversized):
+    fixture = tmp_path / "turns.jsonl"
+    turns = [chunk({"role": "assistant", "content": "Done."})]
+    if oversized == "tool_output":
+        turns.insert(0, chunk({"role": "assistant", "tool_calls": [function(0, "read_file_content", {"path": "big.log"})]}))
+    with open(fixture, "w") as f:
+        for turn, data in enumerate(turns):
+            f.write(json.dumps({"turn": turn, "type": "groq_chunk", "data": data}) + "\n")
+    core = AICore(ReplayProvider(str(fixture)), LargeOutputSession(),
+                  size_guard=RequestSizeGuard(TokenEstimator(), max_request_tokens=2_000, policy="refuse"))
+    history = []
+
+    async def ask(text):
+        return [event async for event in core.process_message(history, text)]
+    first = asyncio.run(ask("y" * 40_000 if oversized == "user_message" else "Read big.log"))
+    assert any(e["type"] == "request_too_large" for e in first)
+    if oversized == "user_message":
+        assert history == []
+    else:
+        assert [m["role"] for m in history] == ["user", "assistant", "tool"]
+        assert "truncated to fit the request size limit" in history[2]["content"]
+
+    second = asyncio.run(ask("Go on"))
+    assert not any(e["type"] == "request_too_large" for e in second)
+    assert [e["content"] for e in second if e["type"] == "bot_response"] == ["Done."]
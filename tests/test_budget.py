@@ -0,0 +1,118 @@
+import asyncio
+import json
+
+import mcp.types as types
+import pytest
+
+from core.ai_core import AICore
+from core.batch import load_tasks
+from core.budget import DEADLINE, TOKENS, TOOL_CALLS, BudgetScheduler, TaskBudget
+from core.replay import ReplayProvider
+
+def test_overrides_keep_unset_limits():
+    budget = TaskBudget(deadline_seconds=60, max_tokens=1000, max_tool_calls=5).with_overrides(max_tokens=10, max_tool_calls=None)
+    assert budget.as_dict() == {"deadline_seconds": 60, "max_tokens": 10, "max_tool_calls": 5}
+
+def test_overrides_are_coerced_and_validated():
+    assert TaskBudget().with_overrides(max_tool_calls="3", deadline_seconds="1.5").as_dict() == {
+        "deadline_seconds": 1.5, "max_tokens": TaskBudget().max_tokens, "max_tool_calls": 3}
+    with pytest.raises(ValueError, match="Unknown budget limit"):
+        TaskBudget().with_overrides(deadline=5)
+    for bad in ["three", -1, 2.5, True, [3], float("inf")]:
+        with pytest.raises(ValueError, match="max_tool_calls must be a non-negative integer"):
+            TaskBudget().with_overrides(max_tool_calls=bad)
+
+def test_tasks_file_with_a_bad_budget_fails_to_load(tmp_path):
+    tasks = tmp_path / "tasks.jsonl"
+    tasks.write_text(json.dumps({"prompt": "a", "budget": {"max_tool_calls": 2}}) + "\n"
+                     + json.dumps({"prompt": "b", "budget": {"max_tool_calls": "many"}}) + "\n")
+    with pytest.raises(ValueError, match=r"tasks.jsonl:2: Budget limit max_tool_calls"):
+        load_tasks(str(tasks))
+    tasks.write_text(json.dumps({"prompt": "a", "budget": {"max_tool_calls": "2"}}) + "\n")
+    assert load_tasks(str(tasks))[0].budget == {"max_tool_calls": "2"}
+
+def test_zero_limits_are_unlimited():
+    scheduler = BudgetScheduler(TaskBudget(deadline_seconds=0, max_tokens=0, max_tool_calls=0))
+    scheduler.record_tokens(10**9)
+    assert all(scheduler.try_tool_call() for _ in range(1000))
+    assert scheduler.exhausted_reason() is None
+
+def test_each_limit_reports_its_reason():
+    scheduler = BudgetScheduler(TaskBudget(deadline_seconds=0, max_tokens=100, max_tool_calls=2))
+    assert scheduler.try_tool_call() and scheduler.try_tool_call()
+    assert scheduler.exhausted_reason() is None  # the results of the last calls still go to the model
+    assert not scheduler.try_tool_call() and (scheduler.tool_calls, scheduler.refused_tool_calls) == (2, 1)
+    scheduler.record_tokens(100)
+    assert scheduler.exhausted_reason() == TOKENS
+    scheduler.budget.deadline_seconds = 0.001
+    scheduler.started -= 1
+    assert scheduler.deadline_passed() and scheduler.exhausted_reason() == DEADLINE
+
+def chunk(delta):
+    return {"id": "chatcmpl-test", "object": "chat.completion.chunk", "created": 0, "model": "test",
+            "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}
+
+def read_call(index, path):
+    return {"index": index, "id": f"call_{index}", "type": "function",
+            "function": {"name": "read_file_content", "arguments": json.dumps({"path": path})}}
+
+class StubSession:
+    def __init__(self):
+        self.calls = []
+
+    async def call_tool(self, name, args):
+        self.calls.append(args["path"])
+        return types.CallToolResult(content=[types.TextContent(type="text", text="ok")])
+
+class RecordingProvider(ReplayProvider):
+    """Keeps a copy of the history sent with each request."""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.requests = []
+
+    def generate_content_stream(self, history):
+        self.requests.append([dict(m) for m in history])
+        return super().generate_content_stream(history)
+
+def replay(tmp_path, turns):
+    fixture = tmp_path / "turns.jsonl"
+    with open(fixture, "w") as f:
+        for turn, chunks in enumerate(turns):
+            for data in chunks:
+                f.write(json.dumps({"turn": turn, "type": "groq_chunk", "data": data}) + "\n")
+    return RecordingProvider(str(fixture))
+
+def run(provider, session, max_tool_calls):
+    core = AICore(provider, session, budget=TaskBudget(deadline_seconds=0, max_tokens=0, max_tool_calls=max_tool_calls))
+    history = []
+
+    async def main():
+        return [event async for event in core.process_message(history, "Read the files")]
+    return history, asyncio.run(main())
+
+def test_model_answers_with_the_result_of_the_last_allowed_call(tmp_path):
+    provider = replay(tmp_path, [
+        [chunk({"role": "assistant", "content": "Reading. "}), chunk({"tool_calls": [read_call(0, "a.py")]})],
+        [chunk({"role": "assistant", "content": "a.py says ok."})],
+    ])
+    session = StubSession()
+    history, events = run(provider, session, max_tool_calls=1)
+    assert session.calls == ["a.py"]
+    assert provider.requests[1][-1]["role"] == "tool" and provider.requests[1][-1]["content"] == "ok"
+    assert not any(e["type"] == "budget_exhausted" for e in events)
+    assert [e["content"] for e in events if e["type"] == "bot_response"] == ["a.py says ok."]
+
+def test_a_call_over_the_limit_stops_the_task(tmp_path):
+    provider = replay(tmp_path, [
+        [chunk({"role": "assistant", "content": "Reading. "}),
+         chunk({"tool_calls": [read_call(0, "a.py")]}), chunk({"tool_calls": [read_call(1, "b.py")]})],
+        [chunk({"content": "Never reached."})],
+    ])
+    session = StubSession()
+    history, events = run(provider, session, max_tool_calls=1)
+    assert session.calls == ["a.py"] and len(provider.requests) == 1
+    assert [m["role"] for m in history] == ["user", "assistant", "tool", "tool"]
+    assert "skipped" in history[3]["content"]
+    stop = next(e for e in events if e["type"] == "budget_exhausted")
+    assert stop["reason"] == TOOL_CALLS and stop["usage"]["tool_calls"] == 1 and stop["usage"]["refused_tool_calls"] == 1
+    assert stop["partial"] == "Reading. "
@@ -0,0 +1,48 @@
+import os
+
+from swe_tools.codebase_restorer import FAILED, UNCHANGED, WRITTEN, restore_file, write_files_from_snapshot
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+def leftovers(directory):
+    return [name for name in os.listdir(directory) if name.endswith(".tmp")]
+
+def test_identical_content_is_not_rewritten(tmp_path):
+    path = tmp_path / "a.py"
+    path.write_bytes(b"a = 1\n")
+    os.utime(path, ns=(1, 1_000_000_000))
+    assert restore_file(str(path), b"a = 1\n") == (UNCHANGED, "")
+    assert os.stat(path).st_mtime_ns == 1_000_000_000
+
+def test_rewrite_keeps_the_mode_and_leaves_no_temporary_file(tmp_path):
+    path = tmp_path / "run.sh"
+    path.write_bytes(b"echo 1\n")
+    os.chmod(path, 0o751)
+    assert restore_file(str(path), b"echo 2\n") == (WRITTEN, "")
+    assert read(path) == b"echo 2\n" and os.stat(path).st_mode & 0o777 == 0o751
+    assert leftovers(tmp_path) == []
+
+def test_symlinks_are_written_through(tmp_path):
+    target = tmp_path / "real.py"
+    target.write_bytes(b"old\n")
+    link = tmp_path / "link.py"
+    os.symlink(target, link)
+    assert restore_file(str(link), b"new\n") == (WRITTEN, "")
+    assert os.path.islink(link) and read(target) == b"new\n"
+
+def test_failed_write_is_reported_and_cleaned_up(tmp_path):
+    (tmp_path / "dir").mkdir()
+    outcome, error = restore_file(str(tmp_path / "dir"), b"data")
+    assert outcome == FAILED and error
+    assert leftovers(tmp_path) == []
+
+def test_snapshot_restore_reports_the_counts(tmp_path):
+    (tmp_path / "same.py").write_bytes(("x = 1" + os.linesep).encode())
+    snapshot = "$same.py\n1:x = 1\n$pkg/new.py\n1:y = 2\n2:z = 3\n"
+    result = write_files_from_snapshot(snapshot, str(tmp_path))
+    assert "Wrote 1 files, 1 unchanged (skipped), 0 failed." in result
+    assert "Successfully wrote pkg/new.py" in result and "same.py" not in result
+    assert read(tmp_path / "pkg" / "new.py") == ("y = 2" + os.linesep + "z = 3" + os.linesep).encode()
+    assert "Wrote 0 files, 2 unchanged" in write_files_from_snapshot(snapshot, str(tmp_path))
@@ -0,0 +1,46 @@
+from core.context_compactor import SUMMARY_HEADER, ContextCompactor
+from core.token_estimator import TokenEstimator
+
+def turn(i, output_chars=4000):
+    call = {"id": f"c{i}", "name": "read_file_content", "args": {"path": f"f{i}.py"}}
+    return [{"role": "user", "content": f"question {i}"},
+            {"role": "assistant", "content": "", "tool_calls": [call]},
+            {"role": "tool", "tool_call_id": f"c{i}", "name": "read_file_content", "content": "x" * output_chars},
+            {"role": "assistant", "content": f"answer {i}"}]
+
+def conversation(turns, output_chars=4000):
+    return [m for i in range(turns) for m in turn(i, output_chars)]
+
+def compactor(budget, keep=2):
+    return ContextCompactor(token_budget=budget, keep_recent_turns=keep, estimator=TokenEstimator())
+
+def test_history_under_budget_is_untouched():
+    history = conversation(3)
+    report = compactor(100_000).compact(history)
+    assert report.tokens_saved == 0 and history == conversation(3)
+
+def test_old_tool_outputs_are_stubbed_first():
+    history = conversation(4)
+    report = compactor(3_000).compact(history)
+    assert report.stubbed_tool_outputs == 2 and report.folded_messages == 0
+    assert report.tokens_after <= 3_000
+    assert history[2]["content"].startswith("[Output of `read_file_content` truncated by context compaction")
+    assert history[-2]["content"] == "x" * 4000  # the recent turns are kept whole
+
+def test_oldest_turns_fold_into_one_summary_with_their_tool_calls():
+    history = conversation(6, output_chars=100)
+    report = compactor(150).compact(history)
+    assert report.folded_messages == 16
+    summary = history[0]
+    assert summary["summary"] and summary["content"].startswith(SUMMARY_HEADER)
+    assert "- Assistant called `read_file_content`" in summary["content"]
+    assert history[1:] == conversation(6, output_chars=100)[16:]
+    # Every tool call left in the history still has its result
+    calls = {c["id"] for m in history for c in m.get("tool_calls", [])}
+    results = {m["tool_call_id"] for m in history if m["role"] == "tool"}
+    assert calls == results
+
+def test_reserved_tokens_count_against_the_budget():
+    history = conversation(4)
+    assert compactor(6_000).compact(list(history)).tokens_saved == 0
+    assert compactor(6_000).compact(history, reserved_tokens=2_000).tokens_saved > 0
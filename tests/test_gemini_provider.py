@@ -0,0 +1,78 @@
+import asyncio
+from types import SimpleNamespace
+
+from google.genai import types as gemini_types
+
+from core.gemini_provider import GeminiProvider
+from core.metrics import format_turn_summary
+
+class StubCaches:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.created = []
+        self.deleted = []
+
+    async def create(self, model, config):
+        if self.fail:
+            raise ValueError("cached content is too small")
+        self.created.append(config)
+        return SimpleNamespace(name=f"cachedContents/{len(self.created)}")
+
+    async def delete(self, name):
+        self.deleted.append(name)
+
+class StubModels:
+    """Streams one text chunk per request, reporting `cached_tokens` of `prompt_tokens` as cached."""
+    def __init__(self, prompt_tokens, cached_tokens):
+        self.prompt_tokens = prompt_tokens
+        self.cached_tokens = cached_tokens
+        self.configs = []
+
+    async def generate_content_stream(self, model, contents, config):
+        self.configs.append(config)
+        usage = gemini_types.GenerateContentResponseUsageMetadata(
+            prompt_token_count=self.prompt_tokens, cached_content_token_count=self.cached_tokens)
+        async def stream():
+            yield gemini_types.GenerateContentResponse(usage_metadata=usage)
+        return stream()
+
+def stub_client(fail_cache=False, prompt_tokens=1000, cached_tokens=800):
+    aio = SimpleNamespace(caches=StubCaches(fail_cache), models=StubModels(prompt_tokens, cached_tokens))
+    return SimpleNamespace(aio=aio)
+
+def run_turns(provider, turns):
+    async def main():
+        history = []
+        for i in range(turns):
+            history.append({"role": "user", "content": f"question {i}"})
+            async for _ in provider.generate_content_stream(history):
+                pass
+            history.append({"role": "assistant", "content": "answer"})
+        await provider.aclose()
+    asyncio.run(main())
+
+def test_context_cache_is_created_once_and_counted():
+    client = stub_client()
+    provider = GeminiProvider(client, "gemini-test", [], use_context_cache=True)
+    run_turns(provider, 3)
+    assert len(client.aio.caches.created) == 1
+    assert all(config.cached_content == "cachedContents/1" for config in client.aio.models.configs)
+    assert client.aio.caches.deleted == ["cachedContents/1"]
+    stats = provider.cache_stats.as_dict()
+    assert stats["requests"] == 3
+    assert stats["cached_input_tokens"] == 2400 and stats["uncached_input_tokens"] == 600
+    assert stats["cached_ratio"] == 0.8
+    assert "context_cache_error" not in stats
+
+def test_unavailable_context_cache_is_reported_in_the_stats(capsys):
+    client = stub_client(fail_cache=True, cached_tokens=0)
+    provider = GeminiProvider(client, "gemini-test", [], use_context_cache=True)
+    run_turns(provider, 2)
+    assert capsys.readouterr().out == ""
+    assert all(config.cached_content is None for config in client.aio.models.configs)
+    stats = provider.cache_stats.as_dict()
+    assert stats["requests"] == 2 and stats["cached_input_tokens"] == 0
+    assert stats["context_cache_error"] == "ValueError: cached content is too small"
+    summary = {"turn": 1, "ttft": 0.1, "stream_duration": 0.2, "tokens_in": 1000, "tokens_out": 5, "tools": [],
+               "prompt_cache": stats}
+    assert "context caching off: ValueError" in format_turn_summary(summary)
@@ -0,0 +1,64 @@
+import time
+
+import pytest
+
+from swe_tools.paging import CursorStore, Pager, page_trailer
+
+class ListPages(Pager):
+    kind = "test_listing"
+
+    def __init__(self, entries):
+        super().__init__()
+        self.entries = entries
+        self.closed = False
+
+    def items(self):
+        try:
+            yield from self.entries
+        finally:
+            self.closed = True
+
+    def item_bytes(self, item):
+        return len(item)
+
+    def render(self, page, done):
+        return ",".join(page) + "|" + page_trailer(self, done)
+
+def cursor_of(text):
+    return text.split('cursor="')[1].split('"')[0]
+
+def test_pager_must_implement_the_listing():
+    with pytest.raises(TypeError):
+        Pager()
+
+def test_pages_follow_the_file_and_byte_limits():
+    store = CursorStore(ttl=60)
+    first = store.start(ListPages(["aa", "bb", "cc", "dddd"]), page_files=2, page_bytes=0)
+    assert first.startswith("aa,bb|[Page 1, files 1-2: more files follow.")
+    second = store.resume(cursor_of(first), "test_listing", page_files=0, page_bytes=3)
+    assert second.startswith("cc|[Page 2, files 3-3")
+    third = store.resume(cursor_of(second), "test_listing", page_files=0, page_bytes=0)
+    assert third.startswith("dddd|[Page 3, files 4-4: end of listing, 4 files in total.]")  # a page holds at least one entry
+    assert len(store) == 0
+
+def test_cursor_is_single_use_and_bound_to_its_tool():
+    store = CursorStore(ttl=60)
+    token = cursor_of(store.start(ListPages(["a", "b", "c"]), page_files=1, page_bytes=0))
+    assert store.resume(token, "other_tool", 0, 0) == f"Error: cursor {token!r} belongs to another tool."
+    assert store.resume(token, "test_listing", 0, 0).startswith("b|")
+    assert "already used" in store.resume(token, "test_listing", 0, 0)
+
+def test_idle_cursors_expire_and_close_their_walk():
+    store = CursorStore(ttl=0.05)
+    pager = ListPages(["a", "b"])
+    token = cursor_of(store.start(pager, page_files=1, page_bytes=0))
+    time.sleep(0.1)
+    assert "expired" in store.resume(token, "test_listing", 0, 0)
+    assert pager.closed and len(store) == 0
+
+def test_oldest_cursors_are_dropped_past_the_limit():
+    store = CursorStore(ttl=60, max_cursors=2)
+    tokens = [cursor_of(store.start(ListPages(["a", "b"]), page_files=1, page_bytes=0)) for _ in range(3)]
+    assert len(store) == 2
+    assert "expired" in store.resume(tokens[0], "test_listing", 0, 0)
+    assert store.resume(tokens[2], "test_listing", 0, 0).startswith("b|")
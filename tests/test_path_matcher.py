@@ -0,0 +1,68 @@
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from swe_tools.path_matcher import GitIgnore, PathMatcher, PatternSet
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="needs git")
+
+GITIGNORES = {
+    ".gitignore": "# generated\n*.gen\n!keep.gen\n/build-out/\ndocs/**/draft.md\ntmp*/\nlogs/\n[ab].cfg\n",
+    "sub/.gitignore": "!important.gen\nlocal.txt\n",
+}
+FILES = [
+    "a.gen", "keep.gen", "local.txt", "a.cfg", "c.cfg", "tmpfile", "src/main.py",
+    "sub/important.gen", "sub/x.gen", "sub/local.txt", "sub/build-out/o.txt", "sub/logs/l.txt",
+    "build-out/o.txt", "docs/draft.md", "docs/a/b/draft.md", "docs/a/readme.md", "tmpdir/f.txt",
+]
+
+def git(root, *args, stdin=None):
+    return subprocess.run(["git", *args], cwd=root, input=stdin, capture_output=True, text=True).stdout.split("\n")
+
+@pytest.fixture
+def repo(tmp_path):
+    root = str(tmp_path)
+    subprocess.run(["git", "init", "-q", root], check=True)
+    for rel, content in [*GITIGNORES.items(), *((f, "") for f in FILES)]:
+        path = os.path.join(root, rel)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(content)
+    return root
+
+def test_walk_lists_the_files_git_does_not_ignore(repo):
+    matcher = PathMatcher(repo, defaults=(".git",))
+    walked = {f"{rel_dir}/{name}" if rel_dir else name for _, rel_dir, _, files in matcher.walk() for name in files}
+    untracked = {p for p in git(repo, "ls-files", "--others", "--exclude-standard") if p}
+    assert walked == untracked
+    assert "keep.gen" in walked and "sub/important.gen" in walked and "sub/build-out/o.txt" in walked
+
+def test_is_ignored_agrees_with_check_ignore(repo):
+    matcher = PathMatcher(repo, defaults=(".git",))
+    paths = []
+    for _, rel_dir, dirnames, files in PathMatcher(repo, defaults=(".git",), use_gitignore=False).walk():
+        prefix = rel_dir + "/" if rel_dir else ""
+        paths += [prefix + name for name in dirnames + files]
+    ignored = set(git(repo, "check-ignore", "--stdin", stdin="\n".join(paths) + "\n"))
+    # Walkers prune ignored directories, so only paths whose parents are visible are compared
+    visible = [p for p in paths if not any(matcher.is_ignored(p[:i]) for i in range(len(p)) if p[i] == "/")]
+    assert {p for p in visible if matcher.is_ignored(p)} == ignored & set(visible)
+
+def test_outer_gitignore_applies_below_the_repository_root(repo):
+    matcher = PathMatcher(os.path.join(repo, "sub"), defaults=(".git",))
+    assert matcher.is_ignored("x.gen") and not matcher.is_ignored("important.gen")
+    assert matcher.is_ignored("logs", True) and not matcher.is_ignored("build-out", True)
+
+def test_negation_keeps_the_last_matching_rule():
+    rules = GitIgnore(["*.log", "!debug.log", "debug.log"])
+    assert rules.match("debug.log", False) is True
+    assert GitIgnore(["*.log", "!debug.log"]).match("debug.log", False) is False
+    assert GitIgnore(["out/"]).match("out", False) is None
+
+def test_pattern_set_matches_like_fnmatch():
+    patterns = PatternSet(["node_modules", "*.pyc", "docs/*.md"])
+    assert patterns.matches("node_modules") and patterns.matches("a/b/node_modules")
+    assert patterns.matches("pkg/mod.pyc") and patterns.matches("docs/readme.md")
+    assert not patterns.matches("src/main.py")
@@ -0,0 +1,42 @@
+import asyncio
+from types import SimpleNamespace
+
+from core.providers import GroqProvider
+
+def tool(name):
+    return {"type": "function", "function": {"name": name, "description": name, "parameters": {"type": "object"}}}
+
+class StubCompletions:
+    """Records each request and streams one chunk whose usage reports `cached` of `prompt` tokens as cached."""
+    def __init__(self, prompt, cached):
+        self.prompt = prompt
+        self.cached = cached
+        self.requests = []
+
+    async def create(self, **request):
+        self.requests.append(request)
+        usage = SimpleNamespace(prompt_tokens=self.prompt, prompt_tokens_details=SimpleNamespace(cached_tokens=self.cached))
+        async def stream():
+            yield SimpleNamespace(x_groq=SimpleNamespace(usage=usage), usage=None, choices=[])
+        return stream()
+
+def test_prompt_prefix_is_stable_and_cached_tokens_are_counted():
+    completions = StubCompletions(prompt=500, cached=300)
+    client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    provider = GroqProvider(client, "groq-test", [tool("b_tool"), tool("a_tool")])
+
+    async def main():
+        history = []
+        for i in range(2):
+            history.append({"role": "user", "content": f"question {i}"})
+            async for _ in provider.generate_content_stream(history):
+                pass
+            history.append({"role": "assistant", "content": "answer"})
+    asyncio.run(main())
+
+    first, second = completions.requests
+    assert [t["function"]["name"] for t in first["tools"]] == ["a_tool", "b_tool"]
+    assert first["tools"] == second["tools"]
+    assert second["messages"][:len(first["messages"])] == first["messages"]
+    assert provider.cache_stats.as_dict() == {"requests": 2, "input_tokens": 1000, "cached_input_tokens": 600,
+                                              "uncached_input_tokens": 400, "cached_ratio": 0.6}
@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+
+from core.router import MAX_DECISIONS, RoutingProvider
+from core.token_estimator import TokenEstimator
+
+class TimedProvider:
+    """Streams one chunk after `delay` seconds, or raises if `fail` is set."""
+    def __init__(self, delay=0.0, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+
+    async def generate_content_stream(self, history):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError("unavailable")
+        await asyncio.sleep(self.delay)
+        yield {"type": "text", "data": "ok"}
+
+def turn(router, content="hi"):
+    async def main():
+        return [event async for event in router.generate_content_stream([{"role": "user", "content": content}])]
+    return asyncio.run(main())
+
+@pytest.fixture
+def estimator():
+    return TokenEstimator()
+
+def test_short_requests_take_the_fast_route_and_long_ones_the_strong(estimator):
+    fast, strong = TimedProvider(), TimedProvider()
+    router = RoutingProvider([("fast", fast), ("strong", strong)], simple_message_chars=10, estimator=estimator)
+    turn(router, "hi")
+    turn(router, "please refactor the whole module")
+    assert [d["route"] for d in router.decisions] == ["fast", "strong"]
+    assert router.decisions[1]["reason"] == "complex_request"
+
+def test_slow_fast_route_is_probed_again(estimator):
+    fast, strong = TimedProvider(delay=0.03), TimedProvider()
+    router = RoutingProvider([("fast", fast), ("strong", strong)], probe_every=3, estimator=estimator)
+    turn(router, "hi")                 # fast, measured slow
+    router.stats["strong"].ttft = 0.0  # strong is known to answer at once
+    for _ in range(6):
+        turn(router, "hi")
+    reasons = [d["reason"] for d in list(router.decisions)[1:]]
+    assert reasons.count("short_request+probe") == 2
+    assert fast.calls == 3
+    fast.delay = 0.0
+    router.stats["fast"].ttft = None  # as if the probe had found it fast again
+    turn(router, "hi")
+    assert router.last_decision["route"] == "fast"
+
+def test_failed_route_falls_back(estimator):
+    router = RoutingProvider([("fast", TimedProvider(fail=True)), ("strong", TimedProvider())], estimator=estimator)
+    turn(router, "hi")
+    assert router.last_decision["route"] == "strong"
+    assert router.last_decision["fallback_from"][0]["route"] == "fast"
+    assert router.summary()["chosen"] == {"strong": 1}
+
+def test_decisions_are_bounded(estimator):
+    router = RoutingProvider([("fast", TimedProvider()), ("strong", TimedProvider())], estimator=estimator)
+    for _ in range(MAX_DECISIONS + 5):
+        turn(router, "hi")
+    assert len(router.decisions) == MAX_DECISIONS
+    assert router.summary()["chosen"] == {"fast": MAX_DECISIONS + 5}
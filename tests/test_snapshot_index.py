@@ -0,0 +1,84 @@
+import os
+import re
+import time
+
+import pytest
+
+from swe_tools import snapshot_index as snapshots
+from swe_tools.codebase_snapshot_generator import read_codebase_snapshot
+
+def write(root, rel_path, content, age=0):
+    path = os.path.join(root, rel_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
+    if age:
+        # Older than the racy window, so the next delta may trust mtime and size
+        mtime = time.time() - age
+        os.utime(path, (mtime, mtime))
+
+def token_of(text):
+    return re.search(r"Snapshot token: (snap-\w+)", text).group(1)
+
+@pytest.fixture
+def tree(tmp_path):
+    root = str(tmp_path)
+    for rel_path in ["a.py", "b.py", "pkg/c.py", "pkg/d.py"]:
+        write(root, rel_path, f"# {rel_path}\n", age=10)
+    write(root, "node_modules/x.js", "", age=10)
+    return root
+
+def test_token_depends_on_the_content(tree):
+    first = token_of(read_codebase_snapshot(tree))
+    assert token_of(read_codebase_snapshot(tree)) == first
+    write(tree, "a.py", "# changed\n", age=10)
+    assert token_of(read_codebase_snapshot(tree)) != first
+
+def test_delta_lists_added_modified_and_deleted_files(tree):
+    token = token_of(read_codebase_snapshot(tree))
+    write(tree, "a.py", "a = 1\n")
+    write(tree, "pkg/e.py", "e = 1\n")
+    os.remove(os.path.join(tree, "pkg/d.py"))
+    write(tree, "node_modules/y.js", "")
+    delta = read_codebase_snapshot(tree, since=token)
+    assert f"[Snapshot delta since {token}: 1 added, 1 modified, 1 deleted, 2 unchanged.]" in delta
+    assert "Added: pkg/e.py\nModified: a.py\nDeleted: pkg/d.py\n" in delta
+    assert "$a.py" in delta and "$pkg/e.py" in delta and "$b.py" not in delta
+
+    again = read_codebase_snapshot(tree, since=token_of(delta))
+    assert again.startswith(f"[No changes since {token_of(delta)}: 4 files unchanged.]")
+
+def test_unchanged_files_are_not_read_again(tree, monkeypatch):
+    token = token_of(read_codebase_snapshot(tree))
+    read = []
+    build_snapshot = snapshots.build_snapshot
+    def recording(root, rel_paths, *args, **kwargs):
+        read.extend(rel_paths)
+        return build_snapshot(root, rel_paths, *args, **kwargs)
+    monkeypatch.setattr(snapshots, "build_snapshot", recording)
+    write(tree, "b.py", "b = 2\n")
+    read_codebase_snapshot(tree, since=token)
+    assert read == ["b.py"]
+
+def test_racy_rewrite_with_the_same_size_and_mtime_is_seen(tree):
+    write(tree, "a.py", "a = 1\n")
+    token = token_of(read_codebase_snapshot(tree))
+    path = os.path.join(tree, "a.py")
+    st = os.stat(path)
+    write(tree, "a.py", "a = 2\n")
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert "Modified: a.py" in read_codebase_snapshot(tree, since=token)
+
+def test_unknown_token_gets_a_full_snapshot(tree):
+    text = read_codebase_snapshot(tree, since="snap-unknown")
+    assert text.startswith("[Snapshot token snap-unknown is unknown or has expired; full snapshot follows.]")
+    assert "$pkg/d.py" in text
+
+def test_index_keeps_the_most_recent_states(tree):
+    index = snapshots.SnapshotIndex(max_states=2)
+    states = [snapshots.SnapshotState(tree, (), {"a.py": (i, 1, None)}, 0) for i in range(3)]
+    for state in states:
+        index.remember(state)
+    assert index.lookup(states[0].token, tree, ()) is None
+    assert index.lookup(states[2].token, tree, ()) is states[2]
+    assert index.lookup(states[2].token, tree, ("*.md",)) is None
@@ -0,0 +1,41 @@
+from types import SimpleNamespace
+
+from core.streaming import ToolCallAccumulator
+
+def fragment(index, arguments="", call_id=None, name=None):
+    return SimpleNamespace(index=index, id=call_id, function=SimpleNamespace(name=name, arguments=arguments))
+
+def test_call_completes_when_its_arguments_parse():
+    acc = ToolCallAccumulator()
+    assert acc.add([fragment(0, '{"path": "co', "call_a", "read_file_content")]) == []
+    assert acc.add([fragment(0, 're/a.py"')]) == []
+    [call] = acc.add([fragment(0, "}")])
+    assert (call["id"], call["name"], call["args"]) == ("call_a", "read_file_content", {"path": "core/a.py"})
+    assert acc.finish() == []
+
+def test_braces_inside_strings_do_not_end_a_call_early():
+    acc = ToolCallAccumulator()
+    assert acc.add([fragment(0, '{"changes": "$a.py\\n1: d = {}', "c", "edit_file_lines")]) == []
+    [call] = acc.add([fragment(0, '"}')])
+    assert call["args"] == {"changes": "$a.py\n1: d = {}"}
+
+def test_a_later_index_completes_the_earlier_calls():
+    acc = ToolCallAccumulator()
+    assert acc.add([fragment(0, "", "c0", "list_background_processes")]) == []  # no arguments to parse
+    assert acc.add([fragment(1, '{"path": "b"}', "c1", "read_file_content")]) == [
+        {"id": "c0", "name": "list_background_processes", "args": {}},
+        {"id": "c1", "name": "read_file_content", "args": {"path": "b"}},
+    ]
+
+def test_finish_flushes_calls_without_arguments():
+    acc = ToolCallAccumulator()
+    assert acc.add([fragment(0, "", "c0", "list_background_processes")]) == []
+    [call] = acc.finish()
+    assert (call["name"], call["args"]) == ("list_background_processes", {})
+
+def test_calls_with_malformed_arguments_keep_the_raw_text():
+    acc = ToolCallAccumulator()
+    assert acc.add([fragment(0, '{"path": "a.py",}', "c0", "read_file_content")]) == []
+    [invalid, truncated_call] = acc.add([fragment(1, '{"changes": "$a.py', "c1", "edit_file_lines")]) + acc.finish()
+    assert (invalid["args"], invalid["invalid_arguments"]) == ({}, '{"path": "a.py",}')
+    assert (truncated_call["args"], truncated_call["invalid_arguments"]) == ({}, '{"changes": "$a.py')
@@ -0,0 +1,38 @@
+import pytest
+
+from core.token_estimator import MESSAGE_OVERHEAD_TOKENS, REFUSE, TRIM, RequestSizeGuard, TokenEstimator
+
+def history_with_tool_output(chars):
+    return [{"role": "user", "content": "Show me the snapshot"},
+            {"role": "assistant", "content": "", "tool_calls": [{"id": "c1", "name": "read_codebase_snapshot", "args": {}}]},
+            {"role": "tool", "tool_call_id": "c1", "name": "read_codebase_snapshot", "content": "x" * chars}]
+
+def test_request_tokens_count_prefix_and_messages():
+    estimator = TokenEstimator("gemini", prefix_chars=400)
+    history = [{"role": "user", "content": "a" * 400}]
+    assert estimator.request_tokens(history) == 200 + MESSAGE_OVERHEAD_TOKENS
+    assert estimator.history_tokens(history) == 100 + MESSAGE_OVERHEAD_TOKENS
+
+def test_calibration_moves_towards_reported_usage():
+    estimator = TokenEstimator("groq", smoothing=1.0)
+    history = [{"role": "user", "content": "a" * 1000}]
+    estimator.request_tokens(history)
+    estimator.calibrate(500 + MESSAGE_OVERHEAD_TOKENS)  # the provider saw 2 characters per token
+    assert estimator.chars_per_token == pytest.approx(2.0)
+    assert estimator.calibrations == 1
+    estimator.calibrate(10)  # nothing new was estimated since
+    assert estimator.calibrations == 1
+
+def test_guard_trims_the_largest_tool_output():
+    history = history_with_tool_output(40_000)
+    guard = RequestSizeGuard(TokenEstimator(), max_request_tokens=2_000, policy=TRIM)
+    event = guard.enforce(history)
+    assert event["type"] == "request_trimmed" and event["tokens_after"] <= 2_000
+    assert history[2]["content"].startswith("[Output of `read_codebase_snapshot` truncated")
+    assert guard.enforce(history) is None
+
+def test_guard_refuses_without_touching_the_history():
+    history = history_with_tool_output(40_000)
+    event = RequestSizeGuard(TokenEstimator(), max_request_tokens=2_000, policy=REFUSE).enforce(history)
+    assert event["type"] == "request_too_large"
+    assert len(history[2]["content"]) == 40_000
@@ -0,0 +1,108 @@
+import asyncio
+import os
+
+import mcp.types as types
+import pytest
+
+from core.tool_cache import ToolResultCache
+from core.tool_dispatch import ToolDispatcher
+from swe_tools import workspace_index
+
+def result(text):
+    return types.CallToolResult(content=[types.TextContent(type="text", text=text)])
+
+def write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
+
+@pytest.fixture
+def workspace(tmp_path):
+    root = str(tmp_path)
+    write(os.path.join(root, "src", "a.py"), "a = 1\n")
+    write(os.path.join(root, "node_modules", "lib", "index.js"), "")
+    return root
+
+@pytest.fixture(params=["index", "walk"])
+def fingerprint_mode(request, monkeypatch):
+    if request.param == "walk":
+        monkeypatch.setattr(workspace_index, "WORKSPACE_INDEX", "off")
+    return request.param
+
+def snapshot_key(cache, root):
+    return cache.key("read_codebase_snapshot", {"path": root})
+
+def test_directory_key_follows_visible_changes(workspace, fingerprint_mode):
+    cache = ToolResultCache()
+    key = snapshot_key(cache, workspace)
+    assert key is not None and snapshot_key(cache, workspace) == key
+    write(os.path.join(workspace, "node_modules", "lib", "index.js"), "ignored")
+    assert snapshot_key(cache, workspace) == key
+    write(os.path.join(workspace, "src", "b.py"), "")
+    changed = snapshot_key(cache, workspace)
+    assert changed != key
+    os.remove(os.path.join(workspace, "src", "b.py"))
+    assert snapshot_key(cache, workspace) != changed
+
+def test_index_sees_rewrites_that_keep_size_and_mtime(workspace):
+    cache = ToolResultCache()
+    path = os.path.join(workspace, "src", "a.py")
+    key = snapshot_key(cache, workspace)
+    st = os.stat(path)
+    write(path, "a = 2\n")
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert snapshot_key(cache, workspace) != key
+
+def test_directory_key_skips_the_walk_when_indexed(workspace, monkeypatch):
+    cache = ToolResultCache()
+    snapshot_key(cache, workspace)
+    monkeypatch.setattr(os, "scandir", lambda *args: pytest.fail("walked the tree"))
+    snapshot_key(cache, workspace)
+
+def test_relative_paths_are_keyed_on_the_server_root(workspace, tmp_path_factory, monkeypatch):
+    monkeypatch.chdir(tmp_path_factory.mktemp("runner"))
+    write(os.path.join(os.getcwd(), "src", "a.py"), "runner copy\n")
+    cache = ToolResultCache(root=workspace)
+    key = cache.key("read_file_content", {"path": "src/a.py"})
+    write(os.path.join(os.getcwd(), "src", "a.py"), "runner copy, edited\n")
+    assert cache.key("read_file_content", {"path": "src/a.py"}) == key
+    write(os.path.join(workspace, "src", "a.py"), "a = 2, edited\n")
+    assert cache.key("read_file_content", {"path": "src/a.py"}) != key
+    assert cache.key("read_file_content", {"path": "missing.py"}) is None
+
+def test_lru_is_bounded_by_bytes():
+    cache = ToolResultCache(max_bytes=10)
+    cache.put("a", result("12345"))
+    cache.put("b", result("12345"))
+    assert cache.get("a") is not None  # a is now the most recently used
+    cache.put("c", result("12345"))
+    assert cache.get("b") is None and cache.get("a") is not None and cache.get("c") is not None
+    cache.put("d", {"status": "denied"})
+    cache.put("e", types.CallToolResult(content=[], isError=True))
+    assert cache.get("d") is None and cache.get("e") is None
+    assert cache.stats()["evictions"] == 1 and cache.stats()["entries"] == 2
+
+class CountingSession:
+    def __init__(self):
+        self.calls = 0
+
+    async def call_tool(self, name, args):
+        self.calls += 1
+        return result(f"{name} #{self.calls}")
+
+def test_dispatcher_serves_hits_and_mutations_invalidate(workspace):
+    session = CountingSession()
+    dispatcher = ToolDispatcher(session, cache=ToolResultCache())
+    path = os.path.join(workspace, "src", "a.py")
+
+    async def main():
+        first = await dispatcher.call_tool("read_file_content", {"path": path})
+        second = await dispatcher.call_tool("read_file_content", {"path": path})
+        await dispatcher.call_tool("run_shell_command", {"command": "true"})
+        third = await dispatcher.call_tool("read_file_content", {"path": path})
+        return first, second, third
+    first, second, third = asyncio.run(main())
+    assert second is first and third is not first
+    assert session.calls == 3
+    stats = dispatcher.cache.stats()
+    assert (stats["hits"], stats["misses"], stats["invalidations"]) == (1, 2, 1)
@@ -0,0 +1,79 @@
+import asyncio
+import os
+import time
+
+from core.tool_dispatch import ToolDispatcher, tool_paths
+from swe_tools.instance import ThreadedFastMCP
+
+class RecordingSession:
+    """Stands in for the MCP session: every call sleeps briefly and logs when it starts and ends."""
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.log = []
+
+    async def call_tool(self, name, args):
+        label = f"{name}:{args.get('path') or args.get('changes', '').strip()}"
+        self.log.append(("start", label))
+        await asyncio.sleep(self.delay)
+        self.log.append(("end", label))
+        return label
+
+def run_batch(calls, session):
+    async def main():
+        batch = ToolDispatcher(session, max_concurrency=4).batch()
+        for name, args in calls:
+            batch.submit(name, args)
+        return await batch.results()
+    return asyncio.run(main())
+
+def test_read_only_calls_fan_out_and_keep_result_order():
+    session = RecordingSession()
+    calls = [("read_file_content", {"path": f"f{i}.py"}) for i in range(4)]
+    started = time.perf_counter()
+    results = run_batch(calls, session)
+    assert time.perf_counter() - started < 4 * session.delay
+    assert results == [f"read_file_content:f{i}.py" for i in range(4)]
+    assert [event for event, _ in session.log[:4]] == ["start"] * 4
+
+def test_mutating_call_waits_for_reads_of_the_same_path():
+    session = RecordingSession()
+    run_batch([("read_file_content", {"path": "a.py"}), ("edit_file_lines", {"changes": "$a.py\n1: x = 1"}),
+               ("read_file_content", {"path": "a.py"}), ("read_file_content", {"path": "b.py"})], session)
+    log = session.log
+    read_a = [i for i, entry in enumerate(log) if entry[1] == "read_file_content:a.py"]
+    edit = [i for i, entry in enumerate(log) if entry[1].startswith("edit_file_lines")]
+    read_b = log.index(("start", "read_file_content:b.py"))
+    assert read_a[1] < edit[0] and edit[1] < read_a[2]  # first read, then the edit, then the second read
+    assert read_b < edit[1]  # b.py does not wait for the edit of a.py
+
+def test_calls_with_unknown_footprint_conflict_with_everything():
+    assert tool_paths("run_shell_command", {"command": "ls"}) is None
+    session = RecordingSession()
+    run_batch([("read_file_content", {"path": "a.py"}), ("run_shell_command", {"path": "ls"}),
+               ("read_file_content", {"path": "b.py"})], session)
+    assert [label for _, label in session.log] == ["read_file_content:a.py"] * 2 + ["run_shell_command:ls"] * 2 + ["read_file_content:b.py"] * 2
+
+def test_relative_paths_resolve_against_the_server_root(tmp_path):
+    root = str(tmp_path)
+    assert tool_paths("read_file_content", {"path": "src/a.py"}, root) == {os.path.normcase(os.path.join(root, "src", "a.py"))}
+    assert tool_paths("read_file_content", {"path": "/etc/hosts"}, root) == {os.path.normcase("/etc/hosts")}
+    assert tool_paths("write_files_from_snapshot", {"output_directory": "out", "input_snapshot_content": "$b.py\n1: b"}, root) == {
+        os.path.normcase(os.path.join(root, "out", "b.py"))}
+
+def test_server_runs_sync_tools_off_the_event_loop():
+    server = ThreadedFastMCP("test")
+
+    @server.tool(name="nap")
+    def nap(seconds: float) -> str:
+        time.sleep(seconds)
+        return "done"
+
+    assert nap(0) == "done"  # the decorator still returns the plain function
+
+    async def main():
+        started = time.perf_counter()
+        results = await asyncio.gather(*[server.call_tool("nap", {"seconds": 0.2}) for _ in range(3)])
+        return time.perf_counter() - started, results
+    elapsed, results = asyncio.run(main())
+    assert elapsed < 0.5
+    assert all(result[0][0].text == "done" for result in results)
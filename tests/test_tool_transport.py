@@ -0,0 +1,20 @@
+import asyncio
+
+from core.tool_transport import environment_hash, socket_path
+from swe_tools.daemon import tool_server
+
+def test_socket_is_keyed_on_workspace_and_environment(tmp_path):
+    env = {"HOME": "/home/a", "PATH": "/usr/bin"}
+    assert socket_path(str(tmp_path), env) == socket_path(str(tmp_path), dict(env, PWD="/elsewhere", SHLVL="3"))
+    assert socket_path(str(tmp_path), env) != socket_path(str(tmp_path), dict(env, VIRTUAL_ENV="/venv"))
+    assert socket_path(str(tmp_path), env) != socket_path(str(tmp_path / "other"), env)
+    assert environment_hash(env) == environment_hash(dict(reversed(list(env.items()))))
+
+def test_daemon_server_lists_the_registered_tools():
+    import mcp.types as types
+    import swe_tools.run_server  # noqa: F401
+    server = tool_server()
+    handler = server.request_handlers[types.ListToolsRequest]
+    result = asyncio.run(handler(types.ListToolsRequest(method="tools/list")))
+    names = {tool.name for tool in result.root.tools}
+    assert {"read_file_content", "run_shell_command", "read_codebase_snapshot"} <= names
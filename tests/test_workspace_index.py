@@ -0,0 +1,73 @@
+import os
+
+import pytest
+
+from swe_tools import workspace_index
+from swe_tools.path_matcher import PathMatcher
+from swe_tools.workspace_index import WorkspaceIndex
+
+def listing(walk):
+    return [(rel, list(dirs), list(files)) for _, rel, dirs, files in walk]
+
+def touch(root, rel_path, content=""):
+    path = os.path.join(root, rel_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
+
+@pytest.fixture
+def tree(tmp_path):
+    root = str(tmp_path)
+    for rel_path in ("a.py", "pkg/b.py", "pkg/sub/c.py", "pkg/sub/deep/d.py", "docs/e.md",
+                     "build/out.o", "node_modules/x/index.js"):
+        touch(root, rel_path)
+    touch(root, ".gitignore", "build/\n")
+    return root
+
+@pytest.fixture(params=["inotify", "poll"])
+def index(request, tree):
+    index = WorkspaceIndex(tree, watch=request.param)
+    yield index
+    index.close()
+
+def test_walk_matches_path_matcher(index, tree):
+    assert listing(index.walk()) == listing(PathMatcher(tree).walk())
+    assert listing(index.walk("pkg", max_depth=1)) == listing(PathMatcher(os.path.join(tree, "pkg")).walk(max_depth=1))
+    assert listing(index.walk(extra=["docs"])) == listing(PathMatcher(tree, ["docs"]).walk())
+
+def test_refresh_follows_changes(index, tree):
+    list(index.walk())
+    touch(tree, "pkg/new.py")
+    touch(tree, "fresh/dir/f.py")
+    os.remove(os.path.join(tree, "pkg/sub/deep/d.py"))
+    os.rename(os.path.join(tree, "docs"), os.path.join(tree, "manual"))
+    touch(tree, ".gitignore", "build/\n*.md\n")
+    index.refresh()
+    assert listing(index.walk()) == listing(PathMatcher(tree).walk())
+
+def test_shallow_walk_lists_only_what_it_reaches(tree):
+    index = WorkspaceIndex(tree, watch="poll")
+    assert index.stats()["directories"] == 1
+    list(index.walk(max_depth=1))
+    assert index.stats()["directories"] == 3  # the root, docs and pkg
+    list(index.walk())
+    assert index.stats()["directories"] == 5
+
+def test_cap_keeps_listings_correct(tree):
+    index = WorkspaceIndex(tree, watch="inotify", max_dirs=2)
+    assert listing(index.walk()) == listing(PathMatcher(tree).walk())
+    stats = index.stats()
+    assert stats["directories"] == 2 and stats["unkept_lists"] > 0
+    index.close()
+
+def test_ignored_directories_are_not_entered(tree):
+    index = WorkspaceIndex(tree, watch="poll")
+    assert index.has_dir("pkg/sub")
+    assert not index.has_dir("build")
+    assert not index.has_dir("node_modules/x")
+    assert index.children("pkg") == (["sub"], ["b.py"])
+
+def test_filesystem_root_and_home_are_walked_directly(tree):
+    assert workspace_index._walked_directly(os.sep)
+    assert workspace_index._walked_directly(os.path.expanduser("~"))
+    assert not workspace_index._walked_directly(tree)
@@ -1,51 +1,50 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.responses import HTMLResponse
 from fastapi.staticfiles import StaticFiles
 import asyncio
 import sys
 import os
-from datetime import datetime
 import re
 import traceback
 import uuid
-import json
 
 # Add project root to sys.path for imports
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from gui.client import get_gemini_client
-from core.config import MODEL_NAME, SYSTEM_PROMPT, MAX_TOOL_TURNS
-from core.tool_utils import mcp_tool_to_genai_tool
+from core.config import GROQ_MODEL_NAME, METRICS_LOG_FILE
+from core.metrics import MetricsLogger
 from core.ai_core import AICore
+from core.provider_registry import ProviderRegistry
+from core.budget import TaskBudget
 
 from swe_tools.__init__ import mcp as clia_mcp # Import the FastMCP instance
 
-from google.genai import types
 from google.genai import errors as genai_errors
 
 app = FastAPI()
 
-# Global state for Gemini client
-gemini_client = None
+# Shared provider clients and tool schemas for all WebSocket sessions
+provider_registry = None
 session_histories = {} # Stores chat history for each WebSocket connection
 
-async def initialize_gemini_client():
-    global gemini_client
-    if gemini_client:
-        return # Already initialized
-
+@app.on_event("startup")
+async def startup_event():
+    global provider_registry
     try:
-        gemini_client = get_gemini_client()
-        print("Gemini client initialized successfully.")
+        mcp_tools = await clia_mcp.list_tools()
+        if not mcp_tools:
+            print("ERROR: No tools found on the MCP server.")
+            return
+        provider_registry = ProviderRegistry(mcp_tools)
+        print("AI components initialized successfully.")
     except Exception as e:
-        print(f"Error initializing Gemini client: {e}")
+        print(f"Error initializing AI components: {e}")
         traceback.print_exc()
-        # Handle error, perhaps send a message to the client
 
-@app.on_event("startup")
-async def startup_event():
-    await initialize_gemini_client()
-    print("AI components initialized successfully.")
+@app.on_event("shutdown")
+async def shutdown_event():
+    if provider_registry:
+        await provider_registry.aclose()
 
 @app.get("/", response_class=HTMLResponse)
 async def home():
@@ -61,28 +60,35 @@ async def websocket_endpoint(websocket: WebSocket):
     # Initialize session state
     current_history = [] 
     provider_name = "groq" # Default to Groq/OpenAI as requested
-    model_name = os.environ.get("GROQ_MODEL_NAME", "moonshotai/kimi-k2-instruct-0905")
+    model_name = GROQ_MODEL_NAME
 
-    mcp_tools = await clia_mcp.list_tools()
-    if not mcp_tools:
-        print("ERROR: No tools found on the MCP server.")
+    if provider_registry is None:
+        await websocket.send_json({"type": "error", "content": "AI components are not initialized. Check the server log."})
+        await websocket.close()
         return
+    # Lightweight per-session handle; the HTTP client and tool schemas are shared
+    provider = provider_registry.session(provider_name, model_name)
+
+    always_allowed_tools = set()
+
+    async def ask_permission(tool_name, tool_args):
+        """Asks the browser for approval. AICore is the only place tools execute."""
+        if tool_name in always_allowed_tools:
+            return True
+        await websocket.send_json({"type": "permission_request", "tool_name": tool_name, "tool_args": str(tool_args)})
+        while True:
+            reply = await websocket.receive_json()
+            if reply.get("type") == "permission_response":
+                break
+            if reply.get("type") == "ping":
+                await websocket.send_json({"type": "pong"})
+        if reply.get("allow") == "always":
+            always_allowed_tools.add(tool_name)
+            return True
+        return reply.get("allow") is True
 
-    if provider_name == "gemini":
-        from core.tool_utils import mcp_tool_to_genai_tool
-        gemini_tools = [mcp_tool_to_genai_tool(t) for t in mcp_tools]
-        provider = GeminiProvider(gemini_client, model_name, gemini_tools)
-    else:
-        from core.tool_utils import mcp_tool_to_openai_tool
-        groq_tools = [mcp_tool_to_openai_tool(t) for t in mcp_tools]
-        from groq import AsyncGroq
-        groq_client = AsyncGroq(
-            api_key=os.environ.get("GROQ_API_KEY"),
-            base_url=os.environ.get("GROQ_BASE_URL") # Support custom endpoints
-        )
-        provider = GroqProvider(groq_client, model_name, groq_tools)
-
-    ai_core = AICore(provider, clia_mcp)
+    ai_core = AICore(provider, clia_mcp, permission_callback=ask_permission)
+    metrics_logger = MetricsLogger(METRICS_LOG_FILE, session_id=str(uuid.uuid4())) if METRICS_LOG_FILE else None
 
     while True:
         try:
@@ -94,9 +100,20 @@ async def websocket_endpoint(websocket: WebSocket):
                 
                 # ... (file processing logic omitted for brevity in this refactor, but kept in original)
                 
+                # Optional per-request limits, e.g. {"deadline_seconds": 120, "max_tool_calls": 10}
+                overrides = message.get("budget") or {}
+                try:
+                    if not isinstance(overrides, dict):
+                        raise ValueError("The budget must be an object of limits.")
+                    budget = TaskBudget().with_overrides(**overrides)
+                except ValueError as e:
+                    # Rejected before the message joins the history; the session stays open
+                    await websocket.send_json({"type": "error", "content": f"Request not sent: {e}"})
+                    continue
+
                 await websocket.send_json({"type": "typing_indicator", "status": "start"})
 
-                async for event in ai_core.process_message(current_history, user_text):
+                async for event in ai_core.process_message(current_history, user_text, budget=budget):
                     if event["type"] == "stream":
                         chunk = event["content"]
                         for part in chunk.candidates[0].content.parts:
@@ -111,14 +128,10 @@ async def websocket_endpoint(websocket: WebSocket):
                     elif event["type"] == "thoughts":
                         await websocket.send_json({"type": "thoughts", "content": event["content"]})
                     elif event["type"] == "tool_call":
-                        tool_name = event["tool_name"]
-                        tool_args = event["tool_args"]
-                        # Permission check
-                        # ... (existing permission logic)
                         await websocket.send_json({
                             "type": "tool_call",
-                            "tool_name": tool_name,
-                            "tool_args": str(tool_args)
+                            "tool_name": event["tool_name"],
+                            "tool_args": str(event["tool_args"])
                         })
                     elif event["type"] == "tool_result":
                         await websocket.send_json({
@@ -126,10 +139,21 @@ async def websocket_endpoint(websocket: WebSocket):
                             "tool_name": event["tool_name"],
                             "result": str(event["result"])
                         })
+                    elif event["type"] == "turn_summary":
+                        await websocket.send_json({"type": "turn_summary", "metrics": event["metrics"]})
+                        if metrics_logger:
+                            metrics_logger.log(event["metrics"], provider=provider_name, model=model_name)
+                    elif event["type"] == "context_compacted":
+                        await websocket.send_json({"type": "info_message", "content": f"Context compacted: saved {event['tokens_saved']} tokens."})
+                    elif event["type"] == "request_trimmed":
+                        await websocket.send_json({"type": "info_message", "content": f"Request too large: trimmed {event['trimmed_tool_outputs']} tool output(s) to {event['tokens_after']} estimated tokens."})
                     elif event["type"] == "bot_response":
-                        # Add to history
-                        current_history.append({"role": "user", "content": user_text})
-                        current_history.append({"role": "assistant", "content": event["content"]})
+                        # AICore records the exchange, including tool calls and results, in current_history
+                        pass
+                    elif event["type"] == "budget_exhausted":
+                        await websocket.send_json(event)
+                        if event["partial"]:
+                            await websocket.send_json({"type": "agent_message", "content": event["partial"]})
                     elif event["type"] == "error":
                         await websocket.send_json({"type": "error", "content": event["content"]})
 